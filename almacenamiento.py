@@ -0,0 +1,160 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+
+# los tipos de cada tabla se definen en esquema.py (CATEGORICAS y GENEROS se siguen importando desde acá)
+from esquema import CATEGORICAS, FORMATOS_FECHA, GENEROS, aplicar, tipos_lectura
+
+
+def a_columnar(df: pd.DataFrame) -> pd.DataFrame:
+    """Devuelve una copia de df con tipos compactos para los formatos binarios."""
+    df = df.reset_index(drop=True)
+    for col in df.columns:
+        if col in CATEGORICAS and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+        elif col in GENEROS:
+            df[col] = df[col].astype(bool)
+    return df
+
+
+def a_texto(df: pd.DataFrame) -> pd.DataFrame:
+    """Devuelve df listo para CSV: los géneros vuelven a escribirse como 0/1 y las fechas
+    con el formato de los archivos originales."""
+    generos = [col for col in df.columns if col in GENEROS and df[col].dtype == bool]
+    fechas = {col: df[col].dt.strftime(FORMATOS_FECHA[col]) for col in df.columns
+              if col in FORMATOS_FECHA and pd.api.types.is_datetime64_any_dtype(df[col])}
+    if not generos and not fechas:
+        return df
+    if fechas:
+        df = df.assign(**fechas)
+    return df.astype({col: 'int64' for col in generos})
+
+
+def admitir_categorias(df: pd.DataFrame, filas: list) -> None:
+    """Agrega a las columnas categóricas de df los valores nuevos que traen las filas,
+    para que asignarlas con loc o concatenarlas no falle ni pierda el tipo."""
+    for col, tipo in df.dtypes.items():
+        if not isinstance(tipo, pd.CategoricalDtype):
+            continue
+        categorias = tipo.categories
+        nuevos = {fila[col] for fila in filas
+                  if fila.get(col) is not None and not pd.isna(fila[col]) and fila[col] not in categorias}
+        if nuevos:
+            df[col] = df[col].cat.add_categories(sorted(nuevos, key=str))
+
+
+def etiqueta_nueva(df: pd.DataFrame):
+    """Etiqueta para una fila nueva de df: la siguiente a la mayor, así no pisa ninguna fila
+    aunque se hayan borrado otras (len(df) puede ser la etiqueta de una fila que sigue viva)."""
+    return df.index.max() + 1 if len(df) else 0
+
+
+def asignar_fila(df: pd.DataFrame, etiqueta, fila: dict) -> None:
+    """Escribe (en el lugar) la fila etiqueta de df, agregándola si no existe, sin cambiar los
+    tipos de las columnas. Los valores ya deben tener los tipos de la tabla (esquema.convertir_fila)."""
+    admitir_categorias(df, [fila])
+    if isinstance(etiqueta, list) or etiqueta in df.index:
+        df.loc[etiqueta] = fila
+        return
+    # agregar una fila con loc pasa las categorías a texto: se agregan sus códigos
+    # y después cada columna vuelve a su tipo
+    categoricas = {col: tipo for col, tipo in df.dtypes.items() if isinstance(tipo, pd.CategoricalDtype)}
+    fila = dict(fila)
+    for col, tipo in categoricas.items():
+        df[col] = df[col].cat.codes
+        valor = fila.get(col)
+        fila[col] = -1 if valor is None or pd.isna(valor) else tipo.categories.get_loc(valor)
+    df.loc[etiqueta] = fila
+    for col, tipo in categoricas.items():
+        df[col] = pd.Categorical.from_codes(df[col], dtype=tipo)
+
+
+def _escribir_csv(df: pd.DataFrame, ruta) -> None:
+    a_texto(df).to_csv(ruta, index=False)
+
+
+def _escribir_parquet(df: pd.DataFrame, ruta) -> None:
+    a_columnar(df).to_parquet(ruta, index=False)
+
+
+def _escribir_feather(df: pd.DataFrame, ruta) -> None:
+    a_columnar(df).to_feather(ruta)
+
+
+# formatos soportados, indicados por la extensión del archivo
+LECTORES = {
+    'csv': pd.read_csv,
+    'parquet': pd.read_parquet,
+    'feather': pd.read_feather,
+}
+ESCRITORES = {
+    'csv': _escribir_csv,
+    'parquet': _escribir_parquet,
+    'feather': _escribir_feather,
+}
+
+
+def registrar_formato(extension: str, lector, escritor) -> None:
+    """Agrega un formato de almacenamiento nuevo.
+    Args:
+        extension (str): extensión de archivo sin el punto, por ejemplo 'orc'.
+        lector (callable): función ruta -> DataFrame.
+        escritor (callable): función (DataFrame, ruta) -> None.
+    """
+    LECTORES[extension] = lector
+    ESCRITORES[extension] = escritor
+
+
+def formato(ruta) -> str:
+    """Devuelve el formato de un archivo según su extensión."""
+    extension = Path(ruta).suffix.lower().lstrip('.')
+    if extension not in LECTORES:
+        raise ValueError(f"Formato de archivo no soportado: '{ruta}'")
+    return extension
+
+
+def partes(ruta) -> list:
+    """Archivos de una tabla: el propio archivo o, si ruta es el directorio de una tabla
+    particionada por rangos de filas (ver guardado.py), sus partes en orden."""
+    ruta = Path(ruta)
+    if ruta.is_dir():
+        return sorted(ruta.glob(f'[0-9]*{ruta.suffix}'))
+    return [ruta]
+
+
+def leer_tabla(ruta, tabla: str = None) -> pd.DataFrame:
+    """Lee una tabla en el formato indicado por la extensión de ruta.
+    Si se indica tabla (por ejemplo 'personas'), se le aplican los tipos de su esquema;
+    los CSV ya se leen con esos tipos. Las partes de una tabla particionada se leen
+    juntas, con las etiquetas correlativas que tendría el archivo completo."""
+    extension = formato(ruta)
+    if extension == 'csv' and tabla is not None:
+        def leer(archivo):
+            return LECTORES[extension](archivo, dtype=tipos_lectura(tabla))
+    else:
+        leer = LECTORES[extension]
+    if Path(ruta).is_dir():
+        df = pd.concat([leer(parte) for parte in partes(ruta)], ignore_index=True)
+    else:
+        df = leer(ruta)
+    return df if tabla is None else aplicar(df, tabla)
+
+
+def escribir_tabla(df: pd.DataFrame, ruta) -> None:
+    """Escribe una tabla en el formato indicado por la extensión de ruta."""
+    ESCRITORES[formato(ruta)](df, ruta)
+
+
+def temporal(ruta) -> Path:
+    """Archivo temporal junto a ruta, con su misma extensión (así se escribe en el mismo formato)."""
+    ruta = Path(ruta)
+    return ruta.with_name('.' + ruta.stem + '.tmp' + ruta.suffix)
+
+
+def reemplazar_tabla(df: pd.DataFrame, ruta) -> None:
+    """Escribe la tabla en un archivo temporal y lo reemplaza por ruta de forma atómica:
+    quien lea ruta ve la versión anterior completa o la nueva completa."""
+    archivo = temporal(ruta)
+    escribir_tabla(df, archivo)
+    os.replace(archivo, ruta)
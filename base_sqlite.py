@@ -0,0 +1,778 @@
+"""Motor de almacenamiento SQLite para las clases de johann_clases.
+
+PersonasSQLite, UsuariosSQLite y PeliculasSQLite tienen la misma API que
+Personas, Usuarios y Peliculas (new, new_many, update, get, get_many,
+get_index, delete, get_from_df y get_stats), pero guardan las filas en un
+archivo SQLite en lugar de un DataFrame cargado entero: abrir la base no
+depende de su tamaño, cada modificación queda en disco al terminar (una
+transacción por operación) y las búsquedas usan los índices de la base.
+
+Las tablas tienen clave primaria 'id' y las mismas claves foráneas que
+integridad.RELACIONES, con borrado en cascada (dar de baja una persona
+borra su usuario, su trabajador y sus scores). Hay índices secundarios por
+ocupación, sexo, año de nacimiento, año de estreno y género; los géneros de
+las películas se guardan en una tabla aparte (película, género).
+
+Uso:
+    conectar('datos.db')
+    importar(*load_all(...))          # una sola vez, para pasar los datos a la base
+    PersonasSQLite.get(PersonasSQLite.get_index(15))
+
+    python -m base_sqlite --directorio . --extension csv --salida datos.db
+"""
+import argparse
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from almacenamiento import GENEROS, a_texto
+from concurrencia import LockLecturaEscritura, escritura, lectura
+from duplicados import IndiceDuplicados
+from estadisticas import DIMENSIONES, LIMITES_ETARIOS, RANGOS_ETARIOS, anio_estreno
+from indice_peliculas import tokens
+from integridad import RELACIONES
+from johann_clases import CONFLICTOS, Peliculas, Personas, Usuarios
+from metricas import instrumentado, una_fila
+
+# columnas de cada tabla y su tipo en SQLite; 'id' es la clave primaria
+COLUMNAS = {
+    'personas': {'id': 'INTEGER', 'Full Name': 'TEXT', 'year of birth': 'INTEGER',
+                 'Gender': 'TEXT', 'Zip Code': 'TEXT'},
+    'usuarios': {'id': 'INTEGER', 'Occupation': 'TEXT', 'Active Since': 'TEXT'},
+    'trabajadores': {'id': 'INTEGER', 'Position': 'TEXT', 'Category': 'TEXT',
+                     'Working Hours': 'TEXT', 'Start Date': 'TEXT'},
+    # anio se calcula de Release Date al guardar, para poder indexarlo
+    'peliculas': {'id': 'INTEGER', 'Name': 'TEXT', 'Release Date': 'TEXT', 'IMDB URL': 'TEXT',
+                  'anio': 'INTEGER'},
+    'scores': {'user_id': 'INTEGER', 'movie_id': 'INTEGER', 'rating': 'INTEGER', 'Date': 'TEXT'},
+}
+INDICES = [
+    ('usuarios', 'Occupation'),
+    ('personas', 'Gender'),
+    ('personas', 'year of birth'),
+    ('peliculas', 'anio'),
+    ('scores', 'user_id'),
+    ('scores', 'movie_id'),
+]
+
+_ruta = None
+_conexiones = threading.local()
+
+
+def _q(nombre: str) -> str:
+    """Nombre de tabla o columna entre comillas (varias columnas tienen espacios)."""
+    return '"' + nombre.replace('"', '""') + '"'
+
+
+def esquema() -> str:
+    """Sentencias SQL que crean las tablas, las claves foráneas y los índices."""
+    sentencias = []
+    for tabla, columnas in COLUMNAS.items():
+        definiciones = [f'{_q(col)} {tipo}' + (' PRIMARY KEY' if col == 'id' else '')
+                        for col, tipo in columnas.items()]
+        definiciones += [f'FOREIGN KEY ({_q(col_hija)}) REFERENCES {_q(padre)} ({_q(col_padre)}) '
+                         'ON DELETE CASCADE'
+                         for padre, col_padre, hija, col_hija in RELACIONES if hija == tabla]
+        sentencias.append(f'CREATE TABLE IF NOT EXISTS {_q(tabla)} ({", ".join(definiciones)})')
+    sentencias.append('CREATE TABLE IF NOT EXISTS generos_peliculas ('
+                      'genero TEXT, movie_id INTEGER REFERENCES peliculas (id) ON DELETE CASCADE, '
+                      'PRIMARY KEY (genero, movie_id)) WITHOUT ROWID')
+    sentencias.append('CREATE INDEX IF NOT EXISTS generos_peliculas_movie_id ON generos_peliculas (movie_id)')
+    for tabla, columna in INDICES:
+        nombre = f"{tabla}_{columna.replace(' ', '_').lower()}"
+        sentencias.append(f'CREATE INDEX IF NOT EXISTS {_q(nombre)} ON {_q(tabla)} ({_q(columna)})')
+    return ';\n'.join(sentencias) + ';'
+
+
+def conectar(ruta) -> None:
+    """Abre (o crea) la base de datos SQLite que usan las clases de este módulo."""
+    global _ruta
+    _ruta = str(ruta)
+    _conexiones.__dict__.clear()
+    conexion = conexion_actual()
+    conexion.execute('PRAGMA journal_mode = WAL')
+    conexion.executescript(esquema())
+
+
+def conexion_actual() -> sqlite3.Connection:
+    """Conexión del hilo actual (SQLite no comparte una conexión entre hilos)."""
+    if _ruta is None:
+        raise RuntimeError("No hay una base de datos SQLite abierta; se abre con conectar(ruta).")
+    conexion = getattr(_conexiones, 'conexion', None)
+    if conexion is None:
+        conexion = sqlite3.connect(_ruta, check_same_thread=False)
+        conexion.row_factory = sqlite3.Row
+        conexion.execute('PRAGMA foreign_keys = ON')
+        # con WAL, synchronous FULL sincroniza a disco cada transacción confirmada
+        conexion.execute('PRAGMA synchronous = FULL')
+        _conexiones.conexion = conexion
+    return conexion
+
+
+def _anio(fecha):
+    anio = anio_estreno(pd.Series([fecha]))[0]
+    return None if pd.isna(anio) else int(anio)
+
+
+def _a_sql(valor):
+    # sqlite3 no acepta tipos de numpy ni NaN
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and np.isnan(valor):
+        return None
+    return valor
+
+
+def importar(df_personas, df_trabajadores, df_usuarios, df_peliculas, df_scores) -> None:
+    """Pasa a la base las cinco tablas, en el mismo orden que load_all (que ya las deja
+    consistentes). Todo se inserta en una única transacción."""
+    df_peliculas = df_peliculas.assign(anio=anio_estreno(df_peliculas['Release Date']).astype('Int64'))
+    generos = [(genero, id_pelicula) for genero in GENEROS if genero in df_peliculas.columns
+               for id_pelicula in df_peliculas.loc[df_peliculas[genero].astype(bool), 'id'].tolist()]
+    conexion = conexion_actual()
+    with conexion:
+        for tabla, df in [('personas', df_personas), ('usuarios', df_usuarios),
+                          ('trabajadores', df_trabajadores), ('peliculas', df_peliculas),
+                          ('scores', df_scores)]:
+            # las fechas se guardan como texto, con el formato de los archivos
+            df = a_texto(df)
+            columnas = list(COLUMNAS[tabla])
+            filas = df[columnas].astype(object).where(df[columnas].notna(), None)
+            conexion.executemany(
+                f'INSERT INTO {_q(tabla)} ({", ".join(map(_q, columnas))}) '
+                f'VALUES ({", ".join("?" * len(columnas))})',
+                [tuple(map(_a_sql, fila)) for fila in filas.itertuples(index=False, name=None)])
+        conexion.executemany('INSERT INTO generos_peliculas (genero, movie_id) VALUES (?, ?)', generos)
+
+
+class TablaSQLite:
+    """Implementación sobre SQLite de las operaciones de DataBase.
+
+    Se combina con una clase de johann_clases (por ejemplo
+    class PersonasSQLite(TablaSQLite, Personas)), que aporta los campos, la
+    conversión a objetos y la validación de tipos. Las etiquetas de las filas
+    son sus ids, así que get_index solo confirma que el id exista.
+    """
+    _tabla = None
+    # índice de duplicados armado en la primera alta o modificación
+    _duplicados = None
+
+    @classmethod
+    def _columnas(self) -> list:
+        return [col for col in COLUMNAS[self._tabla] if col != 'anio']
+
+    @classmethod
+    def _fila(self, index):
+        return conexion_actual().execute(
+            f'SELECT * FROM {_q(self._tabla)} WHERE id = ?', (_a_sql(index),)).fetchone()
+
+    @classmethod
+    def _a_elemento(self, fila: sqlite3.Row) -> dict:
+        return {col: fila[col] for col in self._columnas()}
+
+    @classmethod
+    def read(self) -> None:
+        """Las filas se leen de la base a medida que se consultan; no hay nada que cargar."""
+        conexion_actual()
+
+    @classmethod
+    @instrumentado(por_clase=True)
+    @escritura
+    def write(self) -> None:
+        """Cada operación ya queda guardada al terminar; solo se vuelca el WAL al archivo principal."""
+        conexion_actual().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        print("Base de datos guardada exitosamente.")
+
+    @classmethod
+    def enable_journal(self, dir_journal=None, grupo: int = 64) -> None:
+        print("La base de datos SQLite ya registra cada cambio en su propio journal.")
+
+    @classmethod
+    def compact(self, background: bool = True) -> None:
+        conexion_actual().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    @classmethod
+    @lectura
+    def get_index(self, id):
+        """Obtiene el indice (que es el mismo id) del elemento, o None si no existe."""
+        return None if self._fila(id) is None else _a_sql(id)
+
+    @classmethod
+    @lectura
+    def snapshot(self) -> pd.DataFrame:
+        """Toda la tabla como DataFrame (por ejemplo para EstadisticasScores o save_all)."""
+        df = pd.read_sql_query(f'SELECT * FROM {_q(self._tabla)} ORDER BY id', conexion_actual())
+        return df[self._columnas()]
+
+    @classmethod
+    def _indice_duplicados(self) -> IndiceDuplicados:
+        if self._duplicados is None:
+            columnas = ', '.join(_q(col) for col in ('id',) + self._columnas_similitud)
+            df = pd.read_sql_query(f'SELECT {columnas} FROM {_q(self._tabla)}', conexion_actual(),
+                                   index_col='id')
+            self._duplicados = IndiceDuplicados(df, self._columnas_similitud)
+        return self._duplicados
+
+    @classmethod
+    def _similares(self, element: dict, excluir=None) -> list:
+        if self._columnas_similitud is None:
+            return []
+        return [etiqueta for etiqueta, _ in self._indice_duplicados().similares(element, excluir=excluir)]
+
+    @classmethod
+    def _motivo_similares(self, etiquetas: list) -> str:
+        ids = ', '.join(str(id) for id in etiquetas)
+        return f"Se encontraron entradas similares en la base de datos (ids: {ids})."
+
+    @classmethod
+    def _motivo(self, element: dict, index=None):
+        """Motivo por el que no se puede guardar element (ignorando la fila index), o None."""
+        if element.get('id') is not None and element['id'] != index:
+            existente = self._fila(element['id'])
+            if existente is not None:
+                if self._a_elemento(existente) == element:
+                    return "El elemento ya está presente en la base de datos."
+                return "El id ya está asignado en la base de datos."
+        similares = self._similares(element, excluir=index)
+        if similares:
+            return self._motivo_similares(similares)
+        return self._motivo_externo(element)
+
+    @classmethod
+    def _guardar(self, element: dict, index=None):
+        """Inserta element (o reemplaza la fila index) y devuelve su id."""
+        conexion = conexion_actual()
+        fila = self._fila_sql(element)
+        columnas = list(fila)
+        valores = [_a_sql(fila[col]) for col in columnas]
+        with conexion:
+            if index is None:
+                cursor = conexion.execute(
+                    f'INSERT INTO {_q(self._tabla)} ({", ".join(map(_q, columnas))}) '
+                    f'VALUES ({", ".join("?" * len(columnas))})', valores)
+                id = cursor.lastrowid if element.get('id') is None else element['id']
+            else:
+                conexion.execute(
+                    f'UPDATE {_q(self._tabla)} SET {", ".join(f"{_q(col)} = ?" for col in columnas)} '
+                    'WHERE id = ?', valores + [_a_sql(index)])
+                id = element['id'] if element.get('id') is not None else index
+            self._guardar_extras(conexion, id, element)
+        if self._duplicados is not None:
+            if index is not None:
+                self._duplicados.quitar(index)
+            self._duplicados.agregar(id, element)
+        self._al_modificar()
+        return id
+
+    @classmethod
+    def _fila_sql(self, element: dict) -> dict:
+        """Columnas de la tabla SQL para un elemento en el formato de la base de datos."""
+        return element
+
+    @classmethod
+    def _guardar_extras(self, conexion, id, element: dict) -> None:
+        """Tablas asociadas a la fila (por ejemplo, los géneros de una película)."""
+        return
+
+    @classmethod
+    def _validar_campos(self, element: dict) -> bool:
+        for col in element:
+            if col not in self._columnas():
+                print(f"El campo '{col}' no está presente en la base de datos.")
+                return False
+        return True
+
+    @classmethod
+    @instrumentado(filas=una_fila, por_clase=True)
+    @escritura
+    def new(self, element: dict) -> None:
+        """Crear un nuevo elemento en la base de datos. Si no tiene id, la base le asigna uno.
+        Args:
+            element (dict): Diccionario con los campos del nuevo elemento.
+        """
+        element = self.to_class(element=element)
+        if not self._validar_campos(element):
+            return
+        motivo = self._motivo(element)
+        if motivo is not None:
+            print(motivo)
+            return
+        try:
+            self._guardar(element)
+        except sqlite3.IntegrityError as e:
+            print(f"La base de datos rechazó el elemento: {e}")
+            return
+        print("Elemento creado exitosamente.")
+
+    @classmethod
+    @instrumentado(filas=una_fila, por_clase=True)
+    @escritura
+    def update(self, index: int, element: dict) -> None:
+        """Actualiza el elemento indicado por index de la base de datos.
+        Args:
+            index (int): indice del elemento a actualizar. Debe estar presente en la base de datos.
+            element (dict): diccionario con los campos a actualizar.
+        """
+        if self._fila(index) is None:
+            print("El elemento no está presente en la base de datos.")
+            return
+        element = self.to_class(element=element)
+        if not self._validar_campos(element):
+            return
+        motivo = self._motivo(element, index)
+        if motivo is not None:
+            print(motivo)
+            return
+        try:
+            self._guardar(element, index)
+        except sqlite3.IntegrityError as e:
+            print(f"La base de datos rechazó el elemento: {e}")
+            return
+        print("Elemento actualizado exitosamente.")
+
+    @classmethod
+    @instrumentado(filas=lambda _, cls, elements, *args, **kwargs: len(elements), por_clase=True)
+    @escritura
+    def new_many(self, elements, conflicto: str = 'rechazar') -> pd.DataFrame:
+        """Crea un lote de elementos con las mismas formas de resolver conflictos que
+        DataBase.new_many ('rechazar', 'crear' o 'asociar').
+
+        Returns: reporte con una fila por elemento indicando si fue aceptado y el motivo del rechazo.
+        """
+        if conflicto not in CONFLICTOS:
+            raise ValueError(f"El conflicto debe resolverse con una de {CONFLICTOS}")
+        if isinstance(elements, pd.DataFrame):
+            elements = elements.to_dict('records')
+
+        reporte = []
+        for posicion, element in enumerate(elements):
+            if not set(element) <= set(self._columnas()):
+                element = self.to_class(element={'id': None, **element})
+            index = None
+            if conflicto != 'rechazar':
+                existe = element.get('id') is not None and self._fila(element['id']) is not None
+                if existe and conflicto == 'crear':
+                    element = {**element, 'id': None}
+                elif existe:
+                    index = element['id']
+                elif conflicto == 'asociar':
+                    similares = self._similares(element)
+                    if similares:
+                        index = similares[0]
+                        element = {**element, 'id': index}
+            motivo = self._motivo(element, index)
+            id = element.get('id')
+            if motivo is None:
+                try:
+                    id = self._guardar(element, index)
+                except sqlite3.IntegrityError as e:
+                    motivo = f"La base de datos rechazó el elemento: {e}"
+            reporte.append({'fila': posicion, 'id': id, 'aceptado': motivo is None, 'motivo': motivo})
+        return pd.DataFrame({
+            'fila': range(len(reporte)),
+            'id': pd.Series([fila['id'] for fila in reporte], dtype=object),
+            'aceptado': [fila['aceptado'] for fila in reporte],
+            'motivo': pd.Series([fila['motivo'] for fila in reporte], dtype=object),
+        })
+
+    @classmethod
+    @instrumentado(filas=una_fila, por_clase=True)
+    @lectura
+    def get(self, index=None):
+        """Obtiene un elemento de la base de datos indicado por index (el de mayor id si es None).
+
+        Returns: retorna un objeto de la clase.
+        """
+        if index is None:
+            index = conexion_actual().execute(f'SELECT MAX(id) FROM {_q(self._tabla)}').fetchone()[0]
+        fila = self._fila(index)
+        if fila is None:
+            print("El elemento no está presente en la base de datos.")
+            return
+        return self.from_dict(data=self._datos(fila))
+
+    @classmethod
+    def _datos(self, fila: sqlite3.Row) -> dict:
+        """Fila con las columnas de la tabla original (para from_dict)."""
+        return self._a_elemento(fila)
+
+    @classmethod
+    @instrumentado(filas=lambda resultado, *_: len(resultado), por_clase=True)
+    @lectura
+    def get_many(self, indices: list) -> list:
+        """Obtiene varios elementos de la base de datos con una sola consulta.
+
+        Returns: lista de diccionarios con las columnas de la tabla (None para los indices
+            que no están en la base de datos).
+        """
+        indices = [_a_sql(index) for index in indices]
+        filas = {}
+        conexion = conexion_actual()
+        # SQLite admite a lo sumo 999 parámetros por sentencia
+        for desde in range(0, len(indices), 900):
+            parte = indices[desde:desde + 900]
+            for fila in conexion.execute(f'SELECT * FROM {_q(self._tabla)} WHERE id IN '
+                                         f'({", ".join("?" * len(parte))})', parte):
+                filas[fila['id']] = self._datos(fila)
+        if len(filas) < len(set(indices)):
+            print("Algunos elementos no están presentes en la base de datos.")
+        return [filas.get(index) for index in indices]
+
+    @classmethod
+    @lectura
+    def filtrar(self, **condiciones) -> list:
+        """Elementos cuyos campos cumplen las condiciones, resueltas con los índices de la base.
+        Cada condición es campo=valor, o campo=(desde, hasta) para un rango (ambos incluidos).
+        Por ejemplo PersonasSQLite.filtrar(gender='F', year_of_birth=(1970, 1979)).
+
+        Returns: lista de objetos de la clase.
+        """
+        where, parametros = [], []
+        for campo, valor in condiciones.items():
+            if campo not in self._campos:
+                raise ValueError(f"El campo '{campo}' no está presente en la base de datos.")
+            columna = _q(self._campos[campo])
+            if isinstance(valor, (tuple, list)):
+                where.append(f'{columna} BETWEEN ? AND ?')
+                parametros += [_a_sql(valor[0]), _a_sql(valor[1])]
+            else:
+                where.append(f'{columna} = ?')
+                parametros.append(_a_sql(valor))
+        consulta = f'SELECT * FROM {_q(self._tabla)}'
+        if where:
+            consulta += ' WHERE ' + ' AND '.join(where)
+        filas = conexion_actual().execute(consulta + ' ORDER BY id', parametros).fetchall()
+        return [self.from_dict(data=self._datos(fila)) for fila in filas]
+
+    @classmethod
+    @instrumentado(filas=una_fila, por_clase=True)
+    @escritura
+    def delete(self, index: int) -> None:
+        """Elimina un elemento de la base de datos indicado por index. Las filas de otras
+        tablas que lo referencian se borran en cascada.
+        """
+        conexion = conexion_actual()
+        with conexion:
+            borradas = conexion.execute(f'DELETE FROM {_q(self._tabla)} WHERE id = ?',
+                                        (_a_sql(index),)).rowcount
+        if not borradas:
+            print("El elemento no está presente en la base de datos.")
+            return
+        if self._duplicados is not None:
+            self._duplicados.quitar(index)
+        self._al_modificar()
+        print("Elemento eliminado exitosamente.")
+
+
+class PersonasSQLite(TablaSQLite, Personas):
+    __slots__ = ()
+    _tabla = 'personas'
+    _lock = LockLecturaEscritura('PersonasSQLite')
+    _version = 0
+    _duplicados = None
+
+    def __repr__(self):
+        return f"Persona: {self.full_name}, {self.gender}, {self.year_of_birth}, {self.zip_code}"
+
+    @classmethod
+    def _filtro(self, anios=None, sexo=None) -> tuple:
+        """Condición WHERE y parámetros para los filtros de get_from_df y get_stats."""
+        where, parametros = [], []
+        if anios is not None:
+            where.append('"year of birth" BETWEEN ? AND ?')
+            parametros += [int(anios[0]), int(anios[1])]
+        if sexo is not None:
+            sexos = [sexo] if isinstance(sexo, str) else list(sexo)
+            where.append(f'Gender IN ({", ".join("?" * len(sexos))})')
+            parametros += sexos
+        return (' WHERE ' + ' AND '.join(where)) if where else '', parametros
+
+    @classmethod
+    @lectura
+    def get_from_df(self, anios=None, sexo=None) -> list:
+        """Busca personas por año de nacimiento y sexo (ver Personas.get_from_df)."""
+        where, parametros = self._filtro(anios, sexo)
+        filas = conexion_actual().execute(f'SELECT * FROM personas{where} ORDER BY id', parametros).fetchall()
+        return [self.from_dict(data=self._datos(fila)) for fila in filas]
+
+    @classmethod
+    @lectura
+    def get_stats(self, anios=None, sexo=None, graficar=False):
+        """Imprime la cantidad de personas que cumplen los filtros, con consultas agregadas
+        en la base (ver Personas.get_stats).
+
+        Returns: tupla (cantidad por año de nacimiento, cantidad por sexo).
+        """
+        where, parametros = self._filtro(anios, sexo)
+        conexion = conexion_actual()
+        por_sexo = pd.Series(dict(conexion.execute(
+            f'SELECT Gender, COUNT(*) AS n FROM personas{where} GROUP BY Gender ORDER BY n DESC',
+            parametros).fetchall()), dtype='int64')
+        if por_sexo.empty:
+            print("No hay personas que cumplan los filtros.")
+            return None
+        por_anio = pd.Series(dict(conexion.execute(
+            f'SELECT "year of birth", COUNT(*) FROM personas{where} GROUP BY "year of birth" '
+            'ORDER BY "year of birth"', parametros).fetchall()), dtype='int64')
+        print(f"Cantidad de personas: {por_sexo.sum()}")
+
+        if graficar:
+            import matplotlib.pyplot as plt
+            fig, (ax_anio, ax_sexo) = plt.subplots(1, 2, figsize=(14, 4))
+            por_anio.plot.bar(ax=ax_anio, title='Personas por año de nacimiento')
+            por_sexo.plot.bar(ax=ax_sexo, title='Personas por sexo')
+            plt.tight_layout()
+            plt.show()
+        return por_anio, por_sexo
+
+
+class UsuariosSQLite(TablaSQLite, Usuarios):
+    __slots__ = ()
+    _tabla = 'usuarios'
+    _lock = LockLecturaEscritura('UsuariosSQLite')
+    _version = 0
+
+    @classmethod
+    def _tablas_relacionadas(self) -> list:
+        return [PersonasSQLite]
+
+    @classmethod
+    def _motivo_externo(self, element: dict):
+        """Se chequea en la tabla de personas que el id esté asignado a una persona."""
+        if PersonasSQLite._fila(element['id']) is None:
+            return "El id no está asignado a ninguna persona."
+        return None
+
+    @classmethod
+    def _filtro(self, ocupaciones=None) -> tuple:
+        if ocupaciones is None:
+            return '', []
+        ocupaciones = [ocupaciones] if isinstance(ocupaciones, str) else list(ocupaciones)
+        return f' WHERE Occupation IN ({", ".join("?" * len(ocupaciones))})', ocupaciones
+
+    @classmethod
+    @lectura
+    def get_from_df(self, ocupaciones=None) -> list:
+        """Busca usuarios por ocupación (ver Usuarios.get_from_df)."""
+        where, parametros = self._filtro(ocupaciones)
+        filas = conexion_actual().execute(f'SELECT * FROM usuarios{where} ORDER BY id', parametros).fetchall()
+        return [self.from_dict(data=self._datos(fila)) for fila in filas]
+
+    @classmethod
+    @lectura
+    def get_stats(self, ocupaciones=None, graficar=False):
+        """Imprime la cantidad de usuarios con las ocupaciones indicadas, con consultas
+        agregadas en la base (ver Usuarios.get_stats).
+
+        Returns: tupla (cantidad por ocupación, cantidad por año de alta).
+        """
+        where, parametros = self._filtro(ocupaciones)
+        conexion = conexion_actual()
+        por_ocupacion = pd.Series(dict(conexion.execute(
+            f'SELECT Occupation, COUNT(*) AS n FROM usuarios{where} GROUP BY Occupation ORDER BY n DESC',
+            parametros).fetchall()), dtype='int64')
+        if por_ocupacion.empty:
+            print("No hay usuarios que cumplan los filtros.")
+            return None
+        por_anio = pd.Series(dict(conexion.execute(
+            f'SELECT CAST(substr("Active Since", 1, 4) AS INTEGER) AS anio, COUNT(*) FROM usuarios{where}'
+            f'{" AND" if where else " WHERE"} "Active Since" IS NOT NULL GROUP BY anio ORDER BY anio',
+            parametros).fetchall()), dtype='int64')
+        print(f"Cantidad de usuarios: {por_ocupacion.sum()}")
+
+        if graficar:
+            import matplotlib.pyplot as plt
+            fig, (ax_ocupacion, ax_anio) = plt.subplots(1, 2, figsize=(14, 4))
+            por_ocupacion.plot.bar(ax=ax_ocupacion, title='Usuarios por ocupación')
+            por_anio.plot.bar(ax=ax_anio, title='Usuarios por año de alta')
+            plt.tight_layout()
+            plt.show()
+        return por_ocupacion, por_anio
+
+
+class PeliculasSQLite(TablaSQLite, Peliculas):
+    __slots__ = ()
+    _tabla = 'peliculas'
+    _lock = LockLecturaEscritura('PeliculasSQLite')
+    _version = 0
+
+    @classmethod
+    def to_class(self, element: dict) -> dict:
+        # los géneros van a generos_peliculas y no son columnas de la tabla
+        return {
+            'id': element['id'],
+            'Name': element['name'],
+            'Release Date': element['release_date'],
+            'IMDB URL': element['imdb_url'],
+            'generos': list(element.get('genres') or []),
+        }
+
+    @classmethod
+    def _columnas(self) -> list:
+        return ['id', 'Name', 'Release Date', 'IMDB URL', 'generos']
+
+    @classmethod
+    def _a_elemento(self, fila: sqlite3.Row) -> dict:
+        generos = [g for (g,) in conexion_actual().execute(
+            'SELECT genero FROM generos_peliculas WHERE movie_id = ?', (fila['id'],))]
+        return {'id': fila['id'], 'Name': fila['Name'], 'Release Date': fila['Release Date'],
+                'IMDB URL': fila['IMDB URL'], 'generos': sorted(generos, key=GENEROS.index)}
+
+    @classmethod
+    def _datos(self, fila: sqlite3.Row) -> dict:
+        elemento = self._a_elemento(fila)
+        generos = elemento.pop('generos')
+        return {**elemento, **{genero: int(genero in generos) for genero in GENEROS}}
+
+    @classmethod
+    def _fila_sql(self, element: dict) -> dict:
+        fila = {col: valor for col, valor in element.items() if col != 'generos'}
+        return {**fila, 'anio': _anio(element['Release Date'])}
+
+    @classmethod
+    def _guardar_extras(self, conexion, id, element: dict) -> None:
+        conexion.execute('DELETE FROM generos_peliculas WHERE movie_id = ?', (id,))
+        conexion.executemany('INSERT INTO generos_peliculas (genero, movie_id) VALUES (?, ?)',
+                             [(genero, id) for genero in element['generos']])
+
+    @classmethod
+    def _filtro(self, nombre=None, anios=None, generos=None, todos_los_generos=True) -> tuple:
+        """Condición WHERE y parámetros para los filtros de get_from_df y get_stats."""
+        where, parametros = [], []
+        if anios is not None:
+            where.append('anio BETWEEN ? AND ?')
+            parametros += [int(anios[0]), int(anios[1])]
+        if generos:
+            desconocidos = [g for g in generos if g not in GENEROS]
+            if desconocidos:
+                raise ValueError(f"El género '{desconocidos[0]}' no existe.")
+            where.append('id IN (SELECT movie_id FROM generos_peliculas WHERE genero IN '
+                         f'({", ".join("?" * len(generos))}) GROUP BY movie_id'
+                         + (' HAVING COUNT(*) = ?)' if todos_los_generos else ')'))
+            parametros += list(generos) + ([len(set(generos))] if todos_los_generos else [])
+        if nombre is not None:
+            # cada palabra debe ser el comienzo de alguna palabra del nombre
+            for palabra in tokens(nombre):
+                where.append("(' ' || lower(Name)) GLOB ?")
+                parametros.append(f'*[^a-z0-9]{palabra}*')
+        return (' WHERE ' + ' AND '.join(where)) if where else '', parametros
+
+    @classmethod
+    @lectura
+    def get_from_df(self, id=None, nombre=None, anios=None, generos=None, todos_los_generos=True) -> list:
+        """Busca películas combinando los filtros indicados (ver Peliculas.get_from_df).
+
+        Returns: lista de objetos PeliculasSQLite.
+        """
+        where, parametros = self._filtro(nombre, anios, generos, todos_los_generos)
+        if id is not None:
+            where += (' AND ' if where else ' WHERE ') + 'id = ?'
+            parametros.append(_a_sql(id))
+        filas = conexion_actual().execute(
+            f'SELECT * FROM peliculas{where} ORDER BY id', parametros).fetchall()
+        return [self.from_dict(data=self._datos(fila)) for fila in filas]
+
+    @classmethod
+    @lectura
+    def get_stats(self, anios=None, generos=None, todos_los_generos=True, graficar=False):
+        """Imprime estadísticas de las películas que cumplen los filtros, calculadas con
+        consultas agregadas en la base (ver Peliculas.get_stats).
+
+        Returns: tupla (cantidad por año, cantidad por género).
+        """
+        where, parametros = self._filtro(anios=anios, generos=generos, todos_los_generos=todos_los_generos)
+        conexion = conexion_actual()
+        cantidad = conexion.execute(f'SELECT COUNT(*) FROM peliculas{where}', parametros).fetchone()[0]
+        if cantidad == 0:
+            print("No hay películas que cumplan los filtros.")
+            return None
+
+        por_anio = pd.Series(dict(conexion.execute(
+            f'SELECT anio, COUNT(*) FROM peliculas{where}{" AND" if where else " WHERE"} anio IS NOT NULL '
+            'GROUP BY anio ORDER BY anio', parametros).fetchall()), dtype='int64')
+        conteos = dict(conexion.execute(
+            f'SELECT genero, COUNT(*) FROM generos_peliculas WHERE movie_id IN (SELECT id FROM peliculas{where}) '
+            'GROUP BY genero', parametros).fetchall())
+        por_genero = pd.Series([conteos.get(genero, 0) for genero in GENEROS], index=GENEROS)
+
+        extremos = conexion.execute(
+            f'SELECT (SELECT id FROM peliculas{where}{" AND" if where else " WHERE"} anio IS NOT NULL '
+            'ORDER BY anio, id LIMIT 1), '
+            f'(SELECT id FROM peliculas{where}{" AND" if where else " WHERE"} anio IS NOT NULL '
+            'ORDER BY anio DESC, id LIMIT 1)', parametros * 2).fetchone()
+        if extremos[0] is not None:
+            print(f"Película más vieja: {self.from_dict(data=self._datos(self._fila(extremos[0])))}")
+            print(f"Película más nueva: {self.from_dict(data=self._datos(self._fila(extremos[1])))}")
+        print(f"Cantidad de películas: {cantidad}")
+
+        if graficar:
+            import matplotlib.pyplot as plt
+            fig, (ax_anio, ax_genero) = plt.subplots(1, 2, figsize=(14, 4))
+            por_anio.plot.bar(ax=ax_anio, title='Películas por año')
+            por_genero.plot.bar(ax=ax_genero, title='Películas por género')
+            plt.tight_layout()
+            plt.show()
+        return por_anio, por_genero
+
+
+# expresión SQL de la clave de cada dimensión de EstadisticasScores, sobre scores s,
+# personas p y películas m
+_CLAVES = {
+    'usuario': 's.user_id',
+    'pelicula': 's.movie_id',
+    'anio': 'm.anio',
+    'sexo': 'p.Gender',
+    'ocupacion': 'u.Occupation',
+    'rango_etario': 'CASE WHEN CAST(substr(s.Date, 1, 4) AS INTEGER) - p."year of birth" < 0 THEN NULL ' + ' '.join(
+        f"WHEN CAST(substr(s.Date, 1, 4) AS INTEGER) - p.\"year of birth\" < {limite} THEN '{rango}'"
+        for limite, rango in zip(LIMITES_ETARIOS[1:], RANGOS_ETARIOS)) + f" ELSE '{RANGOS_ETARIOS[-1]}' END",
+}
+
+
+@instrumentado(filas=lambda resultado, *_: len(resultado))
+def resumen_scores(dimension: str) -> pd.DataFrame:
+    """Cantidad, promedio y desvío de las calificaciones por clave de una dimensión,
+    calculados con una consulta agregada en la base (ver EstadisticasScores.resumen)."""
+    if dimension not in DIMENSIONES:
+        raise ValueError(f"La dimensión debe ser una de {DIMENSIONES}")
+    if dimension == 'genero':
+        consulta = ('SELECT g.genero AS clave, COUNT(*), SUM(s.rating), SUM(s.rating * s.rating) '
+                    'FROM scores s JOIN generos_peliculas g ON g.movie_id = s.movie_id GROUP BY g.genero')
+    else:
+        consulta = (f'SELECT {_CLAVES[dimension]} AS clave, COUNT(*), SUM(s.rating), '
+                    'SUM(s.rating * s.rating) FROM scores s '
+                    'JOIN usuarios u ON u.id = s.user_id JOIN personas p ON p.id = s.user_id '
+                    'JOIN peliculas m ON m.id = s.movie_id '
+                    'WHERE clave IS NOT NULL GROUP BY clave')
+    filas = conexion_actual().execute(consulta).fetchall()
+    totales = pd.DataFrame([tuple(fila) for fila in filas], columns=['clave', 'n', 'suma', 'cuadrados'])
+    promedio = totales['suma'] / totales['n']
+    desvio = np.sqrt(np.maximum(totales['cuadrados'] / totales['n'] - promedio ** 2, 0.0))
+    return pd.DataFrame({'cantidad': totales['n'].to_numpy(), 'promedio': promedio.to_numpy(),
+                         'desvio': desvio.to_numpy()}, index=totales['clave'].to_numpy())
+
+
+def main():
+    from initializationFunctions import load_all
+
+    parser = argparse.ArgumentParser(description='Pasa las tablas de CSV/parquet/feather a una base SQLite.')
+    parser.add_argument('--directorio', default='.')
+    parser.add_argument('--extension', default='csv')
+    parser.add_argument('--salida', default='datos.db')
+    args = parser.parse_args()
+
+    if Path(args.salida).exists():
+        parser.error(f"La base '{args.salida}' ya existe.")
+    directorio = Path(args.directorio)
+    tablas = load_all(*[directorio / f'{tabla}.{args.extension}'
+                        for tabla in ['personas', 'trabajadores', 'usuarios', 'peliculas', 'scores']])
+    conectar(args.salida)
+    importar(*tablas)
+    print(f"Base de datos SQLite guardada en {args.salida}")
+
+
+if __name__ == '__main__':
+    main()
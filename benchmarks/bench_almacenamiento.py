@@ -0,0 +1,77 @@
+"""Compara el arranque en frío de load_all leyendo CSV contra los formatos columnares.
+
+Cada medición corre en un proceso nuevo para que el tiempo y el pico de memoria
+(RSS) no se vean afectados por cachés del proceso anterior. Además del pico, se
+informa cuánto crece el RSS actual (/proc/self/statm) con las tablas cargadas.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_almacenamiento [--repeticiones N]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from initializationFunctions import load_all, save_all
+
+RAIZ = Path(__file__).resolve().parent.parent
+TABLAS = ['personas', 'trabajadores', 'usuarios', 'peliculas', 'scores']
+
+# código que corre el proceso hijo: importa todo, mide y reporta en JSON
+# (ru_maxrss es el pico de toda la vida del proceso, así que la memoria propia de load_all se
+# mide con el RSS actual antes y después, manteniendo las tablas vivas)
+HIJO = """
+import json, os, resource, sys, time
+import pandas, pyarrow
+from initializationFunctions import load_all
+def rss_kb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+rss_antes = rss_kb()
+inicio = time.perf_counter()
+tablas = load_all(*sys.argv[1:])
+segundos = time.perf_counter() - inicio
+rss_despues = rss_kb()
+rss_pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({'segundos': segundos, 'rss_antes_kb': rss_antes, 'rss_despues_kb': rss_despues,
+                  'rss_pico_kb': rss_pico}))
+"""
+
+
+def archivos(directorio: Path, extension: str) -> list:
+    return [str(directorio / f'{tabla}.{extension}') for tabla in TABLAS]
+
+
+def medir(rutas: list) -> dict:
+    salida = subprocess.run([sys.executable, '-c', HIJO, *rutas], cwd=RAIZ,
+                            capture_output=True, text=True, check=True)
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    tablas = load_all(*[str(RAIZ / f'{tabla}.csv') for tabla in TABLAS])
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        formatos = {'csv': archivos(RAIZ, 'csv')}
+        for extension in ['parquet', 'feather']:
+            if save_all(*tablas, *archivos(tmp, extension)) == 0:
+                formatos[extension] = archivos(tmp, extension)
+
+        print(f"{'formato':<10}{'tiempo (ms)':>14}{'RSS pico (MB)':>16}{'RSS load_all (MB)':>20}")
+        for extension, rutas in formatos.items():
+            mediciones = [medir(rutas) for _ in range(args.repeticiones)]
+            segundos = statistics.median(m['segundos'] for m in mediciones)
+            pico = statistics.median(m['rss_pico_kb'] for m in mediciones) / 1024
+            propio = statistics.median(m['rss_despues_kb'] - m['rss_antes_kb'] for m in mediciones) / 1024
+            print(f'{extension:<10}{segundos * 1000:>14.1f}{pico:>16.1f}{propio:>20.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Mide el tiempo de arranque: cuánto tarda importar cada módulo y cuánto pasa hasta la primera consulta.
+
+Cada medición corre en un proceso nuevo (como un script o un worker de corta
+vida) y se repite varias veces; se informa la mediana. Además del tiempo
+medido dentro del proceso se informa el total visto desde afuera, que incluye
+levantar el intérprete.
+
+Escenarios de primera consulta (buscar una persona por id):
+    load_all        lee y limpia las cinco tablas y arma las estadísticas
+    load_lazy       lee solo la tabla de personas
+    Personas        carga la clase Personas desde el archivo
+    PersonasSQLite  abre una base SQLite ya armada (no depende del tamaño de la tabla)
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_arranque [--repeticiones 5] [--escala 10] [--salida arranque.json]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+TABLAS = ['personas', 'trabajadores', 'usuarios', 'peliculas', 'scores']
+MODULOS = ['metricas', 'estadisticas', 'johann_clases', 'individuos', 'initializationFunctions',
+           'base_sqlite', 'servicio']
+
+# cada escenario: (código que prepara la consulta, código de la consulta). {rutas} son los cinco
+# archivos en el orden de load_all, {directorio} la carpeta de los datos y {id} el id buscado
+ESCENARIOS = {
+    'load_all': ('from initializationFunctions import load_all\n'
+                 'df_personas = load_all(*{rutas})[0]',
+                 'df_personas.loc[df_personas["id"] == {id}].iloc[0]'),
+    'load_lazy': ('from initializationFunctions import load_lazy\n'
+                  'tablas = load_lazy(*{rutas})',
+                  'tablas.personas.loc[tablas.personas["id"] == {id}].iloc[0]'),
+    'Personas': ('from johann_clases import Personas\n'
+                 'Personas(dir_database={rutas}[0])',
+                 'Personas.get(Personas.get_index({id}))'),
+    'PersonasSQLite': ('from base_sqlite import PersonasSQLite, conectar\n'
+                       'conectar({directorio!r} + "/datos.db")',
+                       'PersonasSQLite.get(PersonasSQLite.get_index({id}))'),
+}
+
+PLANTILLA = """
+import contextlib, io, json, time
+inicio = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+{preparar}
+    preparado = time.perf_counter()
+    resultado = {consultar}
+fin = time.perf_counter()
+assert resultado is not None
+print(json.dumps({{'preparar': preparado - inicio, 'consulta': fin - preparado, 'total': fin - inicio}}))
+"""
+
+
+def _sangrar(codigo: str) -> str:
+    return '\n'.join('    ' + linea for linea in codigo.splitlines())
+
+
+def correr(codigo: str) -> dict:
+    """Corre codigo en un intérprete nuevo; devuelve lo que imprime (JSON) y el tiempo total."""
+    inicio = time.perf_counter()
+    salida = subprocess.run([sys.executable, '-c', codigo], cwd=RAIZ, stdout=subprocess.PIPE,
+                            text=True, check=True)
+    medicion = json.loads(salida.stdout.strip().splitlines()[-1])
+    medicion['proceso'] = time.perf_counter() - inicio
+    return medicion
+
+
+def medianas(mediciones: list) -> dict:
+    return {clave: statistics.median(m[clave] for m in mediciones) for clave in mediciones[0]}
+
+
+def preparar_datos(directorio: Path, escala, extension: str) -> list:
+    """Escribe los datos (los originales o sintéticos a la escala pedida) y la base SQLite."""
+    from base_sqlite import conectar, importar
+    from initializationFunctions import load_all, save_all
+
+    rutas = [str(directorio / f'{tabla}.{extension}') for tabla in TABLAS]
+    if escala is None:
+        tablas = load_all(*[RAIZ / f'{tabla}.csv' for tabla in TABLAS])
+    else:
+        from sinteticos import generar_escala
+        tablas = generar_escala(escala, semilla=0)
+    save_all(*tablas, *rutas)
+    conectar(directorio / 'datos.db')
+    importar(*load_all(*rutas))
+    return rutas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--escala', type=float, help='usar datos sintéticos en lugar de los originales')
+    parser.add_argument('--extension', default='csv')
+    parser.add_argument('--id', type=int, default=15)
+    parser.add_argument('--salida')
+    args = parser.parse_args()
+
+    resultados = {'importar': {}, 'primera_consulta': {}}
+    print(f"{'importar':<26}{'dentro (ms)':>14}{'proceso (ms)':>14}")
+    for modulo in MODULOS:
+        codigo = ('import json, time\ninicio = time.perf_counter()\n'
+                  f'import {modulo}\n'
+                  "print(json.dumps({'total': time.perf_counter() - inicio}))")
+        m = medianas([correr(codigo) for _ in range(args.repeticiones)])
+        resultados['importar'][modulo] = m
+        print(f"{modulo:<26}{m['total'] * 1000:>14.1f}{m['proceso'] * 1000:>14.1f}")
+
+    with tempfile.TemporaryDirectory() as directorio:
+        import contextlib
+        import io
+        with contextlib.redirect_stdout(io.StringIO()):
+            rutas = preparar_datos(Path(directorio), args.escala, args.extension)
+        print(f"\n{'primera consulta':<26}{'preparar (ms)':>14}{'consulta (ms)':>14}"
+              f"{'dentro (ms)':>14}{'proceso (ms)':>14}")
+        for nombre, (preparar, consultar) in ESCENARIOS.items():
+            valores = {'rutas': rutas, 'directorio': directorio, 'id': args.id}
+            codigo = PLANTILLA.format(preparar=_sangrar(preparar.format(**valores)),
+                                      consultar=consultar.format(**valores))
+            m = medianas([correr(codigo) for _ in range(args.repeticiones)])
+            resultados['primera_consulta'][nombre] = m
+            print(f"{nombre:<26}{m['preparar'] * 1000:>14.1f}{m['consulta'] * 1000:>14.1f}"
+                  f"{m['total'] * 1000:>14.1f}{m['proceso'] * 1000:>14.1f}")
+
+    if args.salida:
+        Path(args.salida).write_text(json.dumps(resultados, indent=2))
+        print(f"\nResultados guardados en {args.salida}")
+
+
+if __name__ == '__main__':
+    main()
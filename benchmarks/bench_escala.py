@@ -0,0 +1,324 @@
+"""Mide load_all, save_all (completo e incremental), make_consitent, el CRUD de DataBase, las
+altas y bajas de personas, las estadísticas de scores y las consultas por fecha y demográficas a
+varias escalas de los datos, y compara contra una base guardada.
+
+Para cada escala se generan datos sintéticos (sinteticos.generar_escala) con
+escala veces las filas de los datos originales, y todas las mediciones de esa
+escala corren en un proceso nuevo, así el pico de memoria (RSS) es el propio.
+De cada operación se guarda la mediana del tiempo de pared de varias
+repeticiones y, en una pasada aparte con tracemalloc, los bytes asignados en
+el pico y los que quedan retenidos al terminar.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_escala [--escalas 1 10 100] [--salida resultados.json]
+        [--base base.json] [--tolerancia 0.2] [--guardar-base base.json]
+
+Con --base, las operaciones que tarden más que la base por encima de la
+tolerancia se informan como regresiones y el proceso termina con código 1.
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+TABLAS = ['personas', 'trabajadores', 'usuarios', 'peliculas', 'scores']
+# operaciones individuales por medición (altas, consultas, modificaciones, bajas)
+OPERACIONES = 200
+# las bajas de personas recorren los scores en cascada, así que se miden menos
+BAJAS = 20
+
+
+def medir(funcion, preparar=lambda: None, repeticiones: int = 3, operaciones: int = 1) -> dict:
+    """Mide funcion(estado), con un estado nuevo de preparar() en cada repetición.
+    preparar no entra en la medición."""
+    tiempos = []
+    for _ in range(repeticiones):
+        estado = preparar()
+        inicio = time.perf_counter()
+        funcion(estado)
+        tiempos.append(time.perf_counter() - inicio)
+
+    estado = preparar()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    funcion(estado)
+    actual, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    segundos = statistics.median(tiempos)
+    return {'segundos': segundos, 'minimo': min(tiempos), 'repeticiones': repeticiones,
+            'operaciones': operaciones, 'us_por_operacion': segundos / operaciones * 1e6,
+            'pico_mb': (pico - base) / 2 ** 20, 'retenido_mb': (actual - base) / 2 ** 20}
+
+
+def correr_escala(directorio: Path, extension: str, repeticiones: int) -> dict:
+    """Todas las mediciones de una escala (corre en el proceso hijo)."""
+    from cache_consultas import cache
+    from estadisticas import EstadisticasScores
+    from indices import avisar
+    from individuos import Persona
+    from initializationFunctions import load_all, make_consitent, save_all
+    from johann_clases import Personas
+    from ranking_scores import RankingScores
+    from serie_scores import SerieScores
+    from sinteticos import generar_personas
+    from vista_scores import VistaScores
+
+    rutas = [str(directorio / f'{tabla}.{extension}') for tabla in TABLAS]
+    resultados = {}
+    silencio = contextlib.redirect_stdout(io.StringIO())
+
+    with silencio:
+        resultados['load_all'] = medir(lambda _: load_all(*rutas), repeticiones=repeticiones)
+        personas, trabajadores, usuarios, peliculas, scores = load_all(*rutas)
+
+    # save_all completo, en un directorio nuevo cada vez, e incremental después de cambiar una
+    # persona: solo se reescribe la tabla de personas
+    guardados = iter(range(1_000_000))
+
+    def directorio_nuevo():
+        destino = directorio / f'guardado_{next(guardados)}'
+        return [destino / Path(ruta).name for ruta in rutas]
+
+    def guardar(destino):
+        destino[0].parent.mkdir()
+        save_all(personas, trabajadores, usuarios, peliculas, scores, *destino)
+    with silencio:
+        resultados['save_all'] = medir(guardar, directorio_nuevo, repeticiones)
+        incremental = directorio_nuevo()
+        guardar(incremental)
+    columna = personas.columns.get_loc('Full Name')
+    nombres = personas.iat[0, columna], personas.iat[0, columna] + ' Jr'
+
+    def cambiar_persona():
+        personas.iat[0, columna] = nombres[personas.iat[0, columna] == nombres[0]]
+        avisar(personas, personas.index[:1])
+    with silencio:
+        resultados['save_all.incremental'] = medir(
+            lambda _: save_all(personas, trabajadores, usuarios, peliculas, scores, *incremental),
+            cambiar_persona, repeticiones)
+
+    def copias():
+        return usuarios.copy(), scores.copy()
+    with silencio:
+        resultados['make_consitent'] = medir(
+            lambda dfs: make_consitent(dfs[0], dfs[1], 'user_id', 'id'), copias, repeticiones)
+
+    # CRUD de DataBase sobre la tabla de personas
+    rng = np.random.default_rng(0)
+    nuevas = generar_personas(rng, OPERACIONES)
+    nuevas['id'] += int(personas['id'].max())
+    nuevas = nuevas.rename(columns={'Full Name': 'full_name', 'year of birth': 'year_of_birth',
+                                    'Gender': 'gender', 'Zip Code': 'zip_code'}).to_dict('records')
+    etiquetas = personas.index[:OPERACIONES].tolist()
+    filas = personas.loc[etiquetas].to_dict('records')
+
+    def tabla_personas():
+        Personas.database = personas.copy()
+        # los índices se arman fuera de la medición, como después de read()
+        Personas._indice()
+        Personas._similares(filas[0])
+
+    def nuevos(_):
+        for element in nuevas:
+            Personas.new(element)
+
+    def consultas(_):
+        for etiqueta in etiquetas:
+            Personas.get(etiqueta)
+
+    def modificaciones(_):
+        for etiqueta, fila in zip(etiquetas, filas):
+            Personas.update(etiqueta, {'id': fila['id'], 'full_name': fila['Full Name'],
+                                       'year_of_birth': fila['year of birth'], 'gender': fila['Gender'],
+                                       'zip_code': str(fila['Zip Code']) + '0'})
+
+    def bajas(_):
+        for etiqueta in etiquetas:
+            Personas.delete(etiqueta)
+
+    with silencio:
+        for nombre, funcion in [('DataBase.new', nuevos), ('DataBase.get', consultas),
+                                ('DataBase.update', modificaciones), ('DataBase.delete', bajas)]:
+            resultados[nombre] = medir(funcion, tabla_personas, repeticiones, OPERACIONES)
+
+    # estadísticas de personas, calculadas con el cache de consultas vacío y devueltas del cache
+    def sin_cache():
+        tabla_personas()
+        cache.vaciar()
+
+    def estadisticas_personas(_):
+        return Personas.get_stats(anios=[1970, 1980], sexo='F')
+
+    with silencio:
+        resultados['Personas.get_stats'] = medir(estadisticas_personas, sin_cache, repeticiones)
+        resultados['Personas.get_stats.cache'] = medir(
+            lambda _: [estadisticas_personas(_) for _ in range(OPERACIONES)],
+            repeticiones=repeticiones, operaciones=OPERACIONES)
+
+    # altas y bajas con las funciones de individuos, sobre copias de las tablas
+    def tablas():
+        return personas.copy(), usuarios.copy(), trabajadores.copy(), scores.copy()
+
+    def altas(dfs):
+        for element in nuevas:
+            Persona(element['full_name'], element['zip_code'], element['year_of_birth'],
+                    element['gender']).alta_persona(dfs[0], politica='crear')
+
+    def bajas_persona(dfs):
+        for fila in filas[:BAJAS]:
+            persona = Persona(fila['Full Name'], fila['Zip Code'], fila['year of birth'], fila['Gender'])
+            persona.numero_identificacion = fila['id']
+            persona.baja_persona(*dfs)
+
+    with silencio:
+        resultados['Persona.alta_persona'] = medir(altas, tablas, repeticiones, OPERACIONES)
+        resultados['Persona.baja_persona'] = medir(bajas_persona, tablas, repeticiones, BAJAS)
+
+    # estadísticas de scores
+    resultados['EstadisticasScores'] = medir(
+        lambda _: EstadisticasScores(scores, usuarios, personas, peliculas), repeticiones=repeticiones)
+    stats = EstadisticasScores(scores, usuarios, personas, peliculas)
+    resultados['EstadisticasScores.resumen'] = medir(
+        lambda _: [stats.resumen(dimension) for dimension in stats.acumulados],
+        repeticiones=repeticiones, operaciones=len(stats.acumulados))
+    ids_usuarios = usuarios['id'].tolist()[:OPERACIONES]
+    resultados['EstadisticasScores.promedio'] = medir(
+        lambda _: [stats.promedio('usuario', id) for id in ids_usuarios],
+        repeticiones=repeticiones, operaciones=len(ids_usuarios))
+
+    # consultas por ventanas de tiempo sobre los scores ordenados por fecha
+    resultados['SerieScores'] = medir(lambda _: SerieScores(scores), repeticiones=repeticiones)
+    serie = SerieScores(scores)
+    peliculas_serie = peliculas['id'].tolist()[:OPERACIONES]
+    resultados['SerieScores.tendencias'] = medir(lambda _: serie.tendencias(7, 10), repeticiones=repeticiones)
+    resultados['SerieScores.por_dia'] = medir(lambda _: serie.por_dia(), repeticiones=repeticiones)
+    resultados['SerieScores.promedio_movil'] = medir(
+        lambda _: [serie.promedio_movil(id, '7D') for id in peliculas_serie],
+        repeticiones=repeticiones, operaciones=len(peliculas_serie))
+
+    # consultas demográficas sobre la unión cacheada de scores, usuarios, personas y películas;
+    # antes de cada consulta se avisa el cambio de un usuario, así se mide la actualización y
+    # la consulta sin el resultado guardado
+    resultados['VistaScores'] = medir(lambda _: VistaScores(scores, usuarios, personas, peliculas),
+                                      repeticiones=repeticiones)
+    vista = VistaScores(scores, usuarios, personas, peliculas)
+    resultados['VistaScores.promedios'] = medir(lambda _: vista.promedios(['movie_id', 'sexo']),
+                                                lambda: avisar(usuarios, ids_usuarios[:1]), repeticiones)
+
+    # rankings y percentiles sobre los histogramas por película, usuario y género; antes de cada
+    # consulta se agrega un score, así se mide la consulta sin el resultado guardado
+    resultados['RankingScores'] = medir(lambda _: RankingScores(scores, peliculas), repeticiones=repeticiones)
+    ranking = RankingScores(scores, peliculas)
+    primero = scores.iloc[0]
+
+    def con_cambio():
+        ranking.agregar(primero['user_id'], primero['movie_id'], primero['rating'])
+    resultados['RankingScores.mejores'] = medir(lambda _: ranking.mejores('pelicula', 10, minimo=50),
+                                                con_cambio, repeticiones)
+    resultados['RankingScores.mejores.usuario'] = medir(
+        lambda _: ranking.mejores('usuario', 10, por='cantidad'), con_cambio, repeticiones)
+    resultados['RankingScores.percentiles'] = medir(lambda _: ranking.percentiles('genero', (25, 50, 75)),
+                                                    con_cambio, repeticiones)
+
+    return {'filas': {tabla: len(df) for tabla, df in
+                      zip(TABLAS, [personas, trabajadores, usuarios, peliculas, scores])},
+            'rss_pico_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            'operaciones': resultados}
+
+
+def comparar(resultados: dict, base: dict, tolerancia: float) -> list:
+    """Operaciones que tardan más que en la base, por encima de la tolerancia."""
+    regresiones = []
+    for escala, datos in resultados['escalas'].items():
+        anteriores = base.get('escalas', {}).get(escala, {}).get('operaciones', {})
+        for operacion, medicion in datos['operaciones'].items():
+            if operacion not in anteriores:
+                continue
+            cociente = medicion['segundos'] / anteriores[operacion]['segundos']
+            if cociente > 1 + tolerancia:
+                regresiones.append((escala, operacion, anteriores[operacion]['segundos'],
+                                    medicion['segundos'], cociente))
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--escalas', type=float, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--extension', default='csv')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', default='resultados_bench.json')
+    parser.add_argument('--base')
+    parser.add_argument('--guardar-base')
+    parser.add_argument('--tolerancia', type=float, default=0.2)
+    # uso interno: mediciones de una escala en el proceso hijo
+    parser.add_argument('--hijo', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        print(json.dumps(correr_escala(Path(args.hijo), args.extension, args.repeticiones)))
+        return
+
+    from initializationFunctions import save_all
+    from sinteticos import generar_escala
+
+    resultados = {'fecha': datetime.now().isoformat(timespec='seconds'),
+                  'python': platform.python_version(), 'pandas': pd.__version__,
+                  'numpy': np.__version__, 'semilla': args.semilla, 'extension': args.extension,
+                  'escalas': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        for escala in args.escalas:
+            directorio = Path(tmp) / f'escala_{escala:g}'
+            directorio.mkdir()
+            tablas = generar_escala(escala, args.semilla)
+            save_all(*tablas, *[directorio / f'{tabla}.{args.extension}' for tabla in TABLAS])
+            del tablas
+            salida = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_escala', '--hijo', str(directorio),
+                 '--extension', args.extension, '--repeticiones', str(args.repeticiones)],
+                cwd=RAIZ, stdout=subprocess.PIPE, text=True, check=True)
+            datos = json.loads(salida.stdout.strip().splitlines()[-1])
+            resultados['escalas'][f'{escala:g}'] = datos
+
+            print(f"\nEscala {escala:g}x ({datos['filas']['scores']} scores, "
+                  f"RSS pico {datos['rss_pico_mb']:.0f} MB)")
+            print(f"{'operación':<30}{'tiempo (ms)':>14}{'µs/op':>12}{'pico (MB)':>12}{'retenido (MB)':>15}")
+            for operacion, m in datos['operaciones'].items():
+                print(f"{operacion:<30}{m['segundos'] * 1000:>14.1f}{m['us_por_operacion']:>12.1f}"
+                      f"{m['pico_mb']:>12.1f}{m['retenido_mb']:>15.1f}")
+
+    Path(args.salida).write_text(json.dumps(resultados, indent=2))
+    print(f"\nResultados guardados en {args.salida}")
+    if args.guardar_base:
+        Path(args.guardar_base).write_text(json.dumps(resultados, indent=2))
+        print(f"Base guardada en {args.guardar_base}")
+
+    if args.base:
+        base = json.loads(Path(args.base).read_text())
+        regresiones = comparar(resultados, base, args.tolerancia)
+        if not regresiones:
+            print(f"Sin regresiones respecto de {args.base} (tolerancia {args.tolerancia:.0%}).")
+            return
+        print(f"\nRegresiones respecto de {args.base} (tolerancia {args.tolerancia:.0%}):")
+        for escala, operacion, antes, ahora, cociente in regresiones:
+            print(f"  {escala}x {operacion}: {antes * 1000:.1f} ms -> {ahora * 1000:.1f} ms ({cociente:.2f}x)")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Mide cuánto acelera repartir las estadísticas y el chequeo de integridad de los scores en varios procesos.
+
+Sobre datos sintéticos a la escala pedida (sinteticos.generar_escala) se
+mide, para cada cantidad de procesos, armar EstadisticasScores y chequear
+las claves foráneas de los scores (paralelo.verificar_scores), y se comparan
+contra la versión de un solo proceso (EstadisticasScores sin procesos y
+GrafoIntegridad.verificar). La aceleración esperable está acotada por la
+cantidad de núcleos de la máquina, que se informa junto con los resultados.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_paralelo [--escala 50] [--procesos 1 2 4 8]
+        [--particion user_id] [--repeticiones 3] [--salida paralelo.json]
+"""
+import argparse
+import json
+import platform
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+
+from estadisticas import EstadisticasScores
+from integridad import GrafoIntegridad
+from paralelo import COLUMNAS_PARTICION, procesos_disponibles, verificar_scores
+from sinteticos import generar_escala
+
+# proporción de scores con un user_id o movie_id inexistente, para que el chequeo elimine filas
+PROPORCION_INVALIDAS = 0.001
+
+
+def medir(funcion, preparar=lambda: None, repeticiones: int = 3) -> float:
+    """Mediana del tiempo de funcion(estado), con un estado nuevo de preparar() en cada repetición."""
+    tiempos = []
+    for _ in range(repeticiones):
+        estado = preparar()
+        inicio = time.perf_counter()
+        funcion(estado)
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos)
+
+
+def con_invalidas(scores, semilla: int = 0):
+    """Copia de scores con algunos ids que no existen en usuarios o películas."""
+    rng = np.random.default_rng(semilla)
+    scores = scores.copy()
+    filas = rng.choice(len(scores), size=max(2, int(len(scores) * PROPORCION_INVALIDAS)), replace=False)
+    mitad = len(filas) // 2
+    scores.iloc[filas[:mitad], scores.columns.get_loc('user_id')] = -1
+    scores.iloc[filas[mitad:], scores.columns.get_loc('movie_id')] = -1
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--escala', type=float, default=50)
+    parser.add_argument('--procesos', type=int, nargs='+')
+    parser.add_argument('--particion', choices=COLUMNAS_PARTICION, default='user_id')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--salida')
+    args = parser.parse_args()
+
+    nucleos = procesos_disponibles()
+    procesos = args.procesos or sorted({1, 2, 4, nucleos} | {n for n in (8, 16) if n <= nucleos})
+    personas, _, usuarios, peliculas, scores = generar_escala(args.escala, semilla=0)
+    invalidas = con_invalidas(scores)
+    print(f"{len(scores)} scores, {nucleos} núcleos, particionado por {args.particion}")
+
+    def estadisticas(n):
+        if n is None:
+            return lambda _: EstadisticasScores(scores, usuarios, personas, peliculas)
+        return lambda _: EstadisticasScores(scores, usuarios, personas, peliculas,
+                                            procesos=n, particion=args.particion)
+
+    def integridad(n):
+        if n is None:
+            return lambda tablas: GrafoIntegridad().verificar(tablas)
+        return lambda tablas: verificar_scores(tablas, n, args.particion)
+
+    def tablas():
+        return {'scores': invalidas.copy(), 'usuarios': usuarios, 'peliculas': peliculas}
+
+    trabajos = {'EstadisticasScores': (estadisticas, lambda: None), 'verificar scores': (integridad, tablas)}
+    resultados = {'escala': args.escala, 'scores': len(scores), 'nucleos': nucleos,
+                  'particion': args.particion, 'maquina': platform.platform(), 'trabajos': {}}
+    print(f"{'trabajo':<22}{'procesos':>10}{'segundos':>12}{'aceleración':>14}")
+    for trabajo, (funcion, preparar) in trabajos.items():
+        serie = medir(funcion(None), preparar, args.repeticiones)
+        medidos = {'secuencial': {'segundos': serie, 'aceleracion': 1.0}}
+        print(f"{trabajo:<22}{'secuencial':>10}{serie:>12.3f}{1.0:>14.2f}")
+        for n in procesos:
+            segundos = medir(funcion(n), preparar, args.repeticiones)
+            medidos[n] = {'segundos': segundos, 'aceleracion': serie / segundos}
+            print(f"{trabajo:<22}{n:>10}{segundos:>12.3f}{serie / segundos:>14.2f}")
+        resultados['trabajos'][trabajo] = medidos
+
+    if args.salida:
+        Path(args.salida).write_text(json.dumps(resultados, indent=2))
+        print(f"\nResultados guardados en {args.salida}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Mide cuántas operaciones por segundo atiende el servicio local con varios clientes concurrentes.
+
+El servicio corre en un proceso aparte. Cada cliente abre una conexión y
+mantiene varios pedidos en vuelo; se mide por separado una fase de altas de
+personas (que el servicio junta en lotes) y una de consultas por id.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_servicio [--clientes 16] [--en-vuelo 32] [--operaciones 20000]
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def esperar_servicio(puerto: int, segundos: float = 60) -> None:
+    limite = time.perf_counter() + segundos
+    while True:
+        try:
+            _, escritor = await asyncio.open_connection('127.0.0.1', puerto)
+            escritor.close()
+            return
+        except OSError:
+            if time.perf_counter() > limite:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def cliente(puerto: int, pedidos: list, en_vuelo: int) -> int:
+    """Manda los pedidos con a lo sumo en_vuelo sin respuesta. Devuelve cuántos fallaron."""
+    lector, escritor = await asyncio.open_connection('127.0.0.1', puerto, limit=1 << 20)
+    fallidos = 0
+    enviados = 0
+    recibidos = 0
+    while recibidos < len(pedidos):
+        while enviados < len(pedidos) and enviados - recibidos < en_vuelo:
+            escritor.write(json.dumps({'pedido': enviados, **pedidos[enviados]}).encode() + b'\n')
+            enviados += 1
+        await escritor.drain()
+        respuesta = json.loads(await lector.readline())
+        recibidos += 1
+        fallidos += not respuesta['ok']
+    escritor.close()
+    return fallidos
+
+
+async def fase(puerto: int, pedidos: list, clientes: int, en_vuelo: int) -> tuple:
+    partes = [pedidos[i::clientes] for i in range(clientes)]
+    inicio = time.perf_counter()
+    fallidos = await asyncio.gather(*(cliente(puerto, parte, en_vuelo) for parte in partes))
+    return time.perf_counter() - inicio, sum(fallidos)
+
+
+def altas(cantidad: int) -> list:
+    return [{'op': 'new', 'tabla': 'personas',
+             'elemento': {'id': None, 'full_name': f'Persona {i}', 'year_of_birth': 1950 + i % 50,
+                          'gender': random.choice('MF'), 'zip_code': f'{i % 100000:05d}'}}
+            for i in range(cantidad)]
+
+
+def consultas(cantidad: int, maximo_id: int) -> list:
+    return [{'op': 'get', 'tabla': 'personas', 'id': random.randint(1, maximo_id)}
+            for _ in range(cantidad)]
+
+
+async def correr(args) -> None:
+    puerto = puerto_libre()
+    servidor = subprocess.Popen(
+        [sys.executable, '-m', 'servicio', '--puerto', str(puerto), '--ventana', str(args.ventana)],
+        cwd=RAIZ, stdout=subprocess.DEVNULL)
+    try:
+        await esperar_servicio(puerto)
+        print(f"{'fase':<10}{'operaciones':>12}{'segundos':>10}{'ops/s':>10}{'fallidas':>10}")
+        for nombre, pedidos in [('altas', altas(args.operaciones)),
+                                ('consultas', consultas(args.operaciones, 943))]:
+            segundos, fallidos = await fase(puerto, pedidos, args.clientes, args.en_vuelo)
+            print(f'{nombre:<10}{len(pedidos):>12}{segundos:>10.2f}'
+                  f'{len(pedidos) / segundos:>10.0f}{fallidos:>10}')
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clientes', type=int, default=16)
+    parser.add_argument('--en-vuelo', type=int, default=32)
+    parser.add_argument('--operaciones', type=int, default=20000)
+    parser.add_argument('--ventana', type=float, default=0.002)
+    args = parser.parse_args()
+    random.seed(0)
+    asyncio.run(correr(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+import atexit
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from almacenamiento import admitir_categorias, etiqueta_nueva, reemplazar_tabla
+from esquema import alinear_tipos, convertir_fila
+from indices import avisar, eliminar_filas, indice_de, trasladar
+
+OPERACIONES = ('new', 'update', 'delete')
+
+
+def _serializable(valor):
+    if isinstance(valor, np.generic):
+        return valor.item()
+    return str(valor)
+
+
+class Bitacora:
+    """Registro de cambios (write-ahead log) de una tabla, en un archivo de líneas JSON.
+
+    Cada alta, modificación o baja se agrega al final del archivo en O(1). Los
+    registros se escriben enseguida pero el fsync se hace por grupos de
+    `grupo` registros, así que ante un corte de luz se pierden como mucho los
+    cambios del último grupo. Los registros se identifican por id (no por
+    etiqueta de fila) porque la foto de la tabla se guarda sin el índice.
+
+    La compactación escribe una foto nueva de la tabla y descarta los registros
+    que ya quedaron incluidos en ella.
+    """
+
+    def __init__(self, ruta, grupo: int = 64, columna_id: str = 'id'):
+        self.ruta = Path(ruta)
+        self.grupo = grupo
+        self.columna_id = columna_id
+        self._lock = threading.Lock()
+        self._archivo = open(self.ruta, 'a', encoding='utf-8')
+        self._sin_sincronizar = 0
+        self._compactacion = None
+        atexit.register(self.cerrar)
+
+    def _segmentos(self) -> list:
+        # registros que quedaron de una compactación que no terminó, en orden
+        return sorted(self.ruta.parent.glob(self.ruta.name + '.*'),
+                      key=lambda ruta: int(ruta.suffix.lstrip('.')))
+
+    def registrar(self, operacion: str, valor_id, element: dict = None) -> None:
+        """Agrega un registro al final de la bitácora.
+        Args:
+            operacion (str): 'new', 'update' o 'delete'.
+            valor_id: id de la fila afectada (en update, el id que tenía antes del cambio).
+            element (dict): fila completa en formato de la base de datos (no se usa en delete).
+        """
+        if operacion not in OPERACIONES:
+            raise ValueError(f"Operación desconocida: '{operacion}'")
+        registro = {'op': operacion, 'id': valor_id}
+        if element is not None:
+            registro['element'] = element
+        linea = json.dumps(registro, separators=(',', ':'), default=_serializable)
+        with self._lock:
+            self._archivo.write(linea + '\n')
+            self._sin_sincronizar += 1
+            if self._sin_sincronizar >= self.grupo:
+                self._sincronizar()
+
+    def _sincronizar(self) -> None:
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+        self._sin_sincronizar = 0
+
+    def sincronizar(self) -> None:
+        """Fuerza el fsync de los registros pendientes."""
+        with self._lock:
+            if not self._archivo.closed:
+                self._sincronizar()
+
+    def cerrar(self) -> None:
+        self.esperar_compactacion()
+        with self._lock:
+            if not self._archivo.closed:
+                self._sincronizar()
+                self._archivo.close()
+
+    def _leer(self) -> list:
+        registros = []
+        for ruta in self._segmentos() + [self.ruta]:
+            if not ruta.exists():
+                continue
+            with open(ruta, encoding='utf-8') as archivo:
+                for linea in archivo:
+                    try:
+                        registros.append(json.loads(linea))
+                    except json.JSONDecodeError:
+                        # la última línea puede haber quedado cortada por un corte de luz
+                        break
+        return registros
+
+    def reproducir(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Aplica sobre df (la última foto de la tabla) los cambios registrados.
+
+        Solo importa el estado final de cada id, así que los registros se
+        reducen primero y después se aplican en bloque: una baja por lote, una
+        asignación por fila modificada y una única concatenación para las altas.
+        Aplicar dos veces la misma bitácora da el mismo resultado.
+
+        Returns: la tabla con los cambios aplicados (puede ser un DataFrame nuevo).
+        """
+        self.sincronizar()
+        finales = {}
+        for registro in self._leer():
+            if registro['op'] == 'delete':
+                finales[registro['id']] = None
+            else:
+                if registro['op'] == 'update' and registro['element'][self.columna_id] != registro['id']:
+                    finales[registro['id']] = None
+                finales[registro['element'][self.columna_id]] = registro['element']
+        if not finales:
+            return df
+
+        indice = indice_de(df, self.columna_id)
+        bajas = [indice.etiqueta(valor_id) for valor_id, element in finales.items()
+                 if element is None and indice.existe_id(valor_id)]
+        eliminar_filas(df, bajas)
+
+        # los valores vuelven de JSON como texto o números; se llevan a los tipos de la tabla
+        finales = {valor_id: None if element is None else convertir_fila(df, element)
+                   for valor_id, element in finales.items()}
+        nuevas = []
+        admitir_categorias(df, [element for element in finales.values() if element is not None])
+        for valor_id, element in finales.items():
+            if element is None:
+                continue
+            etiqueta = indice.etiqueta(valor_id)
+            if etiqueta is None:
+                nuevas.append(element)
+            else:
+                df.loc[etiqueta] = element
+                indice.agregar(etiqueta, element)
+        if not nuevas:
+            avisar(df, list(finales))
+            return df
+
+        inicio = etiqueta_nueva(df)
+        etiquetas = range(inicio, inicio + len(nuevas))
+        agregadas = pd.DataFrame(nuevas, index=etiquetas, columns=df.columns)
+        alinear_tipos(agregadas, df)
+        df_nuevo = pd.concat([df, agregadas]) if len(df) else agregadas
+        for etiqueta, element in zip(etiquetas, nuevas):
+            indice.agregar(etiqueta, element)
+        trasladar(df, df_nuevo, self.columna_id)
+        avisar(df, list(finales), df_nuevo)
+        return df_nuevo
+
+    def compactar(self, df: pd.DataFrame, ruta_foto, en_segundo_plano: bool = True) -> None:
+        """Guarda una foto nueva de la tabla y descarta los registros incluidos en ella.
+
+        La bitácora actual se renombra como segmento y se empieza una nueva, así
+        que los cambios siguen registrándose mientras se escribe la foto. La foto
+        se escribe en un archivo temporal y se reemplaza de forma atómica; recién
+        después se borra el segmento. Si algo falla a mitad de camino, al
+        reproducir se vuelven a aplicar los registros, lo que no cambia el resultado.
+        """
+        self.esperar_compactacion()
+        with self._lock:
+            self._sincronizar()
+            self._archivo.close()
+            segmentos = self._segmentos()
+            numero = int(segmentos[-1].suffix.lstrip('.')) + 1 if segmentos else 0
+            segmento = self.ruta.with_name(f'{self.ruta.name}.{numero}')
+            os.replace(self.ruta, segmento)
+            self._archivo = open(self.ruta, 'a', encoding='utf-8')
+            foto = df.copy()
+
+        def escribir():
+            reemplazar_tabla(foto, ruta_foto)
+            for viejo in self._segmentos():
+                if int(viejo.suffix.lstrip('.')) <= numero:
+                    viejo.unlink()
+
+        if en_segundo_plano:
+            self._compactacion = threading.Thread(target=escribir, daemon=True)
+            self._compactacion.start()
+        else:
+            escribir()
+
+    def esperar_compactacion(self) -> None:
+        if self._compactacion is not None:
+            self._compactacion.join()
+            self._compactacion = None
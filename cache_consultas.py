@@ -0,0 +1,154 @@
+"""Cache de resultados de las consultas de las tablas, con desalojo LRU e invalidación por versión.
+
+Cada resultado se guarda con una clave armada con la consulta, sus parámetros
+normalizados (con los valores por defecto explícitos, las listas como tuplas y
+los parámetros cuyo orden no importa ordenados) y la versión de cada tabla que
+lee. Las versiones cambian con cada modificación: la de la clase (DataBase._version)
+con new, update, delete y new_many, y la de cada DataFrame (indices.version) con
+cualquier aviso de indices.avisar, que también llaman las altas y bajas de
+individuos. Así un resultado calculado antes de una modificación nunca coincide
+con la clave de una consulta posterior y no se vuelve a devolver; queda en el
+cache hasta que el LRU lo desaloja.
+"""
+import functools
+import inspect
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from indices import version
+
+
+def _tamanio(valor) -> int:
+    """Bytes aproximados de un resultado, para el límite de tamaño del cache."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(deep=True))
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(_tamanio(elemento) for elemento in valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(_tamanio(k) + _tamanio(v) for k, v in valor.items())
+    tamanio = sys.getsizeof(valor)
+    # objetos de johann_clases: sus campos están en __slots__
+    for clase in type(valor).__mro__:
+        for campo in getattr(clase, '__slots__', ()):
+            if campo != '__weakref__' and hasattr(valor, campo):
+                tamanio += _tamanio(getattr(valor, campo))
+    return tamanio
+
+
+def _normalizar(valor, sin_orden: bool = False):
+    """Valor hasheable equivalente: dos formas de pedir lo mismo dan el mismo valor."""
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, (list, tuple, np.ndarray, pd.Index, set, frozenset)):
+        valores = tuple(_normalizar(elemento) for elemento in valor)
+        if sin_orden or isinstance(valor, (set, frozenset)):
+            valores = tuple(sorted(set(valores), key=repr))
+        return valores
+    if isinstance(valor, dict):
+        return tuple(sorted(((k, _normalizar(v)) for k, v in valor.items()), key=repr))
+    return valor
+
+
+class CacheConsultas:
+    """Resultados de consultas con desalojo del menos usado recientemente (LRU).
+
+    Args:
+        maximo (int): cantidad máxima de resultados guardados.
+        maximo_bytes (int): tamaño total aproximado máximo. Un resultado más grande
+            que este límite no se guarda.
+    """
+
+    def __init__(self, maximo: int = 256, maximo_bytes: int = 64 * 2 ** 20):
+        self.maximo = maximo
+        self.maximo_bytes = maximo_bytes
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def obtener(self, clave, calcular):
+        """Devuelve el resultado guardado para clave, o lo calcula con calcular() y lo guarda."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return entrada[0]
+            self.fallos += 1
+        resultado = calcular()
+        tamanio = _tamanio(resultado)
+        with self._lock:
+            if tamanio <= self.maximo_bytes and clave not in self._entradas:
+                self._entradas[clave] = (resultado, tamanio)
+                self._bytes += tamanio
+                while len(self._entradas) > self.maximo or self._bytes > self.maximo_bytes:
+                    _, (_, liberado) = self._entradas.popitem(last=False)
+                    self._bytes -= liberado
+                    self.desalojos += 1
+        return resultado
+
+    def vaciar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estadisticas(self) -> dict:
+        """Aciertos, fallos y desalojos desde que se creó el cache, y su ocupación actual."""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {'aciertos': self.aciertos, 'fallos': self.fallos, 'desalojos': self.desalojos,
+                    'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+                    'entradas': len(self._entradas), 'bytes': self._bytes}
+
+
+# cache que usan por defecto las consultas de johann_clases
+cache = CacheConsultas()
+
+
+def _versiones_de(cls) -> tuple:
+    return tuple((clase.__name__, clase._version, version(clase.database))
+                 for clase in [cls, *cls._tablas_relacionadas()])
+
+
+def cacheada(sin_orden=(), cache_consultas: CacheConsultas = None):
+    """Decorador de classmethods de DataBase que solo leen la tabla: guarda el resultado en el
+    cache, con la clave de la consulta y de la versión de la tabla y de sus tablas relacionadas.
+
+    Args:
+        sin_orden (tuple): parámetros cuyo orden no cambia el resultado (por ejemplo 'generos').
+        cache_consultas (CacheConsultas): cache a usar; por defecto, cache.
+
+    El resultado guardado lo comparten todas las llamadas con la misma clave, así que no
+    debe modificarse.
+    """
+    def decorador(metodo):
+        firma = inspect.signature(metodo)
+
+        @functools.wraps(metodo)
+        def envoltura(cls, *args, **kwargs):
+            argumentos = firma.bind(cls, *args, **kwargs)
+            argumentos.apply_defaults()
+            parametros = tuple((nombre, _normalizar(valor, nombre in sin_orden))
+                               for nombre, valor in list(argumentos.arguments.items())[1:])
+            clave = (cls.__qualname__, metodo.__name__, parametros, _versiones_de(cls))
+            try:
+                hash(clave)
+            except TypeError:
+                return metodo(cls, *args, **kwargs)
+            destino = cache if cache_consultas is None else cache_consultas
+            return destino.obtener(clave, lambda: metodo(cls, *args, **kwargs))
+        return envoltura
+    return decorador
@@ -0,0 +1,118 @@
+import functools
+import threading
+from contextlib import ExitStack, contextmanager
+
+
+class LockLecturaEscritura:
+    """Lock de muchos lectores / un escritor.
+
+    Varios hilos pueden leer a la vez; un escritor espera a que terminen los
+    lectores activos y, mientras espera, no entran lectores nuevos (así los
+    escritores no quedan postergados indefinidamente). Es reentrante: el hilo
+    que escribe puede volver a tomar el lock para leer o escribir, y un hilo
+    que ya lee puede volver a leer.
+    """
+
+    def __init__(self, nombre: str = ''):
+        self.nombre = nombre
+        self._condicion = threading.Condition(threading.Lock())
+        self._lectores = 0
+        self._escritor = None
+        self._escrituras = 0
+        self._esperando = 0
+        self._local = threading.local()
+
+    def _lecturas_propias(self) -> int:
+        return getattr(self._local, 'lecturas', 0)
+
+    def adquirir_lectura(self) -> None:
+        propio = threading.get_ident()
+        with self._condicion:
+            if self._escritor == propio or self._lecturas_propias() > 0:
+                self._local.lecturas = self._lecturas_propias() + 1
+                self._lectores += 1
+                return
+            while self._escritor is not None or self._esperando > 0:
+                self._condicion.wait()
+            self._lectores += 1
+            self._local.lecturas = 1
+
+    def liberar_lectura(self) -> None:
+        with self._condicion:
+            self._lectores -= 1
+            self._local.lecturas -= 1
+            if self._lectores == 0:
+                self._condicion.notify_all()
+
+    def adquirir_escritura(self) -> None:
+        propio = threading.get_ident()
+        with self._condicion:
+            if self._escritor == propio:
+                self._escrituras += 1
+                return
+            if self._lecturas_propias() > 0:
+                raise RuntimeError(
+                    f"No se puede escribir en '{self.nombre}' mientras el mismo hilo la está leyendo.")
+            self._esperando += 1
+            while self._escritor is not None or self._lectores > 0:
+                self._condicion.wait()
+            self._esperando -= 1
+            self._escritor = propio
+            self._escrituras = 1
+
+    def liberar_escritura(self) -> None:
+        with self._condicion:
+            self._escrituras -= 1
+            if self._escrituras == 0:
+                self._escritor = None
+                self._condicion.notify_all()
+
+    @contextmanager
+    def lectura(self):
+        self.adquirir_lectura()
+        try:
+            yield
+        finally:
+            self.liberar_lectura()
+
+    @contextmanager
+    def escritura(self):
+        self.adquirir_escritura()
+        try:
+            yield
+        finally:
+            self.liberar_escritura()
+
+
+@contextmanager
+def bloquear(escrituras=(), lecturas=()):
+    """Toma varios locks a la vez, siempre en el mismo orden (por nombre), para que
+    dos operaciones sobre varias tablas no se bloqueen mutuamente."""
+    pedidos = [(lock, True) for lock in escrituras]
+    pedidos += [(lock, False) for lock in lecturas if lock not in escrituras]
+    pedidos.sort(key=lambda pedido: (pedido[0].nombre, id(pedido[0])))
+    with ExitStack() as pila:
+        for lock, es_escritura in pedidos:
+            pila.enter_context(lock.escritura() if es_escritura else lock.lectura())
+        yield
+
+
+def lectura(metodo):
+    """Decorador de classmethods de DataBase que solo leen la tabla."""
+    @functools.wraps(metodo)
+    def envoltura(cls, *args, **kwargs):
+        with cls._lock.lectura():
+            return metodo(cls, *args, **kwargs)
+    return envoltura
+
+
+def escritura(metodo):
+    """Decorador de classmethods de DataBase que modifican la tabla. También toma
+    para lectura las tablas de las que depende la validación (por ejemplo, personas
+    para usuarios), así el chequeo y la escritura son atómicos."""
+    @functools.wraps(metodo)
+    def envoltura(cls, *args, **kwargs):
+        with bloquear(escrituras=[cls._lock],
+                      lecturas=[tabla._lock for tabla in cls._tablas_relacionadas()]):
+            return metodo(cls, *args, **kwargs)
+    return envoltura
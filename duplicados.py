@@ -0,0 +1,250 @@
+import threading
+import unicodedata
+import weakref
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+import pandas as pd
+
+# columnas de nombre, año de nacimiento y código postal de la tabla de personas
+COLUMNAS = ('Full Name', 'year of birth', 'Zip Code')
+# puntaje a partir del cual dos personas se consideran probablemente la misma
+UMBRAL = 0.8
+# peso del nombre en el puntaje; el resto se reparte entre año y código postal
+PESO_NOMBRE = 0.8
+
+_SOUNDEX = {**dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'),
+            **dict.fromkeys('dt', '3'), 'l': '4', **dict.fromkeys('mn', '5'), 'r': '6'}
+
+
+def normalizar(nombre) -> tuple:
+    """Palabras de un nombre en minúsculas, sin acentos ni signos de puntuación."""
+    texto = unicodedata.normalize('NFKD', str(nombre).lower())
+    texto = ''.join(c if c.isalpha() else ' ' for c in texto if not unicodedata.combining(c))
+    return tuple(texto.split())
+
+
+def soundex(palabra: str) -> str:
+    """Clave fonética de una palabra normalizada: las que suenan parecido comparten clave."""
+    if not palabra:
+        return ''
+    codigo = palabra[0]
+    anterior = _SOUNDEX.get(palabra[0], '')
+    for letra in palabra[1:]:
+        actual = _SOUNDEX.get(letra, '')
+        if actual and actual != anterior:
+            codigo += actual
+        if letra not in 'hw':
+            anterior = actual
+    return (codigo + '000')[:4]
+
+
+def _parecido(x: str, y: str, minimo: float) -> float:
+    # ratio de difflib, o 0 si ni sus cotas rápidas llegan a minimo
+    comparador = SequenceMatcher(None, x, y)
+    if comparador.real_quick_ratio() < minimo or comparador.quick_ratio() < minimo:
+        return 0.0
+    return comparador.ratio()
+
+
+@lru_cache(maxsize=1 << 16)
+def similitud_nombres(a: tuple, b: tuple, minimo: float = 0.0) -> float:
+    """Similitud entre 0 y 1 de dos nombres normalizados.
+    Tolera errores de tipeo, palabras en otro orden e iniciales ('j smith' y 'john smith').
+    Si la similitud es menor que minimo puede devolver 0 sin calcularla del todo."""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    mejor = max(_parecido(' '.join(a), ' '.join(b), minimo),
+                _parecido(' '.join(sorted(a)), ' '.join(sorted(b)), minimo))
+    if len(a) == len(b):
+        pares = list(zip(a, b))
+        iniciales = [len(x) == 1 or len(y) == 1 for x, y in pares]
+        cotas = [0.9 * (x[0] == y[0]) if inicial else SequenceMatcher(None, x, y).quick_ratio()
+                 for (x, y), inicial in zip(pares, iniciales)]
+        if sum(cotas) / len(cotas) >= max(minimo, mejor):
+            parecidos = [cota if inicial else SequenceMatcher(None, x, y).ratio()
+                         for (x, y), inicial, cota in zip(pares, iniciales, cotas)]
+            mejor = max(mejor, sum(parecidos) / len(parecidos))
+    return mejor
+
+
+class IndiceDuplicados:
+    """Índice de bloques para encontrar personas probablemente repetidas.
+
+    Cada persona se ubica en unos pocos bloques: uno por su nombre normalizado
+    y otros por claves fonéticas del nombre o del apellido combinadas con el
+    año de nacimiento o el código postal. Solo se comparan (por similitud de
+    texto) las personas que comparten algún bloque, así que buscar los
+    parecidos a una persona no recorre la tabla y deduplicar la tabla entera no
+    compara todos contra todos.
+
+    El puntaje de un par combina la similitud de los nombres con la
+    coincidencia de año de nacimiento y código postal. Con los valores por
+    defecto, dos personas sin año ni código postal en común solo se consideran
+    repetidas si tienen el mismo nombre, y por eso alcanza con esos bloques.
+    """
+
+    def __init__(self, df: pd.DataFrame, columnas: tuple = COLUMNAS, umbral: float = UMBRAL):
+        self.columnas = columnas
+        self.umbral = umbral
+        self.reconstruir(df)
+
+    def reconstruir(self, df: pd.DataFrame) -> None:
+        self.filas = {}
+        self.bloques = {}
+        nombre, anio, cp = self.columnas
+        for etiqueta, valores in zip(df.index.tolist(),
+                                     zip(df[nombre].tolist(), df[anio].tolist(), df[cp].tolist())):
+            self._registrar(etiqueta, *valores)
+        self.largo = len(df)
+
+    def _datos(self, nombre, anio, cp) -> tuple:
+        palabras = normalizar(nombre)
+        ordenadas = tuple(sorted(palabras))
+        anio, cp = str(anio), str(cp)
+        # las iniciales no sirven como clave fonética
+        completas = [p for p in palabras if len(p) > 1] or palabras
+        claves = {('nombre', ordenadas)}
+        if completas:
+            apellido = soundex(completas[-1])
+            primero = soundex(completas[0])
+            claves |= {('apellido_anio', apellido, anio), ('nombre_anio', primero, anio),
+                       ('apellido_cp', apellido, cp), ('nombre_cp', primero, cp),
+                       # nombre y apellido invertidos caen en el mismo bloque
+                       ('par_anio', *sorted((primero, apellido)), anio)}
+        return palabras, anio, cp, claves, ordenadas
+
+    def _registrar(self, etiqueta, nombre, anio, cp) -> None:
+        datos = self._datos(nombre, anio, cp)
+        self.filas[etiqueta] = datos
+        for clave in datos[3]:
+            self.bloques.setdefault(clave, set()).add(etiqueta)
+
+    def agregar(self, etiqueta, fila: dict) -> None:
+        """Agrega (o reemplaza) la persona de la fila etiqueta."""
+        if etiqueta in self.filas:
+            self.quitar(etiqueta)
+        nombre, anio, cp = self.columnas
+        self._registrar(etiqueta, fila.get(nombre), fila.get(anio), fila.get(cp))
+        self.largo += 1
+
+    def quitar(self, etiqueta) -> None:
+        datos = self.filas.pop(etiqueta, None)
+        if datos is None:
+            return
+        for clave in datos[3]:
+            bloque = self.bloques[clave]
+            bloque.discard(etiqueta)
+            if not bloque:
+                del self.bloques[clave]
+        self.largo -= 1
+
+    def _puntaje(self, a: tuple, b: tuple) -> float:
+        resto = (1 - PESO_NOMBRE) / 2
+        extras = resto * (a[1] == b[1]) + resto * (a[2] == b[2])
+        minimo = (self.umbral - extras) / PESO_NOMBRE
+        if minimo >= 1:
+            # sin año ni código postal en común solo alcanzan los mismos nombres (en cualquier
+            # orden), así que no hace falta comparar el texto
+            return PESO_NOMBRE * (a[4] == b[4]) + extras
+        return PESO_NOMBRE * similitud_nombres(a[0], b[0], minimo) + extras
+
+    def similares(self, fila: dict, excluir=None) -> list:
+        """Personas de la tabla parecidas a fila, sin contar la fila excluir.
+
+        Returns: lista de tuplas (etiqueta, puntaje) con puntaje >= umbral, de
+            la más parecida a la menos parecida.
+        """
+        nombre, anio, cp = self.columnas
+        datos = self._datos(fila.get(nombre), fila.get(anio), fila.get(cp))
+        candidatos = set()
+        for clave in datos[3]:
+            candidatos |= self.bloques.get(clave, set())
+        candidatos.discard(excluir)
+        puntajes = [(etiqueta, self._puntaje(datos, self.filas[etiqueta])) for etiqueta in candidatos]
+        return sorted([p for p in puntajes if p[1] >= self.umbral], key=lambda p: -p[1])
+
+    def duplicados(self) -> pd.DataFrame:
+        """Pares de personas probablemente repetidas en toda la tabla.
+
+        Returns: DataFrame con columnas 'etiqueta_a', 'etiqueta_b' y 'puntaje',
+            ordenado de mayor a menor puntaje.
+        """
+        vistos = set()
+        pares = []
+        for bloque in self.bloques.values():
+            if len(bloque) < 2:
+                continue
+            etiquetas = sorted(bloque)
+            for i, a in enumerate(etiquetas):
+                for b in etiquetas[i + 1:]:
+                    if (a, b) in vistos:
+                        continue
+                    vistos.add((a, b))
+                    puntaje = self._puntaje(self.filas[a], self.filas[b])
+                    if puntaje >= self.umbral:
+                        pares.append((a, b, puntaje))
+        pares = pd.DataFrame(pares, columns=['etiqueta_a', 'etiqueta_b', 'puntaje'])
+        return pares.sort_values('puntaje', ascending=False, ignore_index=True)
+
+
+# un índice por DataFrame. Se libera cuando el DataFrame deja de existir.
+_indices = {}
+_lock = threading.Lock()
+
+
+def indice_duplicados(df: pd.DataFrame, columnas: tuple = COLUMNAS) -> IndiceDuplicados:
+    """Devuelve el índice de duplicados de df, creándolo la primera vez.
+    Si la tabla cambió de tamaño por fuera de los métodos que lo mantienen, se reconstruye."""
+    clave = (id(df), columnas)
+    with _lock:
+        indice = _indices.get(clave)
+        if indice is None:
+            indice = IndiceDuplicados(df, columnas)
+            _indices[clave] = indice
+            weakref.finalize(df, _indices.pop, clave, None)
+        elif indice.largo != len(df):
+            indice.reconstruir(df)
+        return indice
+
+
+def trasladar_duplicados(origen: pd.DataFrame, destino: pd.DataFrame, agregadas=()) -> None:
+    """Mueve los índices de duplicados de origen a destino (por ejemplo, el resultado de
+    una concatenación) registrando las filas agregadas, pares (etiqueta, fila).
+    Los índices que ya no coinciden con origen se descartan."""
+    agregadas = list(agregadas)
+    with _lock:
+        for clave in [clave for clave in _indices if clave[0] == id(origen)]:
+            indice = _indices.pop(clave)
+            if indice.largo != len(origen):
+                continue
+            for etiqueta, fila in agregadas:
+                indice.agregar(etiqueta, fila)
+            nueva = (id(destino), clave[1])
+            if nueva not in _indices:
+                weakref.finalize(destino, _indices.pop, nueva, None)
+            _indices[nueva] = indice
+
+
+def actualizar_duplicados(df: pd.DataFrame, etiqueta, fila: dict) -> None:
+    """Actualiza los índices de duplicados ya armados de df después de escribir
+    (agregar o reemplazar) la fila etiqueta, sin crear índices nuevos."""
+    for (ident, _), indice in list(_indices.items()):
+        if ident == id(df) and indice.largo + (etiqueta not in indice.filas) == len(df):
+            indice.agregar(etiqueta, fila)
+
+
+def quitar_duplicados(df: pd.DataFrame, etiqueta) -> None:
+    """Actualiza los índices de duplicados ya armados de df después de borrar una fila."""
+    for (ident, _), indice in list(_indices.items()):
+        if ident == id(df) and indice.largo == len(df) + 1:
+            indice.quitar(etiqueta)
+
+
+def descartar_duplicados(df: pd.DataFrame) -> None:
+    """Descarta los índices de duplicados de df (se rearman en la próxima consulta)."""
+    with _lock:
+        for clave in [clave for clave in _indices if clave[0] == id(df)]:
+            del _indices[clave]
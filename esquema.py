@@ -0,0 +1,134 @@
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# columnas 0/1 de géneros de peliculas.csv, que en memoria se guardan como booleanos
+GENEROS = ['unknown', 'Action', 'Adventure', 'Animation', "Children's",
+           'Comedy', 'Crime', 'Documentary', 'Drama', 'Fantasy',
+           'Film-Noir', 'Horror', 'Musical', 'Mystery', 'Romance',
+           'Sci-Fi', 'Thriller', 'War', 'Western']
+
+FECHA = 'datetime64[s]'
+
+# tipo en memoria de cada columna, por tabla y en el orden de los archivos
+ESQUEMAS = {
+    'personas': {'id': 'int32', 'Full Name': 'str', 'year of birth': 'int16',
+                 'Gender': 'category', 'Zip Code': 'str'},
+    'usuarios': {'id': 'int32', 'Occupation': 'category', 'Active Since': FECHA},
+    'trabajadores': {'id': 'int32', 'Position': 'category', 'Category': 'category',
+                     'Working Hours': 'category', 'Start Date': FECHA},
+    'peliculas': {'id': 'int32', 'Name': 'str', 'Release Date': FECHA, 'IMDB URL': 'str',
+                  **{genero: 'bool' for genero in GENEROS}},
+    'scores': {'user_id': 'int32', 'movie_id': 'int32', 'rating': 'int8', 'Date': FECHA},
+}
+
+# columnas con pocos valores distintos, que se guardan como categorías
+CATEGORICAS = sorted({col for esquema in ESQUEMAS.values()
+                      for col, tipo in esquema.items() if tipo == 'category'})
+
+# formato de texto de cada columna de fechas en los archivos (y en los objetos de johann_clases)
+FORMATOS_FECHA = {'Active Since': '%Y-%m-%d %H:%M:%S', 'Start Date': '%Y-%m-%d',
+                  'Release Date': '%d-%b-%Y', 'Date': '%Y-%m-%d %H:%M:%S'}
+
+# columnas que pandas agrega al leer un CSV guardado con el índice (la primera de scores.csv)
+_SIN_NOMBRE = re.compile(r'^Unnamed: \d+$')
+
+
+def tipos_lectura(tabla: str) -> dict:
+    """Tipos para pasarle a read_csv: así los códigos postales conservan los ceros a la
+    izquierda y las columnas no pasan por int64 u object antes de compactarse.
+    Las fechas se parsean después, con su formato."""
+    return {col: tipo for col, tipo in ESQUEMAS[tabla].items() if tipo != FECHA}
+
+
+def aplicar(df: pd.DataFrame, tabla: str) -> pd.DataFrame:
+    """Devuelve df con los tipos del esquema de tabla.
+
+    Las columnas sin nombre se descartan, las fechas se parsean con su formato
+    (las que no respetan el formato quedan como NaT) y las columnas enteras con
+    faltantes pasan al tipo entero que admite nulos (int32 -> Int32).
+    """
+    sobrantes = [col for col in df.columns if _SIN_NOMBRE.match(str(col))]
+    if sobrantes:
+        df = df.drop(columns=sobrantes)
+    fechas = {}
+    tipos = {}
+    for col, tipo in ESQUEMAS[tabla].items():
+        if col not in df.columns or df[col].dtype == tipo:
+            continue
+        if tipo == FECHA and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            fechas[col] = pd.to_datetime(df[col], format=FORMATOS_FECHA[col], errors='coerce')
+        elif tipo.startswith('int') and df[col].isna().any():
+            tipo = tipo.capitalize()
+        tipos[col] = tipo
+    if fechas:
+        df = df.assign(**fechas)
+    return df.astype(tipos) if tipos else df
+
+
+def convertir_valor(valor, tipo, columna: str):
+    """Lleva un valor suelto al tipo de la columna (los enteros y las fechas con la
+    precisión de la columna). Lanza ValueError si no se puede."""
+    faltante = valor is None or (not isinstance(valor, (list, dict)) and pd.isna(valor))
+    try:
+        if pd.api.types.is_datetime64_any_dtype(tipo):
+            return pd.NaT if faltante else pd.Timestamp(valor).as_unit(np.datetime_data(tipo)[0])
+        if faltante:
+            if pd.api.types.is_integer_dtype(tipo) and not isinstance(tipo, pd.api.extensions.ExtensionDtype):
+                raise ValueError
+            return None
+        if pd.api.types.is_bool_dtype(tipo):
+            return bool(valor)
+        if pd.api.types.is_integer_dtype(tipo):
+            if isinstance(valor, (float, np.floating)) and not float(valor).is_integer():
+                raise ValueError
+            valor = int(valor)
+            if isinstance(tipo, pd.api.extensions.ExtensionDtype):
+                return valor
+            # el escalar de numpy del mismo tipo hace que agregar la fila no ensanche la columna
+            entero = np.dtype(tipo).type(valor)
+            if entero != valor:
+                raise ValueError
+            return entero
+        if pd.api.types.is_float_dtype(tipo):
+            return float(valor)
+        if isinstance(tipo, (pd.CategoricalDtype, pd.StringDtype)):
+            return str(valor)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"El campo '{columna}' debe ser de tipo {tipo}.") from None
+    return valor
+
+
+def convertir_fila(df: pd.DataFrame, element: dict) -> dict:
+    """Copia de element con cada valor llevado al tipo de su columna en df, para que
+    asignarlo con loc o concatenarlo no cambie los tipos de la tabla.
+    Lanza ValueError con el primer campo que no se puede convertir."""
+    tipos = df.dtypes
+    return {col: convertir_valor(valor, tipos[col], col) if col in tipos.index else valor
+            for col, valor in element.items()}
+
+
+def a_texto_valor(valor, columna: str):
+    """Valor de una celda como lo esperan los objetos de johann_clases: las fechas
+    vuelven al texto de los archivos (las vistas de filas las leen como datetime)."""
+    if valor is pd.NaT:
+        return None
+    if isinstance(valor, datetime):
+        return valor.strftime(FORMATOS_FECHA.get(columna, '%Y-%m-%d %H:%M:%S'))
+    return valor
+
+
+def alinear_tipos(nuevas: pd.DataFrame, df: pd.DataFrame) -> pd.DataFrame:
+    """Pasa las filas nuevas a los tipos de las columnas de df, para que concatenarlas no
+    cambie los tipos de la tabla (las categorías nuevas se agregan antes con
+    almacenamiento.admitir_categorias). Las columnas que no se pueden convertir, por
+    ejemplo enteros con faltantes, quedan como están."""
+    for col, tipo in df.dtypes.items():
+        if col in nuevas.columns and nuevas[col].dtype != tipo:
+            try:
+                nuevas[col] = nuevas[col].astype(tipo)
+            except (TypeError, ValueError):
+                pass
+    return nuevas
@@ -0,0 +1,206 @@
+import math
+from bisect import bisect_right
+
+import numpy as np
+import pandas as pd
+
+from almacenamiento import GENEROS
+
+# límites inferiores de cada rango etario (edad al momento de calificar)
+LIMITES_ETARIOS = [0, 18, 25, 35, 45, 56]
+RANGOS_ETARIOS = ['<18', '18-24', '25-34', '35-44', '45-55', '56+']
+
+# dimensiones por las que se acumulan los scores
+DIMENSIONES = ['usuario', 'pelicula', 'genero', 'anio', 'sexo', 'rango_etario', 'ocupacion']
+
+
+def rango_etario(edad) -> str:
+    """Devuelve el rango etario de una edad."""
+    return RANGOS_ETARIOS[bisect_right(LIMITES_ETARIOS, edad) - 1]
+
+
+def anio_estreno(fechas: pd.Series) -> pd.Series:
+    """Año de estreno a partir de fechas como '01-Jan-1995'."""
+    return pd.to_datetime(fechas, format='%d-%b-%Y', errors='coerce').dt.year
+
+
+class EstadisticasScores:
+    """Acumulados de calificaciones (cantidad, suma y suma de cuadrados) por dimensión.
+
+    Se arma una sola vez sobre toda la tabla de scores y después se mantiene al
+    agregar o quitar cada score en O(1), así que las consultas de promedio y
+    desvío son búsquedas en un diccionario y no un groupby sobre los scores.
+
+    Si se indica procesos, los acumulados iniciales se arman en ese número de
+    procesos, con los scores particionados por la columna particion (ver paralelo.py).
+    """
+
+    def __init__(self, df_scores: pd.DataFrame, df_usuarios: pd.DataFrame,
+                 df_personas: pd.DataFrame, df_peliculas: pd.DataFrame,
+                 procesos: int = None, particion: str = 'user_id'):
+        # atributos de cada película y de cada usuario, para ubicar un score nuevo en O(1)
+        generos = [g for g in GENEROS if g in df_peliculas.columns]
+        anios = anio_estreno(df_peliculas['Release Date'])
+        matriz = df_peliculas[generos].to_numpy(dtype=bool)
+        self.peliculas = {
+            id_pelicula: (None if pd.isna(anio) else int(anio),
+                          [g for g, tiene in zip(generos, fila) if tiene])
+            for id_pelicula, anio, fila in zip(df_peliculas['id'].tolist(), anios, matriz)
+        }
+        usuarios = df_usuarios[['id', 'Occupation']].merge(
+            df_personas[['id', 'Gender', 'year of birth']], on='id')
+        self.usuarios = dict(zip(
+            usuarios['id'].tolist(),
+            zip(usuarios['Gender'].tolist(), usuarios['year of birth'].astype(int).tolist(),
+                usuarios['Occupation'].tolist())))
+
+        self.acumulados = {dimension: {} for dimension in DIMENSIONES}
+        if procesos is not None:
+            from paralelo import acumular
+            self.acumulados.update(acumular(self, df_scores, generos, matriz, procesos, particion))
+        else:
+            self._construir(df_scores, generos, matriz)
+
+    def _construir(self, df_scores, generos, matriz_generos) -> None:
+        # se arman todas las dimensiones con operaciones vectorizadas sobre la tabla completa
+        scores = df_scores[['user_id', 'movie_id', 'rating']].copy()
+        scores['rating'] = scores['rating'].astype('float64')
+        scores['cuadrado'] = scores['rating'] ** 2
+
+        anios = pd.Series({id_pelicula: anio for id_pelicula, (anio, _) in self.peliculas.items()},
+                          dtype='Int64')
+        usuarios = pd.DataFrame.from_dict(self.usuarios, orient='index',
+                                          columns=['sexo', 'nacimiento', 'ocupacion'])
+        scores['anio'] = scores['movie_id'].map(anios)
+        scores['sexo'] = scores['user_id'].map(usuarios['sexo'])
+        scores['ocupacion'] = scores['user_id'].map(usuarios['ocupacion'])
+        edad = _anio_score(df_scores) - scores['user_id'].map(usuarios['nacimiento'])
+        scores['rango_etario'] = pd.cut(edad, LIMITES_ETARIOS + [np.inf], right=False,
+                                        labels=RANGOS_ETARIOS).astype(object)
+
+        columnas = {'usuario': 'user_id', 'pelicula': 'movie_id', 'anio': 'anio',
+                    'sexo': 'sexo', 'rango_etario': 'rango_etario', 'ocupacion': 'ocupacion'}
+        for dimension, columna in columnas.items():
+            grupos = scores.groupby(columna, observed=True)
+            totales = grupos.agg(n=('rating', 'size'), suma=('rating', 'sum'), cuadrados=('cuadrado', 'sum'))
+            self.acumulados[dimension] = {
+                _clave(clave): [int(n), float(suma), float(cuadrados)]
+                for clave, n, suma, cuadrados in totales.itertuples()
+            }
+
+        # géneros: una película puede tener varios, así que se acumula con un producto matricial
+        posicion = pd.Series(np.arange(len(self.peliculas)), index=list(self.peliculas))
+        filas = scores['movie_id'].map(posicion)
+        conocidas = filas.notna().values
+        por_score = matriz_generos[filas[conocidas].astype(int).values].astype('float64')
+        ratings = scores['rating'].values[conocidas]
+        cantidades = por_score.sum(axis=0)
+        sumas = ratings @ por_score
+        cuadrados = (ratings ** 2) @ por_score
+        self.acumulados['genero'] = {
+            genero: [int(n), float(suma), float(cuadrado)]
+            for genero, n, suma, cuadrado in zip(generos, cantidades, sumas, cuadrados) if n > 0
+        }
+
+    def _claves(self, user_id, movie_id, fecha=None):
+        """Claves de cada dimensión a las que aporta un score."""
+        claves = [('usuario', user_id), ('pelicula', movie_id)]
+        anio, generos = self.peliculas.get(movie_id, (None, []))
+        if anio is not None:
+            claves.append(('anio', anio))
+        claves.extend(('genero', genero) for genero in generos)
+        if user_id in self.usuarios:
+            sexo, nacimiento, ocupacion = self.usuarios[user_id]
+            claves.append(('sexo', sexo))
+            claves.append(('ocupacion', ocupacion))
+            anio_score = pd.Timestamp(fecha).year if fecha is not None else pd.Timestamp.now().year
+            claves.append(('rango_etario', rango_etario(anio_score - nacimiento)))
+        return claves
+
+    def agregar_score(self, user_id, movie_id, rating, fecha=None) -> None:
+        """Suma un score a todos los acumulados en O(1)."""
+        for dimension, clave in self._claves(user_id, movie_id, fecha):
+            acumulado = self.acumulados[dimension].setdefault(clave, [0, 0.0, 0.0])
+            acumulado[0] += 1
+            acumulado[1] += rating
+            acumulado[2] += rating * rating
+
+    def quitar_score(self, user_id, movie_id, rating, fecha=None) -> None:
+        """Resta un score de todos los acumulados en O(1)."""
+        for dimension, clave in self._claves(user_id, movie_id, fecha):
+            acumulado = self.acumulados[dimension].get(clave)
+            if acumulado is None:
+                continue
+            acumulado[0] -= 1
+            acumulado[1] -= rating
+            acumulado[2] -= rating * rating
+            if acumulado[0] <= 0:
+                del self.acumulados[dimension][clave]
+
+    def agregar_scores(self, df_scores: pd.DataFrame) -> None:
+        """Suma un lote de scores (con las columnas de scores.csv)."""
+        for user_id, movie_id, rating, fecha in _filas(df_scores):
+            self.agregar_score(user_id, movie_id, rating, fecha)
+
+    def quitar_scores(self, df_scores: pd.DataFrame) -> None:
+        """Resta un lote de scores (con las columnas de scores.csv)."""
+        for user_id, movie_id, rating, fecha in _filas(df_scores):
+            self.quitar_score(user_id, movie_id, rating, fecha)
+
+    def cantidad(self, dimension: str, clave) -> int:
+        acumulado = self.acumulados[dimension].get(clave)
+        return 0 if acumulado is None else acumulado[0]
+
+    def promedio(self, dimension: str, clave):
+        """Calificación promedio para una clave de la dimensión, o None si no hay scores.
+        Args:
+            dimension (str): una de DIMENSIONES, por ejemplo 'pelicula' u 'ocupacion'.
+            clave: id, género, año, sexo, rango etario u ocupación según la dimensión.
+        """
+        acumulado = self.acumulados[dimension].get(clave)
+        if acumulado is None:
+            return None
+        return acumulado[1] / acumulado[0]
+
+    def desvio(self, dimension: str, clave):
+        """Desvío estándar poblacional de las calificaciones, o None si no hay scores."""
+        acumulado = self.acumulados[dimension].get(clave)
+        if acumulado is None:
+            return None
+        n, suma, cuadrados = acumulado
+        return math.sqrt(max(cuadrados / n - (suma / n) ** 2, 0.0))
+
+    def resumen(self, dimension: str) -> pd.DataFrame:
+        """Cantidad, promedio y desvío de todas las claves de una dimensión."""
+        filas = {clave: (n, suma / n, math.sqrt(max(cuadrados / n - (suma / n) ** 2, 0.0)))
+                 for clave, (n, suma, cuadrados) in self.acumulados[dimension].items()}
+        return pd.DataFrame.from_dict(filas, orient='index', columns=['cantidad', 'promedio', 'desvio'])
+
+
+def _clave(valor):
+    # las claves quedan como tipos de Python para que las búsquedas no dependan de numpy
+    return valor.item() if isinstance(valor, np.generic) else valor
+
+
+def _anio_score(df_scores: pd.DataFrame) -> pd.Series:
+    return pd.to_datetime(df_scores['Date'], errors='coerce').dt.year
+
+
+def _filas(df_scores: pd.DataFrame):
+    fechas = df_scores['Date'] if 'Date' in df_scores.columns else [None] * len(df_scores)
+    return zip(df_scores['user_id'].tolist(), df_scores['movie_id'].tolist(),
+               df_scores['rating'].tolist(), list(fechas))
+
+
+# estadísticas del sistema cargado por load_all
+_actuales = None
+
+
+def registrar(estadisticas: EstadisticasScores) -> None:
+    global _actuales
+    _actuales = estadisticas
+
+
+def actuales() -> EstadisticasScores:
+    """Devuelve las estadísticas armadas por la última llamada a load_all."""
+    return _actuales
@@ -0,0 +1,298 @@
+"""Guardado incremental de las tablas, con un manifiesto de versiones y sumas de verificación.
+
+save_all reescribe solo lo que cambió:
+
+- Por tabla: se compara la suma de los datos con la del manifiesto o, si no hay,
+  con la de la última lectura o guardado de ese DataFrame en este proceso. Así
+  también se guardan los cambios hechos directamente con pandas, que no pasan
+  por indices.avisar ni cambian la versión de la tabla.
+- Por rango de filas: una tabla puede guardarse particionada en rangos de filas
+  consecutivas, como un directorio con el nombre del archivo y una parte por
+  rango (ver almacenamiento.partes). Se compara la suma de los datos de cada
+  rango con la del manifiesto y solo se escriben los que cambiaron: agregar
+  scores al final reescribe solo la última parte.
+
+Cada archivo se escribe en un temporal que después lo reemplaza de forma
+atómica, y el manifiesto (también atómico) se escribe al final. Para cada tabla
+guarda su versión, que aumenta con cada guardado que la cambia, la cantidad de
+filas, la suma de los datos y del archivo de cada parte, la suma de las claves
+que usan sus tablas hijas y, si la tabla estaba validada al guardarla, las
+sumas de las claves de sus padres con las que se validó.
+
+load_all compara los archivos con el manifiesto. Una tabla que cumple tres
+condiciones no se vuelve a validar ni a limpiar de duplicados: su archivo no
+cambió, se guardó validada y sus padres tienen las mismas claves con las que
+se validó. Por ejemplo, cambiar el nombre de una persona no obliga a volver a
+validar los scores.
+"""
+import hashlib
+import json
+import os
+import shutil
+import weakref
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from almacenamiento import partes, reemplazar_tabla, temporal
+from indices import version
+from integridad import RELACIONES
+
+MANIFIESTO = 'manifiesto.json'
+BLOQUE_LECTURA = 1 << 20
+
+# id(df) -> (referencia débil, versión, archivo, filas por parte, sumas de las partes) de la
+# última vez que se leyó o guardó igual a su archivo
+_guardadas = {}
+# id(df) -> (referencia débil, versión, sumas de las claves de los padres) de la última validación
+_validadas = {}
+
+
+def _registrar(registro: dict, df: pd.DataFrame, *datos) -> None:
+    if id(df) not in registro:
+        weakref.finalize(df, registro.pop, id(df), None)
+    registro[id(df)] = (weakref.ref(df), version(df), *datos)
+
+
+def _vigente(registro: dict, df: pd.DataFrame):
+    """Datos registrados para df, o None si no hay o la tabla cambió desde entonces."""
+    entrada = registro.get(id(df))
+    if entrada is None or entrada[0]() is not df or entrada[1] != version(df):
+        return None
+    return entrada[2:]
+
+
+def _anotado(registro: dict, df: pd.DataFrame):
+    """Datos registrados para df aunque la tabla haya cambiado después, o None."""
+    entrada = registro.get(id(df))
+    if entrada is None or entrada[0]() is not df:
+        return None
+    return entrada[2:]
+
+
+# sumas de verificación
+
+def _suma(*partes) -> str:
+    suma = hashlib.blake2b(digest_size=16)
+    for parte in partes:
+        suma.update(parte if isinstance(parte, bytes) else str(parte).encode())
+    return suma.hexdigest()
+
+
+def suma_datos(df: pd.DataFrame) -> str:
+    """Suma de los valores y los nombres de las columnas de df (sin las etiquetas de las filas)."""
+    valores = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return _suma(list(df.columns), valores.tobytes())
+
+
+def suma_archivo(ruta) -> str:
+    suma = hashlib.blake2b(digest_size=16)
+    with open(ruta, 'rb') as archivo:
+        while bloque := archivo.read(BLOQUE_LECTURA):
+            suma.update(bloque)
+    return suma.hexdigest()
+
+
+def suma_claves(columna: pd.Series) -> str:
+    """Suma del conjunto de valores de una columna clave (no depende del orden ni de los repetidos)."""
+    return _suma(np.unique(columna.dropna().to_numpy(dtype=np.int64)).tobytes())
+
+
+def _suma_partes(entrada: dict) -> str:
+    return _suma(*(parte['datos'] for parte in entrada['partes']))
+
+
+def sumas_padres(tabla: str, tablas: dict) -> dict:
+    """Sumas de las claves de los padres de tabla, como 'padre.columna' -> suma."""
+    return {f'{padre}.{columna}': suma_claves(tablas[padre][columna])
+            for padre, columna, hija, _ in RELACIONES if hija == tabla and padre in tablas}
+
+
+# manifiesto
+
+def ruta_manifiesto(archivos) -> Path:
+    """Manifiesto por defecto: junto al primer archivo (el de personas en load_all y save_all)."""
+    return Path(next(iter(archivos))).parent / MANIFIESTO
+
+
+def leer_manifiesto(ruta) -> dict:
+    """Manifiesto guardado en ruta, o uno vacío si no existe o no se puede leer."""
+    try:
+        with open(ruta, encoding='utf-8') as archivo:
+            return json.load(archivo)
+    except FileNotFoundError:
+        return {'tablas': {}}
+    except (OSError, ValueError) as e:
+        print(f"No se pudo leer el manifiesto {ruta}: {e}. Se ignora.")
+        return {'tablas': {}}
+
+
+def _escribir_manifiesto(manifiesto: dict, ruta) -> None:
+    archivo = temporal(ruta)
+    with open(archivo, 'w', encoding='utf-8') as salida:
+        json.dump(manifiesto, salida, indent=2)
+        salida.flush()
+        os.fsync(salida.fileno())
+    os.replace(archivo, ruta)
+
+
+def _nombre(ruta, base: Path) -> str:
+    # los archivos se guardan relativos al manifiesto, así el directorio se puede mover
+    return os.path.relpath(Path(ruta).resolve(), base.resolve())
+
+
+def _entrada(manifiesto: dict, tabla: str, ruta, base: Path):
+    entrada = manifiesto.get('tablas', {}).get(tabla)
+    if entrada is None or entrada['archivo'] != _nombre(ruta, base):
+        return None
+    return entrada
+
+
+def _archivos_partes(ruta, particionada: bool, cantidad: int) -> list:
+    ruta = Path(ruta)
+    if not particionada:
+        return [ruta]
+    return [ruta / f'{numero:05d}{ruta.suffix}' for numero in range(cantidad)]
+
+
+def coincide(manifiesto: dict, tabla: str, ruta, base: Path):
+    """Entrada del manifiesto de la tabla si sus archivos son los que se guardaron, o None."""
+    entrada = _entrada(manifiesto, tabla, ruta, base)
+    if entrada is None:
+        return None
+    archivos = _archivos_partes(ruta, bool(entrada['filas_por_parte']), len(entrada['partes']))
+    if ([Path(archivo) for archivo in partes(ruta)] == archivos
+            and all(suma_archivo(archivo) == parte['archivo']
+                    for archivo, parte in zip(archivos, entrada['partes']))):
+        return entrada
+    print(f"El archivo de {tabla} no coincide con el manifiesto; se valida completo.")
+    return None
+
+
+def validada(entrada, tabla: str, tablas: dict) -> bool:
+    """Indica si la tabla (con archivos iguales al manifiesto, ver coincide) se guardó validada y
+    sus padres, ya cargados y limpios en tablas, tienen las mismas claves que al validarla."""
+    if entrada is None or not entrada.get('validada'):
+        return False
+    if entrada['validada']['datos'] != _suma_partes(entrada):
+        return False
+    return sumas_padres(tabla, tablas) == entrada['validada']['padres']
+
+
+def registrar_carga(tabla: str, df: pd.DataFrame, ruta, entrada, tablas: dict) -> None:
+    """Anota que df está validada contra sus padres en tablas y, si tiene las mismas filas que
+    la entrada del manifiesto de su archivo, que es igual a lo guardado."""
+    _registrar(_validadas, df, sumas_padres(tabla, tablas))
+    if entrada is not None and entrada['filas'] == len(df):
+        _registrar(_guardadas, df, Path(ruta).resolve(), entrada['filas_por_parte'], entrada['partes'])
+
+
+def registrar_lectura(df: pd.DataFrame, ruta) -> None:
+    """Anota que df es igual al archivo ruta (por ejemplo después de DataBase.read), con la
+    suma de sus datos para que guardar_tabla no lo reescriba mientras no cambie."""
+    ruta = Path(ruta)
+    if ruta.is_file():
+        _registrar(_guardadas, df, ruta.resolve(), None,
+                   [{'filas': len(df), 'datos': suma_datos(df), 'archivo': suma_archivo(ruta)}])
+
+
+# escritura
+
+def _rangos(filas: int, filas_por_parte) -> list:
+    if not filas_por_parte:
+        return [(0, filas)]
+    return [(inicio, min(inicio + filas_por_parte, filas))
+            for inicio in range(0, max(filas, 1), filas_por_parte)]
+
+
+def _cambiar_disposicion(ruta: Path, particionada: bool) -> None:
+    """Quita el archivo o el directorio de la tabla si se guardaba de la otra forma."""
+    if particionada and ruta.is_file():
+        ruta.unlink()
+    elif not particionada and ruta.is_dir():
+        shutil.rmtree(ruta)
+
+
+def guardar_tabla(df: pd.DataFrame, ruta, entrada: dict = None, filas_por_parte: int = None):
+    """Guarda df en ruta escribiendo solo las partes cuya suma de datos cambió respecto de
+    entrada (la del manifiesto para ese archivo, si hay) o, sin entrada, respecto de la última
+    lectura o guardado de df en ruta.
+
+    Returns: tupla (partes escritas, sumas de las partes como en el manifiesto).
+    """
+    ruta = Path(ruta)
+    particionada = bool(filas_por_parte)
+    anteriores = []
+    if entrada is not None:
+        if bool(entrada['filas_por_parte']) == particionada:
+            anteriores = entrada['partes']
+    else:
+        guardada = _anotado(_guardadas, df)
+        if (guardada is not None and guardada[:2] == (ruta.resolve(), filas_por_parte)
+                and ruta.exists() and ruta.is_dir() == particionada):
+            anteriores = guardada[2]
+
+    rangos = _rangos(len(df), filas_por_parte)
+    archivos = _archivos_partes(ruta, particionada, len(rangos))
+    _cambiar_disposicion(ruta, particionada)
+    if particionada:
+        ruta.mkdir(parents=True, exist_ok=True)
+    escritas = 0
+    sumas = []
+    for numero, ((inicio, fin), archivo) in enumerate(zip(rangos, archivos)):
+        parte = df.iloc[inicio:fin]
+        datos = suma_datos(parte)
+        anterior = anteriores[numero] if numero < len(anteriores) else None
+        if anterior is not None and anterior['datos'] == datos and archivo.exists():
+            sumas.append(anterior)
+            continue
+        reemplazar_tabla(parte, archivo)
+        escritas += 1
+        sumas.append({'filas': fin - inicio, 'datos': datos, 'archivo': suma_archivo(archivo)})
+    # las partes que sobran de un guardado anterior con más filas
+    for sobrante in partes(ruta)[len(archivos):] if particionada else []:
+        sobrante.unlink()
+    _registrar(_guardadas, df, ruta.resolve(), filas_por_parte, sumas)
+    return escritas, sumas
+
+
+def guardar(tablas: dict, archivos: dict, manifiesto=None, filas_por_parte: dict = None) -> dict:
+    """Guarda las tablas que cambiaron desde el último guardado y actualiza el manifiesto.
+    Args:
+        tablas (dict): nombre -> DataFrame.
+        archivos (dict): nombre -> archivo (o directorio, si la tabla se particiona).
+        manifiesto: archivo del manifiesto. Por defecto, manifiesto.json junto al primer archivo.
+        filas_por_parte (dict): nombre -> filas de cada parte, para las tablas que se
+            guardan particionadas (por ejemplo {'scores': 100000}).
+
+    Returns: nombre -> cantidad de partes escritas (0 si la tabla no cambió).
+    """
+    filas_por_parte = filas_por_parte or {}
+    ruta = Path(manifiesto) if manifiesto is not None else ruta_manifiesto(archivos.values())
+    base = ruta.parent
+    actual = leer_manifiesto(ruta)
+    nuevo = {**actual, 'tablas': dict(actual.get('tablas', {}))}
+    escritas = {}
+    for tabla, df in tablas.items():
+        entrada = _entrada(actual, tabla, archivos[tabla], base)
+        escritas[tabla], sumas = guardar_tabla(df, archivos[tabla], entrada, filas_por_parte.get(tabla))
+        nueva = {'archivo': _nombre(archivos[tabla], base), 'filas_por_parte': filas_por_parte.get(tabla),
+                 'filas': len(df), 'partes': sumas,
+                 'version': (entrada or {}).get('version', 0) + (1 if escritas[tabla] or entrada is None else 0)}
+        if entrada is not None and not escritas[tabla]:
+            nueva['claves'] = entrada['claves']
+        else:
+            nueva['claves'] = {columna: suma_claves(df[columna])
+                               for padre, columna, _, _ in RELACIONES if padre == tabla}
+        # la validación vale para estos datos si se validaron en este proceso sin cambios
+        # posteriores, o si son los mismos que ya estaban guardados validados
+        padres = _vigente(_validadas, df)
+        if padres is not None:
+            nueva['validada'] = {'datos': _suma_partes(nueva), 'padres': padres[0]}
+        elif entrada is not None and entrada.get('validada', {}).get('datos') == _suma_partes(nueva):
+            nueva['validada'] = entrada['validada']
+        nuevo['tablas'][tabla] = nueva
+    if nuevo != actual:
+        _escribir_manifiesto(nuevo, ruta)
+    return escritas
@@ -0,0 +1,188 @@
+import re
+from bisect import bisect_left, insort
+
+import numpy as np
+import pandas as pd
+
+from almacenamiento import GENEROS
+from estadisticas import anio_estreno
+
+# cada género ocupa un bit de la máscara, en el orden de las columnas de peliculas.csv
+BITS = {genero: 1 << i for i, genero in enumerate(GENEROS)}
+
+
+def mascara_generos(generos) -> int:
+    """Máscara de bits de una lista de géneros."""
+    mascara = 0
+    for genero in generos:
+        if genero not in BITS:
+            raise ValueError(f"El género '{genero}' no existe.")
+        mascara |= BITS[genero]
+    return mascara
+
+
+def tokens(texto: str) -> list:
+    """Palabras en minúsculas de un nombre, sin signos de puntuación."""
+    return re.findall(r'\w+', str(texto).lower())
+
+
+class IndicePeliculas:
+    """Índices de consulta sobre la tabla de películas.
+
+    - anios: año de estreno de cada fila (las fechas se parsean una sola vez),
+      con un orden por año para resolver rangos con búsqueda binaria.
+    - mascaras: los 19 géneros de cada fila empaquetados en un entero, para
+      filtrar por géneros con operaciones de bits.
+    - palabras: índice invertido palabra -> posiciones, con la lista de palabras
+      ordenada para buscar por prefijo.
+
+    Las altas, modificaciones y bajas se aplican con actualizar y quitar, sin volver
+    a recorrer la tabla: una fila modificada conserva su posición, una nueva se agrega
+    al final y una eliminada queda como posición libre que ya no aparece en ningún índice.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.etiquetas = df.index.to_numpy()
+        self.ids = df['id'].to_numpy(dtype='int64')
+        self.anios = self._anios(df)
+        self.mascaras = self._mascaras(df)
+        self.posiciones = dict(zip(self.etiquetas.tolist(), range(len(df))))
+        self.orden_anio = np.argsort(self.anios, kind='stable')
+        self.anios_ordenados = self.anios[self.orden_anio]
+
+        self.palabras = {}
+        self._tokens = []
+        for posicion, nombre in enumerate(df['Name'].tolist()):
+            self._tokens.append(tokens(nombre))
+            for palabra in self._tokens[-1]:
+                self.palabras.setdefault(palabra, []).append(posicion)
+        self.vocabulario = sorted(self.palabras)
+
+    @staticmethod
+    def _anios(df: pd.DataFrame) -> np.ndarray:
+        return anio_estreno(df['Release Date']).fillna(-1).to_numpy(dtype='int64')
+
+    @staticmethod
+    def _mascaras(df: pd.DataFrame) -> np.ndarray:
+        generos = [g for g in GENEROS if g in df.columns]
+        pesos = np.array([BITS[g] for g in generos], dtype='int64')
+        return df[generos].to_numpy(dtype='int64') @ pesos
+
+    @property
+    def libres(self) -> int:
+        """Posiciones de filas eliminadas."""
+        return len(self.etiquetas) - len(self.posiciones)
+
+    def posiciones_de(self, etiquetas) -> np.ndarray:
+        """Posiciones en el índice de las etiquetas dadas (todas deben estar en el índice)."""
+        return np.array([self.posiciones[etiqueta] for etiqueta in etiquetas], dtype='int64')
+
+    def etiquetas_de_ids(self, ids) -> list:
+        """Etiquetas de las filas del índice que tienen alguno de los ids dados."""
+        posiciones = np.flatnonzero(np.isin(self.ids, np.asarray(list(ids), dtype='int64')))
+        return [etiqueta for etiqueta, posicion in zip(self.etiquetas[posiciones].tolist(), posiciones.tolist())
+                if self.posiciones.get(etiqueta) == posicion]
+
+    # modificaciones
+
+    def _quitar_posicion(self, posicion: int) -> None:
+        i = np.flatnonzero(self.orden_anio == posicion)
+        if len(i):
+            self.orden_anio = np.delete(self.orden_anio, i[0])
+            self.anios_ordenados = np.delete(self.anios_ordenados, i[0])
+        for palabra in self._tokens[posicion]:
+            lista = self.palabras[palabra]
+            lista.remove(posicion)
+            if not lista:
+                del self.palabras[palabra]
+                del self.vocabulario[bisect_left(self.vocabulario, palabra)]
+        self._tokens[posicion] = []
+
+    def _agregar_posicion(self, posicion: int, nombre) -> None:
+        i = np.searchsorted(self.anios_ordenados, self.anios[posicion], side='right')
+        self.orden_anio = np.insert(self.orden_anio, i, posicion)
+        self.anios_ordenados = np.insert(self.anios_ordenados, i, self.anios[posicion])
+        self._tokens[posicion] = tokens(nombre)
+        for palabra in self._tokens[posicion]:
+            if palabra not in self.palabras:
+                insort(self.vocabulario, palabra)
+                self.palabras[palabra] = []
+            self.palabras[palabra].append(posicion)
+
+    def actualizar(self, df: pd.DataFrame, etiquetas) -> None:
+        """Registra las filas de df indicadas por etiquetas, agregadas o modificadas."""
+        filas = df.loc[list(dict.fromkeys(etiquetas))]
+        nuevas = [etiqueta for etiqueta in filas.index if etiqueta not in self.posiciones]
+        if nuevas:
+            inicio = len(self.etiquetas)
+            self.etiquetas = np.concatenate([self.etiquetas, np.asarray(nuevas, dtype=self.etiquetas.dtype)])
+            for array in ('ids', 'anios', 'mascaras'):
+                setattr(self, array, np.concatenate([getattr(self, array), np.zeros(len(nuevas), dtype='int64')]))
+            self._tokens.extend([] for _ in nuevas)
+            self.posiciones.update(zip(nuevas, range(inicio, inicio + len(nuevas))))
+        posiciones = self.posiciones_de(filas.index)
+        for posicion in posiciones.tolist():
+            if posicion < len(self.etiquetas) - len(nuevas):
+                self._quitar_posicion(posicion)
+        self.ids[posiciones] = filas['id'].to_numpy(dtype='int64')
+        self.anios[posiciones] = self._anios(filas)
+        self.mascaras[posiciones] = self._mascaras(filas)
+        for posicion, nombre in zip(posiciones.tolist(), filas['Name'].tolist()):
+            self._agregar_posicion(posicion, nombre)
+
+    def quitar(self, etiquetas) -> None:
+        """Saca del índice las filas eliminadas indicadas por etiquetas."""
+        for etiqueta in etiquetas:
+            posicion = self.posiciones.pop(etiqueta, None)
+            if posicion is not None:
+                self._quitar_posicion(posicion)
+
+    # consultas
+
+    def _por_prefijo(self, prefijo: str) -> np.ndarray:
+        # las palabras con ese prefijo quedan contiguas en el vocabulario ordenado
+        desde = bisect_left(self.vocabulario, prefijo)
+        posiciones = []
+        for palabra in self.vocabulario[desde:]:
+            if not palabra.startswith(prefijo):
+                break
+            posiciones.extend(self.palabras[palabra])
+        return np.unique(np.array(posiciones, dtype='int64'))
+
+    def buscar(self, nombre=None, anios=None, generos=None, todos_los_generos=True) -> np.ndarray:
+        """Etiquetas de las películas que cumplen todos los filtros indicados.
+        Args:
+            nombre (str): cada palabra debe ser prefijo de alguna palabra del nombre.
+            anios (list): [desde_año, hasta_año], ambos incluidos.
+            generos (list): géneros buscados.
+            todos_los_generos (bool): True exige todos los géneros (AND), False alguno (OR).
+        """
+        if anios is not None:
+            desde = np.searchsorted(self.anios_ordenados, anios[0], side='left')
+            hasta = np.searchsorted(self.anios_ordenados, anios[1], side='right')
+            posiciones = np.sort(self.orden_anio[desde:hasta])
+        elif self.libres:
+            # orden_anio tiene solo las posiciones de filas que siguen en la tabla
+            posiciones = np.sort(self.orden_anio)
+        else:
+            posiciones = np.arange(len(self.etiquetas))
+
+        if generos:
+            mascara = mascara_generos(generos)
+            comunes = self.mascaras[posiciones] & mascara
+            posiciones = posiciones[comunes == mascara if todos_los_generos else comunes != 0]
+
+        if nombre is not None:
+            for palabra in tokens(nombre):
+                posiciones = np.intersect1d(posiciones, self._por_prefijo(palabra), assume_unique=True)
+
+        return self.etiquetas[posiciones]
+
+    def conteos(self, etiquetas) -> tuple:
+        """Cantidad de películas por año y por género entre las etiquetas dadas."""
+        posiciones = self.posiciones_de(etiquetas)
+        anios = pd.Series(self.anios[posiciones])
+        por_anio = anios[anios >= 0].value_counts().sort_index()
+        bits = (self.mascaras[posiciones, None] >> np.arange(len(GENEROS))) & 1
+        por_genero = pd.Series(bits.sum(axis=0), index=GENEROS)
+        return por_anio, por_genero
@@ -0,0 +1,210 @@
+import itertools
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+
+class IndiceTabla:
+    """Índice hash persistente sobre un DataFrame.
+
+    Mantiene tres diccionarios para que las búsquedas e inserciones cuesten O(1)
+    en lugar de recorrer toda la tabla:
+    - por_id: valor de la columna clave -> etiqueta de la fila.
+    - por_fila: tupla con los valores de la fila -> etiquetas con esos valores.
+    - por_etiqueta: etiqueta -> tupla de la fila (para poder quitarla después).
+    Además lleva el mayor id, para asignar ids nuevos sin recorrer la columna.
+
+    El índice solo se entera de los cambios hechos con los métodos que lo mantienen
+    (DataBase, individuos, lotes, eliminar_filas). indice_de solo detecta los cambios de
+    largo o de columnas: si una tabla cambia valores por fuera de ellos, su índice tiene
+    que reconstruirse con reconstruir.
+    """
+
+    def __init__(self, df: pd.DataFrame, columna_id: str = 'id'):
+        self.columna_id = columna_id
+        self.reconstruir(df)
+
+    def reconstruir(self, df: pd.DataFrame) -> None:
+        """Arma el índice desde cero recorriendo la tabla una sola vez."""
+        self.columnas = list(df.columns)
+        self._pos_id = self.columnas.index(
+            self.columna_id) if self.columna_id in self.columnas else None
+        self.por_id = {}
+        self.por_fila = {}
+        self.por_etiqueta = {}
+        self._maximo = None
+        for etiqueta, fila in zip(df.index.tolist(), df.itertuples(index=False, name=None)):
+            self._registrar(etiqueta, fila)
+
+    @property
+    def largo(self) -> int:
+        return len(self.por_etiqueta)
+
+    def clave(self, elemento: dict) -> tuple:
+        """Lleva un diccionario al formato de fila usado como clave del índice."""
+        return tuple(elemento.get(col) for col in self.columnas)
+
+    def _registrar(self, etiqueta, fila: tuple) -> None:
+        self.por_etiqueta[etiqueta] = fila
+        if self._pos_id is not None:
+            valor_id = fila[self._pos_id]
+            self.por_id[valor_id] = etiqueta
+            try:
+                if self._maximo is None or valor_id > self._maximo:
+                    self._maximo = valor_id
+            except TypeError:
+                pass
+        try:
+            self.por_fila.setdefault(fila, set()).add(etiqueta)
+        except TypeError:
+            # filas con valores no hasheables (listas) solo se indexan por id
+            pass
+
+    def agregar(self, etiqueta, elemento: dict) -> None:
+        """Registra una fila nueva o reemplaza la que tenía esa etiqueta."""
+        if etiqueta in self.por_etiqueta:
+            self.quitar(etiqueta)
+        self._registrar(etiqueta, self.clave(elemento))
+
+    def quitar(self, etiqueta) -> None:
+        """Saca del índice la fila indicada por etiqueta."""
+        fila = self.por_etiqueta.pop(etiqueta, None)
+        if fila is None:
+            return
+        if self._pos_id is not None and self.por_id.get(fila[self._pos_id]) == etiqueta:
+            del self.por_id[fila[self._pos_id]]
+            if fila[self._pos_id] == self._maximo:
+                # se recalcula recién cuando se pida un id nuevo
+                self._maximo = None
+        try:
+            etiquetas = self.por_fila.get(fila)
+        except TypeError:
+            return
+        if etiquetas is not None:
+            etiquetas.discard(etiqueta)
+            if not etiquetas:
+                del self.por_fila[fila]
+
+    def etiqueta(self, valor_id):
+        """Devuelve la etiqueta de la fila con ese id, o None si no existe."""
+        try:
+            return self.por_id.get(valor_id)
+        except TypeError:
+            # un id no hasheable (por ejemplo una lista vacía) nunca está asignado
+            return None
+
+    def proximo_id(self) -> int:
+        """Id siguiente al mayor asignado (1 si la tabla está vacía), como max()+1 sobre la
+        columna pero sin recorrerla: solo se recorren los ids si se quitó la fila del mayor."""
+        if self._maximo is None and self.por_id:
+            self._maximo = max((valor for valor in self.por_id if isinstance(valor, (int, np.integer))),
+                               default=None)
+        return 1 if self._maximo is None else int(self._maximo) + 1
+
+    def tiene_etiqueta(self, etiqueta) -> bool:
+        return etiqueta in self.por_etiqueta
+
+    def existe_id(self, valor_id, excluir=None) -> bool:
+        """Indica si el id está asignado a alguna fila distinta de excluir."""
+        etiqueta = self.etiqueta(valor_id)
+        return etiqueta is not None and etiqueta != excluir
+
+    def existe_fila(self, elemento: dict, excluir=None) -> bool:
+        """Indica si hay una fila idéntica a elemento, sin contar la fila excluir."""
+        try:
+            etiquetas = self.por_fila.get(self.clave(elemento), ())
+        except TypeError:
+            return False
+        return any(etiqueta != excluir for etiqueta in etiquetas)
+
+
+# un índice por (DataFrame, columna). Se libera cuando el DataFrame deja de existir.
+_indices = {}
+# funciones oyente(df, ids, destino) a las que se avisa de los cambios en las tablas (ver avisar)
+_oyentes = []
+# evita que dos hilos armen o reconstruyan el mismo índice a la vez
+_lock = threading.Lock()
+# id(df) -> versión de la tabla (ver version); las versiones salen de un único contador, así
+# dos DataFrames nunca comparten versión. La entrada se borra cuando el DataFrame deja de existir
+_versiones = {}
+_contador = itertools.count(1)
+_lock_versiones = threading.Lock()
+
+
+def indice_de(df: pd.DataFrame, columna_id: str = 'id') -> IndiceTabla:
+    """Devuelve el índice asociado a df, creándolo la primera vez.
+
+    Si la tabla cambió de tamaño o de columnas por fuera de los métodos que
+    mantienen el índice, se reconstruye antes de devolverlo.
+    """
+    clave = (id(df), columna_id)
+    with _lock:
+        indice = _indices.get(clave)
+        if indice is None:
+            indice = IndiceTabla(df, columna_id)
+            _indices[clave] = indice
+            weakref.finalize(df, _indices.pop, clave, None)
+        elif indice.largo != len(df) or indice.columnas != list(df.columns):
+            indice.reconstruir(df)
+        return indice
+
+
+def trasladar(origen: pd.DataFrame, destino: pd.DataFrame, columna_id: str = 'id') -> None:
+    """Mueve el índice de origen a destino (por ejemplo, el resultado de una
+    concatenación) para no tener que reconstruirlo. origen queda sin índice."""
+    indice = _indices.pop((id(origen), columna_id), None)
+    if indice is None:
+        return
+    clave = (id(destino), columna_id)
+    if clave not in _indices:
+        weakref.finalize(destino, _indices.pop, clave, None)
+    _indices[clave] = indice
+
+
+def eliminar_filas(df: pd.DataFrame, etiquetas) -> None:
+    """Elimina de df (en el lugar) las filas indicadas y actualiza los índices que
+    ya tenga armados, sin crear índices nuevos."""
+    registrados = [indice for (ident, _), indice in _indices.items()
+                   if ident == id(df) and indice.largo == len(df)]
+    ids = df.loc[etiquetas, 'id'].tolist() if _oyentes and 'id' in df.columns else None
+    df.drop(etiquetas, inplace=True)
+    for indice in registrados:
+        for etiqueta in etiquetas:
+            indice.quitar(etiqueta)
+    avisar(df, ids)
+
+
+def suscribir(oyente) -> None:
+    """Registra una estructura derivada de las tablas que no es un índice (por ejemplo las
+    vistas de vista_scores) para que se entere de los cambios. Ver avisar."""
+    _oyentes.append(oyente)
+
+
+def version(df) -> int:
+    """Versión actual de una tabla. Cambia con cada aviso de avisar sobre ella y es distinta
+    para cada DataFrame, aunque Python reutilice el id de uno que ya no existe."""
+    if not isinstance(df, pd.DataFrame):
+        return 0
+    clave = id(df)
+    with _lock_versiones:
+        actual = _versiones.get(clave)
+        if actual is None:
+            actual = _versiones[clave] = next(_contador)
+            weakref.finalize(df, _versiones.pop, clave, None)
+        return actual
+
+
+def avisar(df: pd.DataFrame, ids=None, destino: pd.DataFrame = None) -> None:
+    """Avisa a los oyentes que cambiaron filas de df y cambia su versión.
+    Args:
+        ids: valores de id de las filas agregadas, modificadas o eliminadas (None si no se saben).
+        destino: tabla que reemplaza a df, cuando el cambio crea un DataFrame nuevo
+            (por ejemplo una concatenación).
+    """
+    with _lock_versiones:
+        if id(df) in _versiones:
+            _versiones[id(df)] = next(_contador)
+    for oyente in _oyentes:
+        oyente(df, ids, destino)
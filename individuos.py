@@ -2,8 +2,35 @@ import pandas as pd
 from datetime import datetime
 import numpy as np
 
+from almacenamiento import asignar_fila, etiqueta_nueva
+from duplicados import IndiceDuplicados, actualizar_duplicados, indice_duplicados, quitar_duplicados
+from esquema import convertir_fila
+from indices import avisar, indice_de
+from integridad import GrafoIntegridad, filas_eliminadas
+from lotes import insertar_lote
+from metricas import instrumentado, una_fila
+
+#formas de resolver un alta con nombre repetido
+POLITICAS = ('preguntar', 'rechazar', 'crear', 'asociar')
+
+
+def _combinar_reportes(reporte, reporte_secundario):
+
+    #reporte_secundario tiene una fila por cada fila aceptada en reporte. Una fila queda aceptada
+    #solo si fue aceptada en los dos pasos
+
+    aceptados = reporte.index[reporte['aceptado'].astype(bool)]
+    reporte = reporte.copy()
+    reporte.loc[aceptados, 'aceptado'] = reporte_secundario['aceptado'].values
+    reporte.loc[aceptados, 'motivo'] = reporte_secundario['motivo'].values
+    return reporte
+
+
 class Persona:
 
+    #__slots__ evita un diccionario por instancia; las altas en lote crean muchos objetos
+    __slots__ = ('numero_identificacion', 'nombre_completo', 'codigo_postal', 'fecha_nacimiento', 'genero')
+
     def __init__(self, nombre_completo, codigo_postal, 
     fecha_nacimiento, genero):
 
@@ -14,8 +41,15 @@ class Persona:
         self.genero = genero
         
  
-    def alta_persona(self,df_personas):
+    @instrumentado('Persona.alta_persona', filas=una_fila)
+    def alta_persona(self,df_personas,politica='preguntar',id_existente=None):
+
+        #politica indica que hacer si hay entradas similares: 'crear' da de alta una persona nueva,
+        #'asociar' escribe los datos sobre la persona id_existente (o la mas parecida) y 'rechazar' cancela la operacion.
+        #Con 'preguntar' se decide por consola, como siempre; las otras sirven cuando no hay nadie que responda
 
+        if politica not in POLITICAS:
+            raise ValueError(f'politica debe ser una de {POLITICAS}')
 
         is_already = self.check_if_already_exists(df_personas)
         similarities = self.check_similar_entries(df_personas)
@@ -27,51 +61,51 @@ class Persona:
 
         elif   similarities:
 
+            if politica == 'preguntar':
 
-            print('\n Se encontraron las siguientes entradas similares en la base de datos de personas \n\n')
+                print('\n Se encontraron las siguientes entradas similares en la base de datos de personas \n\n')
 
-            print(df_personas.loc[df_personas['Full Name'] == self.nombre_completo])
+                print(df_personas.loc[similarities])
 
-            proceed = input('\n Desea dar de alta una nueva persona? (Y/N)\n ')
+                proceed = input('\n Desea dar de alta una nueva persona? (Y/N)\n ')
 
-            if proceed.lower() == 'y':
-                self.numero_identificacion = 1+df_personas['id'].max()
-
-                df_personas.loc[len(df_personas)] = {'id':self.numero_identificacion,
-                                                'Full Name':self.nombre_completo,
-                                                'Zip Code':self.codigo_postal,
-                                                'year of birth':self.fecha_nacimiento,
-                                                'Gender':self.genero}
+                if proceed.lower() == 'y':
+                    politica = 'crear'
+                else:
+                    nextStep = input('Desea asociar estos datos a un usuario existente?(Y/N)\n')
+                    if nextStep.lower() == 'y':
+                        politica = 'asociar'
+                        id_existente = int(input('Ingrese ID deseado  '))
+                    else:
+                        politica = 'rechazar'
+
+            if politica == 'crear':
+                self.numero_identificacion = indice_de(df_personas).proximo_id()
+                self._agregar_fila(df_personas, etiqueta_nueva(df_personas), self.get_person_data())
                 return True
-            else:
-                nextStep = input('Desea asociar estos datos a un usuario existente?(Y/N)\n')
-                if nextStep.lower() == 'y':
+            elif politica == 'asociar':
 
-                    existing_id = int(input('Ingrese ID deseado  '))
-                    self.numero_identificacion = existing_id
-            
-                    id_row = self.get_row_index_from_condition(df_personas,'id',existing_id)
-
-                    df_personas.loc[id_row] = { 'id':self.numero_identificacion,
-                                            'Full Name':self.nombre_completo,
-                                            'Zip Code':self.codigo_postal,
-                                            'year of birth':self.fecha_nacimiento,
-                                            'Gender':self.genero}
-                    return True                        
-                else:
-                    print('Error. Operación cancelada')
+                if id_existente is None:
+                    id_existente = df_personas.at[similarities[0], 'id']
+
+                id_row = self.get_row_index_from_condition(df_personas,'id',id_existente)
+                if isinstance(id_row, list):
+                    print(f'No existe una persona con id {id_existente}. Operación cancelada')
                     return False
 
+                self.numero_identificacion = id_existente
 
-        elif not is_already and not similarities:
+                self._agregar_fila(df_personas, id_row, self.get_person_data())
+                return True                        
+            else:
+                print('Error. Operación cancelada')
+                return False
 
-            self.numero_identificacion = 1+df_personas['id'].max()
 
-            df_personas.loc[len(df_personas)] = {'id':self.numero_identificacion,
-                                                'Full Name':self.nombre_completo,
-                                                'Zip Code':self.codigo_postal,
-                                                'year of birth':self.fecha_nacimiento,
-                                                'Gender':self.genero}
+        elif not is_already and not similarities:
+
+            self.numero_identificacion = indice_de(df_personas).proximo_id()
+            self._agregar_fila(df_personas, etiqueta_nueva(df_personas), self.get_person_data())
         else:
             print('Error. Operación de alta cancelada')
             return False
@@ -79,9 +113,45 @@ class Persona:
     
     
 
+    @classmethod
+    @instrumentado('alta_many', filas=lambda resultado, *_: len(resultado[-1]), por_clase=True)
+    def alta_many(cls, df_personas, personas):
+
+        #Alta en lote. personas puede ser una lista de objetos Persona, una lista de diccionarios con las
+        #columnas del DF o un DataFrame. Se valida todo el lote en una pasada, los ids se asignan en bloque
+        #y se concatena una sola vez. En lote no se puede preguntar por consola, asi que las entradas
+        #similares se rechazan y quedan en el reporte.
+        #Devuelve el DF nuevo (reemplaza al que se paso) y un reporte con una fila por persona
+
+        if isinstance(personas, pd.DataFrame):
+            personas = personas.to_dict('records')
+
+        filas = []
+        for persona in personas:
+            fila = persona.get_person_data() if isinstance(persona, Persona) else dict(persona)
+            if isinstance(fila.get('id'), list):
+                fila['id'] = None
+            filas.append(fila)
+
+        indice = indice_duplicados(df_personas)
+        lote = IndiceDuplicados(df_personas.iloc[:0])
+
+        def validar(fila):
+            if indice.similares(fila) or lote.similares(fila):
+                return 'Se encontraron entradas similares en la base de datos de personas'
+            lote.agregar(len(lote.filas), fila)
+            return None
+
+        df_personas, reporte = insertar_lote(df_personas, filas, validar=validar)
+
+        for persona, id_asignado, aceptado in zip(personas, reporte['id'], reporte['aceptado']):
+            if aceptado and isinstance(persona, Persona):
+                persona.numero_identificacion = id_asignado
+        return df_personas, reporte
+
     def check_if_already_exists(self,df):
 
-        if self.numero_identificacion in df['id'].values:
+        if indice_de(df).existe_id(self.numero_identificacion):
             
             return True
         else:
@@ -90,12 +160,11 @@ class Persona:
 
     def check_similar_entries(self,df_personas):
 
-        if self.nombre_completo in df_personas['Full Name'].values:
+        #Busca personas probablemente repetidas (nombre parecido, mismo anio o codigo postal) en el indice
+        #de duplicados por bloques, sin recorrer todo el DF. Devuelve sus etiquetas, de la mas parecida a la menos
 
-            return True
-        else:
-
-            return False
+        similares = indice_duplicados(df_personas).similares(self.get_person_data())
+        return [etiqueta for etiqueta, _ in similares]
 
 
     def get_person_data(self):
@@ -107,29 +176,55 @@ class Persona:
                 'Gender': self.genero}
 
     def get_row_index_from_condition(self,df,column_name,matching_value):
-        
-         row_ix = (np.arange(0,len(df),1)[df[column_name].values == matching_value])
-         if len(row_ix) > 0:
-            row_ix = int(row_ix)
-         return row_ix
 
-    def baja_persona(self,df_personas,df_usuarios,df_trabajadores):
+        #Busca la etiqueta de la fila en el indice hash de la columna (debe ser una clave unica).
+        #Si no hay coincidencias devuelve una lista vacia, que drop ignora
+
+        row_ix = indice_de(df, column_name).etiqueta(matching_value)
+        if row_ix is None:
+            return []
+        return row_ix
+
+    def _agregar_fila(self, df, row_ix, fila):
+
+        #Escribe la fila en el DF y actualiza su indice en O(1). Los valores se llevan antes a los
+        #tipos de las columnas del DF
+
+        indice = indice_de(df)
+        fila = convertir_fila(df, fila)
+        asignar_fila(df, row_ix, fila)
+        indice.agregar(row_ix, fila)
+        actualizar_duplicados(df, row_ix, fila)
+        avisar(df, [fila.get('id')])
+
+    def _quitar_fila(self, df, row_ix):
+
+        indice = indice_de(df)
+        ids = df.loc[row_ix, 'id'].tolist() if isinstance(row_ix, list) else [df.at[row_ix, 'id']]
+        df.drop(row_ix, inplace=True)
+        if not isinstance(row_ix, list):
+            indice.quitar(row_ix)
+            quitar_duplicados(df, row_ix)
+        avisar(df, ids)
+
+    @instrumentado('Persona.baja_persona', filas=filas_eliminadas)
+    def baja_persona(self,df_personas,df_usuarios,df_trabajadores,df_scores=None):
 
         #Toma TODOS los DF para que no quede nada en usuarios o trabajadores sin una persona asignada. Si borro persona, purgo todo
+        #La cascada la resuelve el grafo de claves foraneas; si se pasa df_scores tambien se borran sus calificaciones
+        #Devuelve el reporte con las filas eliminadas en cada tabla
+
+        tablas = {'personas': df_personas, 'usuarios': df_usuarios, 'trabajadores': df_trabajadores}
+        if df_scores is not None:
+            tablas['scores'] = df_scores
+        return GrafoIntegridad().baja_en_cascada(tablas, 'personas', [self.numero_identificacion])
 
-        row_id_personas = self.get_row_index_from_condition(df_personas,'id',self.numero_identificacion)
-        row_id_trabajadores = self.get_row_index_from_condition(df_trabajadores,'id',self.numero_identificacion)
-        row_id_usuarios = self.get_row_index_from_condition(df_usuarios,'id',self.numero_identificacion)
 
-        df_trabajadores.drop(row_id_trabajadores, inplace=True)
-        df_usuarios.drop(row_id_usuarios, inplace=True)
-        df_personas.drop(row_id_personas, inplace=True)
-    
-        
 
 
 class Trabajador(Persona):
 
+    __slots__ = ('fecha_alta', 'puesto', 'horario_laboral', 'categoria')
     
     def __init__(self, puesto, categoria, horario_laboral, datos_persona): 
 
@@ -161,9 +256,10 @@ class Trabajador(Persona):
 
         
        
-    def alta_trabajador(self,df_personas,df_trabajadores):
+    @instrumentado('Trabajador.alta_trabajador', filas=una_fila)
+    def alta_trabajador(self,df_personas,df_trabajadores,politica='preguntar',id_existente=None):
 
-        succesful_update = self.alta_persona(df_personas)
+        succesful_update = self.alta_persona(df_personas,politica,id_existente)
 
         if succesful_update:
 
@@ -176,15 +272,39 @@ class Trabajador(Persona):
 
                 self.fecha_alta = datetime.now() 
 
-                df_trabajadores.loc[len(df_trabajadores)] = {'id': self.numero_identificacion, 
+                self._agregar_fila(df_trabajadores, etiqueta_nueva(df_trabajadores), {'id': self.numero_identificacion, 
                                                             'Position' : self.puesto, 
                                                             'Start Date':self.fecha_alta, 
                                                             'Working Hours': self.horario_laboral,
-                                                            'Category': self.categoria}
+                                                            'Category': self.categoria})
         else: 
             print('No puede darse de alta el trabajador')
 
 
+    @classmethod
+    @instrumentado('alta_many', filas=lambda resultado, *_: len(resultado[-1]), por_clase=True)
+    def alta_many(cls, df_personas, df_trabajadores, trabajadores):
+
+        #Alta en lote: primero las personas y despues los trabajadores cuya persona fue aceptada,
+        #cada paso con una sola concatenacion. Devuelve los dos DF nuevos y un reporte por fila
+
+        df_personas, reporte = Persona.alta_many(df_personas, trabajadores)
+        fecha_alta = datetime.now()
+
+        aceptados = [trabajador for trabajador, ok in zip(trabajadores, reporte['aceptado']) if ok]
+        filas = []
+        for trabajador in aceptados:
+            trabajador.fecha_alta = fecha_alta
+            filas.append({'id': trabajador.numero_identificacion,
+                          'Position' : trabajador.puesto,
+                          'Start Date': trabajador.fecha_alta,
+                          'Working Hours': trabajador.horario_laboral,
+                          'Category': trabajador.categoria})
+
+        df_trabajadores, reporte_trabajadores = insertar_lote(df_trabajadores, filas)
+        return df_personas, df_trabajadores, _combinar_reportes(reporte, reporte_trabajadores)
+
+    @instrumentado('Trabajador.baja_trabajador', filas=una_fila)
     def baja_trabajador(self,df_trabajadores):
 
         #verifica que no estemos metiendo mano en cualquier lado
@@ -194,7 +314,7 @@ class Trabajador(Persona):
             row_id = self.get_row_index_from_condition(df_trabajadores,'id',self.numero_identificacion)
             #print(row_id)
 
-            df_trabajadores.drop(row_id, inplace=True)
+            self._quitar_fila(df_trabajadores, row_id)
         else: 
             print('DataFrame no compatible')
     
@@ -206,6 +326,8 @@ class Trabajador(Persona):
 
 
 class Usuario(Persona):
+
+    __slots__ = ('fecha_alta', 'ocupacion')
       
     def __init__(self, ocupacion,datos_persona):
 
@@ -235,9 +357,10 @@ class Usuario(Persona):
         
 
 
-    def alta_usuario(self,df_personas,df_usuarios):
+    @instrumentado('Usuario.alta_usuario', filas=una_fila)
+    def alta_usuario(self,df_personas,df_usuarios,politica='preguntar',id_existente=None):
 
-        succesful_update = self.alta_persona(df_personas)
+        succesful_update = self.alta_persona(df_personas,politica,id_existente)
 
         if succesful_update:
 
@@ -250,13 +373,35 @@ class Usuario(Persona):
 
                 self.fecha_alta = datetime.now()
 
-                df_usuarios.loc[len(df_usuarios)] = {'id':self.numero_identificacion,
+                self._agregar_fila(df_usuarios, etiqueta_nueva(df_usuarios), {'id':self.numero_identificacion,
                                                     'Occupation':self.ocupacion,
-                                                    'Active Since':self.fecha_alta}
+                                                    'Active Since':self.fecha_alta})
         else: 
             
             print('No puede darse de alta el usuario')
 
+    @classmethod
+    @instrumentado('alta_many', filas=lambda resultado, *_: len(resultado[-1]), por_clase=True)
+    def alta_many(cls, df_personas, df_usuarios, usuarios):
+
+        #Alta en lote: primero las personas y despues los usuarios cuya persona fue aceptada,
+        #cada paso con una sola concatenacion. Devuelve los dos DF nuevos y un reporte por fila
+
+        df_personas, reporte = Persona.alta_many(df_personas, usuarios)
+        fecha_alta = datetime.now()
+
+        aceptados = [usuario for usuario, ok in zip(usuarios, reporte['aceptado']) if ok]
+        filas = []
+        for usuario in aceptados:
+            usuario.fecha_alta = fecha_alta
+            filas.append({'id': usuario.numero_identificacion,
+                          'Occupation': usuario.ocupacion,
+                          'Active Since': usuario.fecha_alta})
+
+        df_usuarios, reporte_usuarios = insertar_lote(df_usuarios, filas)
+        return df_personas, df_usuarios, _combinar_reportes(reporte, reporte_usuarios)
+
+    @instrumentado('Usuario.baja_usuario', filas=una_fila)
     def baja_usuario(self,df_usuarios):
 
         if df_usuarios.columns[1] == 'Occupation':
@@ -264,7 +409,7 @@ class Usuario(Persona):
             row_id = self.get_row_index_from_condition(df_usuarios,'id',self.numero_identificacion)
             #print(row_id)
 
-            df_usuarios.drop(row_id, inplace=True)
+            self._quitar_fila(df_usuarios, row_id)
         else: 
             print('DataFrame no compatible')
 
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+
+from almacenamiento import a_texto, formato, partes
+from esquema import ESQUEMAS, aplicar
+
+TAMANIO_BLOQUE = 100_000
+
+
+def _bloques_csv(ruta, tamanio_bloque):
+    # read_csv por bloques mantiene las etiquetas correlativas entre bloques
+    with pd.read_csv(ruta, chunksize=tamanio_bloque) as lector:
+        yield from lector
+
+
+def _bloques_parquet(ruta, tamanio_bloque):
+    import pyarrow.parquet as pq
+
+    inicio = 0
+    archivo = pq.ParquetFile(ruta, memory_map=True)
+    for lote in archivo.iter_batches(batch_size=tamanio_bloque):
+        bloque = lote.to_pandas()
+        bloque.index = pd.RangeIndex(inicio, inicio + len(bloque))
+        inicio += len(bloque)
+        yield bloque
+
+
+def _bloques_feather(ruta, tamanio_bloque):
+    import pyarrow as pa
+
+    # el archivo se mapea en memoria: cada porción se lee sin copiar hasta pasarla a pandas
+    inicio = 0
+    with pa.memory_map(str(ruta)) as fuente:
+        lector = pa.ipc.open_file(fuente)
+        for i in range(lector.num_record_batches):
+            lote = lector.get_batch(i)
+            for desde in range(0, lote.num_rows, tamanio_bloque):
+                bloque = lote.slice(desde, tamanio_bloque).to_pandas()
+                bloque.index = pd.RangeIndex(inicio, inicio + len(bloque))
+                inicio += len(bloque)
+                yield bloque
+
+
+LECTORES_POR_BLOQUES = {
+    'csv': _bloques_csv,
+    'parquet': _bloques_parquet,
+    'feather': _bloques_feather,
+}
+
+
+def leer_por_bloques(ruta, tamanio_bloque: int = TAMANIO_BLOQUE):
+    """Recorre una tabla en bloques de a lo sumo tamanio_bloque filas.
+
+    Los bloques conservan las etiquetas que tendrían al leer el archivo completo (en una
+    tabla particionada, las de todas sus partes juntas).
+    """
+    leidas = 0
+    for parte in partes(ruta):
+        inicio = leidas
+        for bloque in LECTORES_POR_BLOQUES[formato(ruta)](parte, tamanio_bloque):
+            bloque.index = bloque.index + inicio
+            leidas += len(bloque)
+            yield bloque
+
+
+class EscritorPorBloques:
+    """Escribe una tabla bloque a bloque en el formato indicado por la extensión de ruta.
+
+    Se usa como context manager:
+        with EscritorPorBloques('scores.parquet') as escritor:
+            escritor.escribir(bloque)
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.formato = formato(ruta)
+        self._destino = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+    def escribir(self, bloque: pd.DataFrame) -> None:
+        if self.formato == 'csv':
+            primero = self._destino is None
+            if primero:
+                self._destino = open(self.ruta, 'w', newline='')
+            a_texto(bloque).to_csv(self._destino, header=primero, index=False)
+            return
+
+        import pyarrow as pa
+
+        tabla = pa.Table.from_pandas(bloque, preserve_index=False)
+        if self._destino is None:
+            if self.formato == 'parquet':
+                import pyarrow.parquet as pq
+                self._destino = pq.ParquetWriter(self.ruta, tabla.schema)
+            else:
+                self._destino = pa.ipc.new_file(str(self.ruta), tabla.schema)
+        self._destino.write_table(tabla)
+
+    def cerrar(self) -> None:
+        if self._destino is not None:
+            self._destino.close()
+            self._destino = None
+
+
+def _filtro(ids_usuarios, ids_peliculas):
+    # los conjuntos de ids se pasan una sola vez a arrays para que isin no los convierta en cada bloque
+    ids_usuarios = np.unique(np.asarray(list(ids_usuarios)))
+    ids_peliculas = np.unique(np.asarray(list(ids_peliculas)))
+
+    def filtrar(bloque):
+        validos = (bloque['user_id'].isin(ids_usuarios).values
+                   & bloque['movie_id'].isin(ids_peliculas).values)
+        return bloque[validos]
+    return filtrar
+
+
+def filtrar_scores(origen, destino, ids_usuarios, ids_peliculas,
+                   tamanio_bloque: int = TAMANIO_BLOQUE) -> dict:
+    """Limpia un archivo de scores sin cargarlo entero en memoria.
+
+    Cada bloque se filtra contra los ids de usuarios y películas válidos, se pasa
+    a los tipos del esquema de scores y se escribe en destino, así que el pico de memoria depende de tamanio_bloque y
+    no del tamaño del archivo.
+
+    Args:
+        origen: archivo de scores (csv, parquet o feather).
+        destino: archivo donde se escriben los scores consistentes.
+        ids_usuarios (iterable): ids presentes en la tabla de usuarios.
+        ids_peliculas (iterable): ids presentes en la tabla de películas.
+        tamanio_bloque (int): cantidad máxima de filas en memoria por bloque.
+
+    Returns: diccionario con la cantidad de filas leídas, escritas y descartadas.
+    """
+    filtrar = _filtro(ids_usuarios, ids_peliculas)
+    leidas = escritas = 0
+    with EscritorPorBloques(destino) as escritor:
+        for bloque in leer_por_bloques(origen, tamanio_bloque):
+            limpio = aplicar(filtrar(bloque), 'scores')
+            escritor.escribir(limpio)
+            leidas += len(bloque)
+            escritas += len(limpio)
+    return {'leidas': leidas, 'escritas': escritas, 'descartadas': leidas - escritas}
+
+
+def cargar_scores(ruta, ids_usuarios, ids_peliculas, tamanio_bloque: int = TAMANIO_BLOQUE):
+    """Carga en memoria solo los scores consistentes, leyendo el archivo por bloques.
+
+    El pico de memoria es el resultado más un bloque, en lugar del archivo completo.
+    Cada bloque se pasa a los tipos del esquema de scores antes de juntarlos.
+
+    Returns: tupla (scores, conteos). conteos tiene la cantidad de filas leídas,
+        cargadas y descartadas, como filtrar_scores.
+    """
+    filtrar = _filtro(ids_usuarios, ids_peliculas)
+    bloques = []
+    leidas = 0
+    for bloque in leer_por_bloques(ruta, tamanio_bloque):
+        bloques.append(aplicar(filtrar(bloque), 'scores'))
+        leidas += len(bloque)
+    if bloques:
+        df = pd.concat(bloques)
+    else:
+        # un archivo sin filas no da ningún bloque: tabla vacía con las columnas y tipos de scores
+        df = aplicar(pd.DataFrame(columns=list(ESQUEMAS['scores'])), 'scores')
+    return df, {'leidas': leidas, 'cargadas': len(df), 'descartadas': leidas - len(df)}
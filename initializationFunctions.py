@@ -1,63 +1,187 @@
 
+import threading
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
 
+import estadisticas
+import guardado
+from almacenamiento import leer_tabla
+from ingesta import cargar_scores
+from integridad import GrafoIntegridad, filas_eliminadas
+from metricas import instrumentado
+
+#tablas del sistema, en el orden en que las reciben y devuelven load_all, load_lazy y save_all
+TABLAS = ['personas', 'trabajadores', 'usuarios', 'peliculas', 'scores']
+
+
+@instrumentado(filas=lambda tablas, *_, **__: sum(len(df) for df in tablas))
+def load_all(file_personas, file_trabajadores, file_usuarios, file_peliculas, file_scores, scores_chunksize=None,
+             procesos=None, manifiesto=None):
+
+    #El formato de cada archivo (csv, parquet o feather) se toma de su extension
+    #Cada tabla se lee con los tipos compactos de su esquema (esquema.py)
+    #Si se indica scores_chunksize, los scores se leen por bloques de esa cantidad de filas y cada
+    #bloque se filtra al leerlo, asi nunca esta el archivo completo en memoria
+    #Si se indica procesos, el chequeo de los scores y las estadisticas se reparten en ese numero de
+    #procesos, con los scores particionados por user_id (ver paralelo.py)
+    #Si hay un manifiesto de save_all (por defecto manifiesto.json junto a file_personas), las tablas
+    #cuyo archivo no cambio desde que se guardaron validadas, y cuyos padres tienen las mismas claves,
+    #no se vuelven a validar (ver guardado.py)
+
+    archivos = dict(zip(TABLAS, [file_personas, file_trabajadores, file_usuarios, file_peliculas, file_scores]))
+    ruta = guardado.ruta_manifiesto(archivos.values()) if manifiesto is None else Path(manifiesto)
+    guardadas = guardado.leer_manifiesto(ruta)
+    entradas = {tabla: guardado.coincide(guardadas, tabla, archivo, ruta.parent)
+                for tabla, archivo in archivos.items()}
+
+    #las claves foraneas se resuelven en orden topologico (personas antes que usuarios, usuarios y
+    #peliculas antes que scores): cada tabla se limpia contra sus padres ya limpios
+    grafo = GrafoIntegridad()
+    tablas = {}
+    reportes = []
+    for tabla in grafo.orden:
+        padres = {padre: tablas[padre] for padre, _, hija, _ in grafo.relaciones if hija == tabla}
+        vigente = guardado.validada(entradas[tabla], tabla, tablas)
+        if tabla != 'scores' or vigente:
+            tablas[tabla] = leer_tabla(archivos[tabla], tabla)
+            if vigente:
+                continue
+            if tabla != 'scores':
+                tablas[tabla].drop_duplicates(inplace=True)
+                reportes.append(grafo.verificar({tabla: tablas[tabla], **padres}))
+        elif scores_chunksize is not None:
+            #los scores se filtran por bloques contra las tablas ya limpias
+            tablas['scores'], conteos = cargar_scores(archivos['scores'], padres['usuarios']['id'],
+                                                      padres['peliculas']['id'], scores_chunksize)
+            reportes.append(pd.DataFrame({'hija': ['scores'], 'eliminadas': [conteos['descartadas']]}))
+        elif procesos is not None:
+            #los scores se chequean contra las tablas ya limpias, por particiones en varios procesos
+            from paralelo import verificar_scores
+            tablas['scores'] = leer_tabla(archivos['scores'], 'scores')
+            reportes.append(verificar_scores(tablas, procesos))
+        else:
+            tablas['scores'] = leer_tabla(archivos['scores'], 'scores')
+            reportes.append(grafo.verificar({'scores': tablas['scores'], **padres}))
+
+    if any(reporte['eliminadas'].sum() > 0 for reporte in reportes):
+        print('Se detectaron incosistencias. Serán elliminadas')
+    for tabla in TABLAS:
+        guardado.registrar_carga(tabla, tablas[tabla], archivos[tabla], entradas[tabla], tablas)
+    df_personas, df_trabajadores, df_usuarios, df_peliculas, df_scores = (tablas[tabla] for tabla in TABLAS)
 
-def load_all(file_personas, file_trabajadores, file_usuarios, file_peliculas, file_scores):
-
-    df_personas = pd.read_csv(file_personas)
-    df_usuarios = pd.read_csv(file_usuarios)
-    df_trabajadores = pd.read_csv(file_trabajadores)
-    df_peliculas = pd.read_csv(file_peliculas)
-    df_scores = pd.read_csv(file_scores)
-
-    df_personas.drop_duplicates(inplace=True)
-    df_usuarios.drop_duplicates(inplace=True)
-    df_trabajadores.drop_duplicates(inplace=True)
-    df_peliculas.drop_duplicates(inplace=True)
-    #df_scores.drop_duplicates()
-
-    make_consitent(df_personas,df_trabajadores,'id')
-    make_consitent(df_personas,df_usuarios,'id')
-    #primero limpio a los usuarios que no son personas
-    #despues limpio a los scores sin usuario
-    make_consitent(df_usuarios,df_scores,'user_id')
-    make_consitent(df_peliculas,df_scores,'movie_id')
-
-
-
-
-    
-
+    #los acumulados de calificaciones se arman una unica vez aca; despues se consultan con
+    #estadisticas.actuales() y se actualizan al agregar o quitar scores
+    estadisticas.registrar(estadisticas.EstadisticasScores(df_scores, df_usuarios, df_personas, df_peliculas,
+                                                           procesos=procesos))
 
     return df_personas, df_trabajadores, df_usuarios, df_peliculas, df_scores
 
 
-def  make_consitent(primary_df,secondary_df,column_name):
+class TablasPerezosas:
+    """Tablas del sistema que se leen recién la primera vez que se piden.
+
+    Cada tabla se limpia al leerla como en load_all, pero solo contra sus tablas
+    padre, que se leen antes si hace falta: pedir personas lee un solo archivo y
+    pedir scores lee usuarios, personas y películas, no trabajadores. Al leer
+    los scores se arman las estadísticas, igual que en load_all.
+
+    Se accede como tablas.personas o tablas['personas'], y desempaquetarla
+    (df_personas, df_trabajadores, ... = tablas) lee las cinco en el orden de load_all.
+    """
+
+    def __init__(self, file_personas, file_trabajadores, file_usuarios, file_peliculas, file_scores,
+                 scores_chunksize=None):
+        self.archivos = dict(zip(TABLAS, [file_personas, file_trabajadores, file_usuarios,
+                                          file_peliculas, file_scores]))
+        self.scores_chunksize = scores_chunksize
+        self._grafo = GrafoIntegridad()
+        self._tablas = {}
+        self._lock = threading.RLock()
+
+    def __getitem__(self, tabla: str) -> pd.DataFrame:
+        if tabla not in self.archivos:
+            raise KeyError(f"La tabla debe ser una de {TABLAS}")
+        with self._lock:
+            if tabla not in self._tablas:
+                self._cargar(tabla)
+            return self._tablas[tabla]
+
+    def __getattr__(self, nombre: str) -> pd.DataFrame:
+        if nombre in TABLAS:
+            return self[nombre]
+        raise AttributeError(nombre)
+
+    def __iter__(self):
+        return (self[tabla] for tabla in TABLAS)
+
+    def cargadas(self) -> list:
+        """Tablas que ya se leyeron."""
+        return [tabla for tabla in TABLAS if tabla in self._tablas]
+
+    def _cargar(self, tabla: str) -> None:
+        padres = {padre: self[padre] for padre, _, hija, _ in self._grafo.relaciones if hija == tabla}
+        if tabla == 'scores' and self.scores_chunksize is not None:
+            df, conteos = cargar_scores(self.archivos[tabla], padres['usuarios']['id'],
+                                        padres['peliculas']['id'], self.scores_chunksize)
+            if conteos['descartadas'] > 0:
+                print('Se detectaron incosistencias. Serán elliminadas')
+        else:
+            df = leer_tabla(self.archivos[tabla], tabla)
+            if tabla != 'scores':
+                df.drop_duplicates(inplace=True)
+            #las tablas padre ya estan limpias, asi que solo se eliminan filas de esta
+            reporte = self._grafo.verificar({tabla: df, **padres})
+            if reporte['eliminadas'].sum() > 0:
+                print('Se detectaron incosistencias. Serán elliminadas')
+        self._tablas[tabla] = df
+        if tabla == 'scores':
+            estadisticas.registrar(estadisticas.EstadisticasScores(
+                df, self['usuarios'], self['personas'], self['peliculas']))
+
+
+def load_lazy(file_personas, file_trabajadores, file_usuarios, file_peliculas, file_scores, scores_chunksize=None):
+
+    #Igual que load_all pero no lee nada hasta que se pide una tabla (ver TablasPerezosas).
+    #Sirve para scripts y procesos cortos que solo usan algunas tablas
+
+    return TablasPerezosas(file_personas, file_trabajadores, file_usuarios, file_peliculas, file_scores,
+                           scores_chunksize)
+
+
+@instrumentado(filas=filas_eliminadas)
+def  make_consitent(primary_df,secondary_df,column_name,primary_column_name=None):
      #Las entradas en primary deben estar en secondary. no necesariamente al revés
+     #primary_column_name es la columna de primary con la que se compara (por defecto la misma que en secondary)
+     #Es un chequeo de una sola relacion; load_all usa el grafo completo de integridad.py
 
+    if primary_column_name is None:
+        primary_column_name = column_name
 
-
-   # print(np.count_nonzero(primary_df.id.isin(secondary_df.id).values) == len(secondary_df) )
-
-    mismatch_indices = (np.arange(0,len(secondary_df),1)[~ secondary_df[column_name].isin(primary_df[column_name]).values])
-    if len(mismatch_indices) > 0:
+    grafo = GrafoIntegridad([('primary', primary_column_name, 'secondary', column_name)])
+    reporte = grafo.verificar({'primary': primary_df, 'secondary': secondary_df})
+    if reporte['eliminadas'].sum() > 0:
         print('Se detectaron incosistencias. Serán elliminadas')
-        mismatch_indices = list(mismatch_indices)
-
-    secondary_df.drop(mismatch_indices, inplace = True)
-
-    
-
- 
-   
-
-
-
-
-
-
-
-#def save_all(df_personas, df_trabajadores, df_usuarios, df_peliculas, df_scores, file_personas="personas.csv", file_trabajadores="trabajadores.csv", file_usuarios="usuarios.csv", file_peliculas="peliculas.csv", file_scores="scores.csv"):
-#Código de Salvado
-#return 0 # O -1 si hubo algún error 
\ No newline at end of file
+    return reporte
+
+
+@instrumentado(filas=lambda _, *tablas, **__: sum(len(df) for df in tablas[:5]))
+def save_all(df_personas, df_trabajadores, df_usuarios, df_peliculas, df_scores, file_personas="personas.csv", file_trabajadores="trabajadores.csv", file_usuarios="usuarios.csv", file_peliculas="peliculas.csv", file_scores="scores.csv",
+             manifiesto=None, filas_por_parte=None):
+
+    #Guarda los 5 DataFrames. El formato de cada archivo se toma de su extension, asi que
+    #por ejemplo file_scores="scores.parquet" guarda los scores en formato columnar
+    #Solo se escriben las tablas que cambiaron desde la ultima lectura o guardado, cada una en un
+    #archivo temporal que reemplaza al anterior, y se actualiza el manifiesto (ver guardado.py)
+    #filas_por_parte guarda tablas particionadas por rangos de filas, por ejemplo {'scores': 100000}:
+    #de ellas se reescriben solo los rangos que cambiaron
+
+    tablas = dict(zip(TABLAS, [df_personas, df_trabajadores, df_usuarios, df_peliculas, df_scores]))
+    archivos = dict(zip(TABLAS, [file_personas, file_trabajadores, file_usuarios, file_peliculas, file_scores]))
+    try:
+        guardado.guardar(tablas, archivos, manifiesto, filas_por_parte)
+    except Exception as e:
+        print(f'Ocurrió un error al guardar el sistema: {e}')
+        return -1
+    return 0
@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+from indices import eliminar_filas
+from metricas import instrumentado
+
+# claves foráneas del sistema: (tabla padre, columna padre, tabla hija, columna hija).
+# Toda fila de la hija debe tener su valor en la columna padre de la tabla padre.
+RELACIONES = [
+    ('personas', 'id', 'usuarios', 'id'),
+    ('personas', 'id', 'trabajadores', 'id'),
+    ('usuarios', 'id', 'scores', 'user_id'),
+    ('peliculas', 'id', 'scores', 'movie_id'),
+]
+
+COLUMNAS_REPORTE = ['padre', 'columna_padre', 'hija', 'columna_hija', 'eliminadas', 'etiquetas']
+
+
+def filas_eliminadas(reporte: pd.DataFrame, *_, **__) -> int:
+    """Total de filas eliminadas en un reporte (para las métricas de las operaciones)."""
+    return int(reporte['eliminadas'].sum())
+
+
+class GrafoIntegridad:
+    """Grafo de claves foráneas que resuelve las eliminaciones en cascada.
+
+    Las tablas se recorren en orden topológico (los padres antes que las hijas),
+    así el resultado no depende del orden en que se declaran las relaciones.
+    Cada chequeo es un semijoin vectorizado (isin) entre la columna hija y las
+    claves de la tabla padre.
+    """
+
+    def __init__(self, relaciones: list = RELACIONES):
+        self.relaciones = list(relaciones)
+        self.orden = self._orden_topologico()
+
+    def _orden_topologico(self) -> list:
+        tablas = []
+        for padre, _, hija, _ in self.relaciones:
+            for tabla in (padre, hija):
+                if tabla not in tablas:
+                    tablas.append(tabla)
+        entrantes = {tabla: 0 for tabla in tablas}
+        for _, _, hija, _ in self.relaciones:
+            entrantes[hija] += 1
+
+        orden = []
+        pendientes = [tabla for tabla in tablas if entrantes[tabla] == 0]
+        while pendientes:
+            tabla = pendientes.pop(0)
+            orden.append(tabla)
+            for padre, _, hija, _ in self.relaciones:
+                if padre == tabla:
+                    entrantes[hija] -= 1
+                    if entrantes[hija] == 0:
+                        pendientes.append(hija)
+        if len(orden) != len(tablas):
+            raise ValueError("Las relaciones entre tablas tienen un ciclo.")
+        return orden
+
+    def _entrantes(self, tabla: str, tablas: dict) -> list:
+        return [rel for rel in self.relaciones if rel[2] == tabla and rel[0] in tablas]
+
+    def _salientes(self, tabla: str, tablas: dict) -> list:
+        return [rel for rel in self.relaciones if rel[0] == tabla and rel[2] in tablas]
+
+    @instrumentado('GrafoIntegridad.verificar', filas=filas_eliminadas)
+    def verificar(self, tablas: dict) -> pd.DataFrame:
+        """Elimina en el lugar todas las filas que rompen alguna clave foránea.
+
+        Args:
+            tablas (dict): nombre de tabla -> DataFrame. Las relaciones con tablas
+                que no están en el diccionario se ignoran.
+
+        Returns: reporte con una fila por relación y las filas de la hija que la rompían.
+            Una fila que rompe dos relaciones aparece en ambas.
+        """
+        reporte = []
+        for tabla in self.orden:
+            if tabla not in tablas:
+                continue
+            hija = tablas[tabla]
+            invalidas = np.zeros(len(hija), dtype=bool)
+            for padre, col_padre, _, col_hija in self._entrantes(tabla, tablas):
+                rompe = ~hija[col_hija].isin(tablas[padre][col_padre].unique()).values
+                invalidas |= rompe
+                reporte.append(self._fila_reporte(padre, col_padre, tabla, col_hija, hija.index[rompe]))
+            if invalidas.any():
+                eliminar_filas(hija, hija.index[invalidas])
+        return pd.DataFrame(reporte, columns=COLUMNAS_REPORTE)
+
+    @instrumentado('GrafoIntegridad.propagar_bajas', filas=filas_eliminadas)
+    def propagar_bajas(self, tablas: dict, bajas: dict) -> pd.DataFrame:
+        """Rechequea solo lo afectado por un lote de bajas ya realizadas.
+
+        Args:
+            tablas (dict): nombre de tabla -> DataFrame.
+            bajas (dict): nombre de tabla -> claves que se dieron de baja en ella
+                (valores de la columna que referencian sus hijas).
+
+        Returns: reporte con las filas eliminadas en cascada por cada relación.
+        """
+        bajas = {tabla: set(claves) for tabla, claves in bajas.items()}
+        reporte = []
+        for tabla in self.orden:
+            if tabla not in tablas or not bajas.get(tabla):
+                continue
+            for padre, col_padre, hija, col_hija in self._salientes(tabla, tablas):
+                df_hija = tablas[hija]
+                afectadas = df_hija.index[df_hija[col_hija].isin(list(bajas[tabla])).values]
+                reporte.append(self._fila_reporte(padre, col_padre, hija, col_hija, afectadas))
+                if len(afectadas) == 0:
+                    continue
+                # las claves que desaparecen de la hija se propagan a sus propias hijas
+                for _, col_nieta_padre, _, _ in self._salientes(hija, tablas):
+                    bajas.setdefault(hija, set()).update(
+                        df_hija.loc[afectadas, col_nieta_padre].tolist())
+                eliminar_filas(df_hija, afectadas)
+        return pd.DataFrame(reporte, columns=COLUMNAS_REPORTE)
+
+    @instrumentado('GrafoIntegridad.baja_en_cascada', filas=filas_eliminadas)
+    def baja_en_cascada(self, tablas: dict, tabla: str, claves, columna: str = 'id') -> pd.DataFrame:
+        """Da de baja las filas de tabla cuya columna está en claves y propaga la baja.
+
+        Returns: reporte de propagar_bajas, con una fila extra para la tabla raíz.
+        """
+        df = tablas[tabla]
+        claves = set(claves)
+        etiquetas = df.index[df[columna].isin(list(claves)).values]
+        eliminar_filas(df, etiquetas)
+        raiz = self._fila_reporte(None, None, tabla, columna, etiquetas)
+        cascada = self.propagar_bajas(tablas, {tabla: claves})
+        return pd.concat([pd.DataFrame([raiz], columns=COLUMNAS_REPORTE), cascada], ignore_index=True)
+
+    @staticmethod
+    def _fila_reporte(padre, col_padre, hija, col_hija, etiquetas) -> dict:
+        return {'padre': padre, 'columna_padre': col_padre,
+                'hija': hija, 'columna_hija': col_hija,
+                'eliminadas': len(etiquetas), 'etiquetas': list(etiquetas)}
@@ -1,16 +1,70 @@
 import typing
+from functools import lru_cache
 from pathlib import Path
 from typing import Union
+import numpy as np
 import pandas as pd
-from faker import Faker
-fake = Faker()
 
-PERSONAS = ['id', 'Full Name', 'year of birth', 'Gender', 'Zip Code']
-USUARIOS = ['id', 'Occupation', 'Active Since']
-TRABAJADORES = ['id', 'Position', 'Category', 'Working Hours', 'Start Date']
+from almacenamiento import GENEROS, asignar_fila, leer_tabla
+from bitacora import Bitacora
+from cache_consultas import cacheada
+from concurrencia import LockLecturaEscritura, escritura, lectura
+from duplicados import (IndiceDuplicados, actualizar_duplicados, descartar_duplicados,
+                         indice_duplicados, quitar_duplicados)
+from esquema import ESQUEMAS, a_texto_valor, convertir_fila
+from guardado import guardar_tabla, registrar_lectura
+from indice_peliculas import IndicePeliculas
+from indices import avisar, indice_de
+from lotes import agregar_filas, insertar_lote
+from metricas import instrumentado, una_fila
+from vistas import ColumnasFila, ColumnasTabla, VistaFila
+
+# columnas de cada tabla; sus tipos están en esquema.ESQUEMAS
+PERSONAS = list(ESQUEMAS['personas'])
+USUARIOS = list(ESQUEMAS['usuarios'])
+TRABAJADORES = list(ESQUEMAS['trabajadores'])
+# formas de resolver un id ya asignado en las altas en lote
+CONFLICTOS = ('rechazar', 'crear', 'asociar')
+# filas de la tabla por cada lectura suelta de get antes de obtener las columnas enteras
+LECTURAS_POR_ARMADO = 1000
+
+
+@lru_cache(maxsize=None)
+def _faker():
+    # Faker tarda en importarse y en armarse, y solo lo usan las funciones generate_*
+    from faker import Faker
+    return Faker()
+
+
+def __getattr__(nombre):
+    # johann_clases.fake sigue disponible, pero se crea recién cuando se usa
+    if nombre == 'fake':
+        return _faker()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+
+def _filas_tabla(_, cls) -> int:
+    return len(cls.database) if isinstance(cls.database, pd.DataFrame) else 0
+
+
+def _contar(valores: pd.Series) -> pd.Series:
+    # las categorías sin filas no se informan
+    conteo = valores.value_counts()
+    return conteo[conteo > 0]
+
+
+def _graficar(conteos: dict) -> None:
+    """Un gráfico de barras por conteo (título -> cantidades)."""
+    import matplotlib.pyplot as plt
+    fig, ejes = plt.subplots(1, len(conteos), figsize=(7 * len(conteos), 4))
+    for eje, (titulo, conteo) in zip(np.atleast_1d(ejes), conteos.items()):
+        conteo.plot.bar(ax=eje, title=titulo)
+    plt.tight_layout()
+    plt.show()
 
 
 def generate_movie() -> dict:
+    fake = _faker()
     generos = ['Action', 'Adventure', 'Animation', "Children's",
                'Comedy', 'Crime', 'Documentary', 'Drama',
                'Fantasy', 'Film-Noir', 'Horror', 'Musical',
@@ -24,15 +78,19 @@ def generate_movie() -> dict:
     }
 
 
-def generate_score() -> dict:
-    return {'user_id': fake.random_int(),
-            'movie_id': fake.random_int(),
+def generate_score(ids_usuarios=None, ids_peliculas=None) -> dict:
+    fake = _faker()
+    # si se indican los ids existentes, el score respeta la integridad referencial.
+    # para generar tablas enteras conviene sinteticos.generar
+    return {'user_id': fake.random_int() if ids_usuarios is None else fake.random_element(list(ids_usuarios)),
+            'movie_id': fake.random_int() if ids_peliculas is None else fake.random_element(list(ids_peliculas)),
             'score': fake.random_int(min=1, max=5),
             'Date': fake.date_time().strftime('%Y-%m-%d %H:%M:%S')
             }
 
 
 def generate_person() -> dict:
+    fake = _faker()
 
     return {
         'id': fake.random_int(),
@@ -44,6 +102,7 @@ def generate_person() -> dict:
 
 
 def generate_user() -> dict:
+    fake = _faker()
     return {'id': fake.random_int(),
             'occupation': fake.job(),
             'active_since': fake.date_time().strftime('%Y-%m-%d %H:%M:%S')
@@ -51,6 +110,7 @@ def generate_user() -> dict:
 
 
 def generate_worker() -> dict:
+    fake = _faker()
     return {'id': fake.random_int(),
             'Position': fake.job(),
             'Category': fake.random_element(elements=('A', 'B', 'C')),
@@ -60,35 +120,89 @@ def generate_worker() -> dict:
 
 
 def validate_params(constraints):
+    # las restricciones se compilan una sola vez por clase: nombres de los parámetros,
+    # tupla de tipos admitidos y mensaje de error de cada uno
+    compiladas = []
+    for param, constrain in constraints.items():
+        if typing.get_origin(constrain) is Union:
+            tipos = constrain.__args__
+        else:
+            tipos = (constrain,)
+        mensaje = f"El parámetro '{param}' debe ser de tipo {', '.join(t.__name__ for t in tipos)}"
+        compiladas.append((param, tipos, mensaje))
+
     def decorator_init(init_method):
+        codigo = init_method.__code__
+        nombres = codigo.co_varnames[1:codigo.co_argcount]
+
         def wrapper(self, *args, **kwargs):
-            params = dict(
-                zip(init_method.__code__.co_varnames[1:], args), **kwargs)
-            for param, constrain in constraints.items():
-                param_value = params.get(param)
-                if typing.get_origin(constrain) is Union:
-                    if not any(isinstance(param_value, t) for t in constrain.__args__):
-                        types = ', '.join(
-                            t.__name__ for t in constrain.__args__)
-                        raise ValueError(
-                            f"El parámetro '{param}' debe ser de tipo {types}")
-                else:
-                    if not isinstance(param_value, constrain):
-                        raise ValueError(
-                            f"El parámetro '{param}' debe ser de tipo {constrain.__name__}")
+            params = dict(zip(nombres, args), **kwargs)
+            for param, tipos, mensaje in compiladas:
+                if not isinstance(params.get(param), tipos):
+                    raise ValueError(mensaje)
             init_method(self, **params)
         return wrapper
     return decorator_init
 
 
 class DataBase:
+    # las instancias solo guardan sus campos; la tabla y los índices son atributos de clase
+    __slots__ = ()
+    # atributo de la clase -> columna de la base de datos
+    _campos = {}
+    # tabla de esquema.ESQUEMAS con los tipos de las columnas
+    _tabla = None
+    _arrays = None
+    # lecturas de filas sueltas desde la última escritura (ver get)
+    _lecturas_sueltas = 0
+    _bitacora = None
+    # cada tabla tiene su lock de lectores/escritor y un número de versión que
+    # aumenta con cada modificación
+    _lock = LockLecturaEscritura('DataBase')
+    _version = 0
+    _foto = None
+    # columnas (nombre, año, código postal) para detectar filas probablemente repetidas
+    _columnas_similitud = None
+
     @classmethod
+    def from_dict(cls, data, dir_database=None):
+        # las fechas de la tabla vuelven al texto de los archivos
+        return cls(**{campo: a_texto_valor(data[columna], columna) for campo, columna in cls._campos.items()},
+                   dir_database=dir_database)
+
+    @classmethod
+    def to_class(self, element: dict) -> dict:
+        return {columna: element[campo] for campo, columna in self._campos.items()}
+
+    @classmethod
+    def _convertir(self, element: dict):
+        """Lleva los valores de element a los tipos de las columnas de la base de datos.
+        Si alguno no se puede convertir informa el campo y devuelve None."""
+        try:
+            return convertir_fila(self.database, element)
+        except ValueError as e:
+            print(e)
+            return None
+
+    @classmethod
+    @instrumentado(filas=_filas_tabla, por_clase=True)
+    @escritura
     def read(self) -> None:
         """Carge la base de datos desde el archivo indicado por dir_database.
+        El formato (csv, parquet o feather) se toma de la extensión del archivo y las
+        columnas toman los tipos del esquema de la tabla.
         """
         if not isinstance(self.database, pd.DataFrame):
             try:
-                self.database = pd.read_csv(self.dir_database)
+                self.database = leer_tabla(self.dir_database, self._tabla)
+                # se arma el índice por id y por fila una única vez al cargar
+                indice_de(self.database)
+                # los cambios registrados después de la última foto se aplican encima
+                if self._bitacora is not None:
+                    self.database = self._bitacora.reproducir(self.database)
+                else:
+                    # igual al archivo: write no la reescribe hasta que cambie
+                    registrar_lectura(self.database, self.dir_database)
                 print(
                     f"La base de datos {self.__name__} fue cargada exitosamente.")
             except FileNotFoundError:
@@ -98,24 +212,192 @@ class DataBase:
         return
 
     @classmethod
+    @instrumentado(filas=_filas_tabla, por_clase=True)
+    @escritura
     def write(self) -> None:
         """Guarda la base de datos en el archivo indicado por dir_database.
+        El formato (csv, parquet o feather) se toma de la extensión del archivo. Si la tabla
+        no cambió desde que se leyó o se guardó, no se vuelve a escribir.
         """
         try:
-            self.database.to_csv(self.dir_database, index=False)
+            if self._bitacora is not None:
+                # la foto completa incluye todos los registros de la bitácora
+                self._bitacora.compactar(self.database, self.dir_database, en_segundo_plano=False)
+            elif not guardar_tabla(self.database, self.dir_database)[0]:
+                print("La base de datos no cambió desde el último guardado.")
+                return
             print("Base de datos guardada exitosamente.")
         except Exception as e:
             print(f"Ocurrió un error al escribir la base de datos: {e}")
         return
 
     @classmethod
+    @escritura
+    def enable_journal(self, dir_journal=None, grupo: int = 64) -> None:
+        """Activa la bitácora de cambios de la base de datos.
+        Cada alta, modificación o baja se agrega al archivo en O(1) y se sincroniza a disco
+        por grupos. Si la base de datos ya está cargada se le aplican los cambios registrados.
+        Args:
+            dir_journal (str | Path): archivo de la bitácora. Por defecto, dir_database + '.log'.
+            grupo (int): cantidad de registros por fsync.
+        """
+        if dir_journal is None:
+            dir_journal = f"{self.dir_database}.log"
+        self._bitacora = Bitacora(dir_journal, grupo=grupo)
+        if isinstance(self.database, pd.DataFrame):
+            self.database = self._bitacora.reproducir(self.database)
+            descartar_duplicados(self.database)
+            self._al_modificar()
+
+    @classmethod
+    @escritura
+    def compact(self, background: bool = True) -> None:
+        """Guarda una foto nueva de la base de datos en dir_database y vacía la bitácora.
+        Por defecto la foto se escribe en un hilo aparte y se puede seguir operando.
+        """
+        if self._bitacora is None:
+            print("La bitácora no está activada.")
+            return
+        self._bitacora.compactar(self.database, self.dir_database, en_segundo_plano=background)
+
+    @classmethod
+    def _registrar_cambio(self, operacion: str, id, element: dict = None) -> None:
+        if self._bitacora is not None:
+            self._bitacora.registrar(operacion, id, element)
+
+    @classmethod
+    def _indice(self):
+        """Índice hash (id -> etiqueta y fila -> etiquetas) de la base de datos."""
+        return indice_de(self.database)
+
+    @classmethod
+    @lectura
+    def get_index(self, id):
+        """Obtiene el indice del elemento con el id indicado, o None si no existe.
+        """
+        return self._indice().etiqueta(id)
+
+    @classmethod
+    def _al_modificar(self, ids=None) -> None:
+        """Se llama después de cada alta, baja o modificación de la base de datos, con los ids
+        de las filas afectadas (None si pueden ser cualquiera).
+        Las clases con índices derivados de la tabla los actualizan acá."""
+        self._version += 1
+        arrays = self._arrays
+        if arrays is not None and (ids is None or arrays.df is not self.database
+                                   or not arrays.actualizar(self._etiquetas_de(ids))):
+            self._arrays = None
+        self._lecturas_sueltas = 0
+        avisar(self.database, ids)
+
+    @classmethod
+    def _etiquetas_de(self, ids) -> list:
+        """Etiquetas de las filas que siguen en la tabla con alguno de los ids."""
+        indice = self._indice()
+        return [etiqueta for etiqueta in map(indice.etiqueta, ids) if etiqueta is not None]
+
+    @classmethod
+    def _tablas_relacionadas(self) -> list:
+        """Clases cuyas tablas se leen al validar una escritura en esta.
+        Se bloquean para lectura junto con la escritura, así el chequeo es atómico."""
+        return []
+
+    @classmethod
+    @lectura
+    def snapshot(self) -> pd.DataFrame:
+        """Foto de la base de datos para consultas largas desde otros hilos.
+        La copia se hace una sola vez por versión y la comparten todos los lectores,
+        así que no debe modificarse. Las escrituras posteriores no la afectan.
+        """
+        foto = self._foto
+        if foto is None or foto[0] is not self.database or foto[1] != self._version:
+            foto = (self.database, self._version, self.database.copy())
+            self._foto = foto
+        return foto[2]
+
+    @classmethod
+    def _columnas_tabla(self) -> ColumnasTabla:
+        """Arrays de columnas de la base de datos, compartidos por las vistas de filas."""
+        if self._arrays is None or self._arrays.df is not self.database:
+            self._arrays = ColumnasTabla(self.database)
+        return self._arrays
+
+    @classmethod
+    def _motivo_externo(self, element: dict):
+        """Chequeos propios de cada tabla que dependen de otras tablas.
+        Devuelve el motivo del rechazo, o None si el elemento es válido."""
+        return None
+
+    @classmethod
+    def _similares(self, element: dict, excluir=None) -> list:
+        """Etiquetas de las filas probablemente repetidas de element (nombre parecido y
+        mismo año o código postal), de la más parecida a la menos parecida."""
+        if self._columnas_similitud is None:
+            return []
+        indice = indice_duplicados(self.database, self._columnas_similitud)
+        return [etiqueta for etiqueta, _ in indice.similares(element, excluir=excluir)]
+
+    @classmethod
+    def _motivo_similares(self, etiquetas: list) -> str:
+        ids = ', '.join(str(id) for id in self.database.loc[etiquetas, 'id'].tolist())
+        return f"Se encontraron entradas similares en la base de datos (ids: {ids})."
+
+    @classmethod
+    def _validar_lote(self):
+        """Validación de las altas en lote: además de los chequeos propios de la tabla,
+        rechaza los elementos parecidos a una fila existente o a uno anterior del lote."""
+        lote = IndiceDuplicados(self.database.iloc[:0], self._columnas_similitud)
+
+        def validar(element):
+            motivo = self._motivo_externo(element)
+            if motivo is None:
+                similares = self._similares(element)
+                if similares:
+                    motivo = self._motivo_similares(similares)
+                elif lote.similares(element):
+                    motivo = "Se encontraron entradas similares en el mismo lote."
+            if motivo is None:
+                lote.agregar(len(lote.filas), element)
+            return motivo
+        return validar
+
+    @classmethod
+    def _element_exist(self, element: dict, index: int = None) -> bool:
+        """Valida si el elemento ya existe en la base de datos.
+            Además, revisa que no esté asignado el id."""
+
+        # cuando indice es None, se usa la funcion para crear un nuevo elemento.
+        # cuando no es None, se usa para actualizar un elemento y que no quede repetido,
+        # por lo que se ignora la fila indicada por index.
+        # ambas consultas se resuelven con el índice hash, sin recorrer la tabla.
+        # las filas parecidas (no idénticas) se buscan en el índice de duplicados por bloques.
+        indice = self._indice()
+        similares = self._similares(element, excluir=index)
+        if indice.existe_fila(element, excluir=index):
+            motivo = "El elemento ya está presente en la base de datos."
+        elif indice.existe_id(element['id'], excluir=index):
+            motivo = "El id ya está asignado en la base de datos."
+        elif similares:
+            motivo = self._motivo_similares(similares)
+        else:
+            motivo = self._motivo_externo(element)
+
+        if motivo is not None:
+            print(motivo)
+            return True
+        return False
+
+    @classmethod
+    @instrumentado(filas=una_fila, por_clase=True)
+    @escritura
     def update(self, index: int, element: dict) -> None:
         """Actualiza el elemento indicado por index de la base de datos.
         Args:
             index (int): indice del elemento a actualizar. Debe estar presente en la base de datos.
             element (dict): diccionario con los campos a actualizar.
         """
-        if index not in self.database.index:
+        indice = self._indice()
+        if not indice.tiene_etiqueta(index):
             print("El elemento no está presente en la base de datos.")
             return
 
@@ -128,38 +410,154 @@ class DataBase:
                 print(
                     f"El campo '{col}' no está presente en la base de datos.")
                 return
+        element = self._convertir(element)
+        if element is None:
+            return
 
         # se valida que los datos del nuevo elemento no estén repetidos
         if self._element_exist(element, index):
             return
 
-        self.database.loc[index] = element
+        id_anterior = self.database.at[index, 'id']
+        asignar_fila(self.database, index, element)
+        indice.agregar(index, element)
+        actualizar_duplicados(self.database, index, element)
+        self._registrar_cambio('update', id_anterior, element)
+        self._al_modificar([id_anterior, element['id']])
         print("Elemento actualizado exitosamente.")
         return
 
     @classmethod
+    @instrumentado(filas=una_fila, por_clase=True)
+    @escritura
     def new(self, element: dict) -> None:
         """Crear un nuevo elemento en la base de datos.
         Args:
             element (dict): Diccionario con los campos del nuevo elemento.
         """
         element = self.to_class(element=element)
-        index = self.database.index[-1] + 1
         for col in element:
             if col not in self.database.columns:
                 print(
                     f"El campo '{col}' no está presente en la base de datos.")
                 return
+        element = self._convertir(element)
+        if element is None:
+            return
 
         # existe elemento en base de datos
         if self._element_exist(element):
             return
 
-        self.database.loc[index] = element
+        # como en new_many, la fila se concatena con los tipos de la tabla y la tabla nueva
+        # se queda con los índices
+        self.database = agregar_filas(self.database, [element])
+        self._registrar_cambio('new', element['id'], element)
+        self._al_modificar([element['id']])
         print("Elemento creado exitosamente.")
         return
 
     @classmethod
+    @instrumentado(filas=lambda _, cls, elements, *args, **kwargs: len(elements), por_clase=True)
+    @escritura
+    def new_many(self, elements, conflicto: str = 'rechazar') -> pd.DataFrame:
+        """Crea un lote de elementos nuevos en la base de datos con una sola concatenación.
+        Args:
+            elements (list | pd.DataFrame): elementos con los campos de la clase, o con las
+                columnas de la base de datos. Los que no tengan id reciben uno en bloque a
+                partir del mayor id existente.
+            conflicto (str): qué hacer con los elementos cuyo id ya está asignado o que se
+                parecen a una fila existente: 'rechazar' los deja en el reporte como
+                rechazados, 'crear' los agrega igual (con un id nuevo si el suyo ya está
+                asignado) y 'asociar' reemplaza con ellos la fila que tiene ese id, o la
+                más parecida.
+
+        Returns: reporte con una fila por elemento indicando si fue aceptado y el motivo del rechazo.
+        """
+        if conflicto not in CONFLICTOS:
+            raise ValueError(f"El conflicto debe resolverse con una de {CONFLICTOS}")
+        if isinstance(elements, pd.DataFrame):
+            elements = elements.to_dict('records')
+
+        columnas = set(self.database.columns)
+        filas = []
+        for element in elements:
+            if not set(element) <= columnas:
+                element = self.to_class(element={'id': None, **element})
+            filas.append(element)
+
+        indice = self._indice()
+        asociadas = {}
+        if conflicto != 'rechazar':
+            for posicion, element in enumerate(filas):
+                if element.get('id') is None or not indice.existe_id(element['id']):
+                    similares = self._similares(element) if conflicto == 'asociar' else []
+                    if similares:
+                        asociadas[posicion] = {**element, 'id': self.database.loc[similares[:1], 'id'].tolist()[0]}
+                elif conflicto == 'crear':
+                    filas[posicion] = {**element, 'id': None}
+                else:
+                    asociadas[posicion] = element
+
+        validar = self._motivo_externo
+        if conflicto == 'rechazar' and self._columnas_similitud is not None:
+            validar = self._validar_lote()
+        nuevas = [element for posicion, element in enumerate(filas) if posicion not in asociadas]
+        self.database, reporte = insertar_lote(self.database, nuevas, validar=validar)
+        if reporte['aceptado'].any() and self._bitacora is not None:
+            indice = self._indice()
+            etiquetas = [indice.etiqueta(id) for id in reporte.loc[reporte['aceptado'], 'id']]
+            for element in self.database.loc[etiquetas].to_dict('records'):
+                self._registrar_cambio('new', element['id'], element)
+        if asociadas:
+            reporte = self._combinar(reporte, self._asociar(asociadas))
+        if reporte['aceptado'].any():
+            self._al_modificar(reporte.loc[reporte['aceptado'], 'id'].tolist())
+        return reporte
+
+    @classmethod
+    def _asociar(self, asociadas: dict) -> dict:
+        """Reemplaza las filas cuyos ids ya existían (conflicto 'asociar' de new_many).
+        Devuelve el resultado de cada elemento según su posición en el lote."""
+        indice = self._indice()
+        resultados = {}
+        for posicion, element in asociadas.items():
+            etiqueta = indice.etiqueta(element['id'])
+            try:
+                element = convertir_fila(self.database, element)
+            except ValueError as e:
+                motivo = str(e)
+            else:
+                if indice.existe_fila(element, excluir=etiqueta):
+                    motivo = "El elemento ya está presente en la base de datos."
+                else:
+                    motivo = self._motivo_externo(element)
+            if motivo is None:
+                asignar_fila(self.database, etiqueta, element)
+                indice.agregar(etiqueta, element)
+                actualizar_duplicados(self.database, etiqueta, element)
+                self._registrar_cambio('update', element['id'], element)
+            resultados[posicion] = {'id': element['id'], 'aceptado': motivo is None, 'motivo': motivo}
+        return resultados
+
+    @staticmethod
+    def _combinar(reporte: pd.DataFrame, resultados: dict) -> pd.DataFrame:
+        """Agrega al reporte de un lote los resultados resueltos aparte (posición -> resultado),
+        en la posición original de cada elemento."""
+        filas = iter(reporte.to_dict('records'))
+        total = len(reporte) + len(resultados)
+        filas = [resultados[posicion] if posicion in resultados else next(filas)
+                 for posicion in range(total)]
+        return pd.DataFrame({
+            'fila': range(total),
+            'id': pd.Series([fila['id'] for fila in filas], dtype=object),
+            'aceptado': [fila['aceptado'] for fila in filas],
+            'motivo': pd.Series([fila['motivo'] for fila in filas], dtype=object),
+        })
+
+    @classmethod
+    @instrumentado(filas=una_fila, por_clase=True)
+    @lectura
     def get(self, index=None):
         """Obtiene un elemento de la base de datos indicado por index.
 
@@ -171,28 +569,90 @@ class DataBase:
         if index is None:
             index = self.database.index[-1]
 
-        if index not in self.database.index:
+        if not self._indice().tiene_etiqueta(index):
             print("El elemento no está presente en la base de datos.")
             return
-        return self.from_dict(data=self.database.loc[index].to_dict())
+        posicion = self.database.index.get_loc(index)
+        columnas = self._arrays
+        if columnas is None or columnas.df is not self.database:
+            # sin los arrays de columnas (por ejemplo después de un alta) se lee solo esta fila.
+            # Obtener las columnas enteras cuesta del orden de una lectura suelta cada mil filas:
+            # se obtienen recién cuando ya se hicieron esas lecturas sin escrituras en el medio
+            self._lecturas_sueltas += 1
+            if self._lecturas_sueltas > len(self.database) // LECTURAS_POR_ARMADO:
+                columnas = self._columnas_tabla()
+            else:
+                columnas = ColumnasFila(self.database, posicion)
+                posicion = 0
+        return self.from_dict(data=VistaFila(columnas, self._campos, posicion))
+
+    @classmethod
+    @instrumentado(filas=lambda resultado, *_: len(resultado), por_clase=True)
+    @lectura
+    def get_many(self, indices: list) -> list:
+        """Obtiene varios elementos de la base de datos como vistas livianas de sus filas.
+
+        Args:
+            indices (list): indices de los elementos a tomar.
+
+        Returns: lista de VistaFila (None para los indices que no están en la base de datos).
+            Los valores se leen de la tabla al momento de acceder, sin copiar cada fila.
+        """
+        columnas = self._columnas_tabla()
+        posiciones = columnas.posiciones(indices)
+        if (posiciones < 0).any():
+            print("Algunos elementos no están presentes en la base de datos.")
+        return [VistaFila(columnas, self._campos, posicion) if posicion >= 0 else None
+                for posicion in posiciones.tolist()]
 
     @classmethod
+    @lectura
+    def get_duplicates(self) -> pd.DataFrame:
+        """Busca en toda la base de datos los pares de elementos probablemente repetidos.
+        Solo se comparan los elementos que comparten algún bloque del índice de duplicados.
+
+        Returns: DataFrame con columnas 'id_a', 'id_b' y 'puntaje', de mayor a menor puntaje.
+        """
+        if self._columnas_similitud is None:
+            print(f"La base de datos {self.__name__} no busca elementos repetidos.")
+            return None
+        pares = indice_duplicados(self.database, self._columnas_similitud).duplicados()
+        return pd.DataFrame({'id_a': self.database.loc[pares['etiqueta_a'], 'id'].to_numpy(),
+                             'id_b': self.database.loc[pares['etiqueta_b'], 'id'].to_numpy(),
+                             'puntaje': pares['puntaje']})
+
+    @classmethod
+    @instrumentado(filas=una_fila, por_clase=True)
+    @escritura
     def delete(self, index: int) -> None:
         """Elimina un elemento de la base de datos indicado por index.
 
         Args:
             index (int): indice del elemento a eliminar. Debe estar presente en la base de datos.
         """
-
-        if index not in self.database.index:
+        indice = self._indice()
+        if not indice.tiene_etiqueta(index):
             print("El elemento no está presente en la base de datos.")
             return
+        id_eliminado = self.database.at[index, 'id']
         self.database.drop(index, inplace=True)
+        indice.quitar(index)
+        quitar_duplicados(self.database, index)
+        self._registrar_cambio('delete', id_eliminado)
+        self._al_modificar([id_eliminado])
         print("Elemento eliminado exitosamente.")
         return
 
 
 class Personas(DataBase):
+    __slots__ = ('id', 'full_name', 'year_of_birth', 'gender', 'zip_code')
+    _campos = {
+        'id': 'id',
+        'full_name': 'Full Name',
+        'year_of_birth': 'year of birth',
+        'gender': 'Gender',
+        'zip_code': 'Zip Code'
+    }
     _validate_constraints = {
         'id': Union[int, None],
         'full_name': Union[str, None],
@@ -201,7 +661,12 @@ class Personas(DataBase):
         'zip_code': Union[str, None],
         'dir_database': Union[str, Path, None]
     }
+    _tabla = 'personas'
     database = None
+    _bitacora = None
+    _lock = LockLecturaEscritura('Personas')
+    _version = 0
+    _columnas_similitud = ('Full Name', 'year of birth', 'Zip Code')
 
     @validate_params(_validate_constraints)
     def __init__(self, id=None, full_name=None, year_of_birth=None, gender=None, zip_code=None, dir_database=None):
@@ -218,67 +683,87 @@ class Personas(DataBase):
         return f"Persona: {self.full_name}, {self.gender}, {self.year_of_birth}, {self.zip_code}"
 
     @classmethod
-    def from_dict(cls, data, dir_database=None):
-        return cls(
-            id=data['id'],
-            full_name=data['Full Name'],
-            year_of_birth=data['year of birth'],
-            gender=data['Gender'],
-            zip_code=data['Zip Code'],
-            dir_database=dir_database
-        )
+    @cacheada(sin_orden=('sexo',))
+    def _posiciones(self, anios=None, sexo=None) -> np.ndarray:
+        """Posiciones de las personas nacidas en [desde_año, hasta_año] y del sexo o los sexos indicados."""
+        mascara = np.ones(len(self.database), dtype=bool)
+        if anios is not None:
+            nacimiento = self.database['year of birth'].to_numpy()
+            mascara &= (nacimiento >= anios[0]) & (nacimiento <= anios[1])
+        if sexo is not None:
+            mascara &= self.database['Gender'].isin([sexo] if isinstance(sexo, str) else sexo).to_numpy()
+        return np.flatnonzero(mascara)
 
     @classmethod
-    def to_class(self, element: dict) -> dict:
-        return {
-            'id': element['id'],
-            'Full Name': element['full_name'],
-            'year of birth': element['year_of_birth'],
-            'Gender': element['gender'],
-            'Zip Code': element['zip_code']
-        }
+    @cacheada(sin_orden=('sexo',))
+    def _conteos(self, anios=None, sexo=None):
+        filas = self.database.iloc[self._posiciones(anios=anios, sexo=sexo)]
+        if filas.empty:
+            return None
+        return _contar(filas['year of birth']).sort_index(), _contar(filas['Gender'])
 
     @classmethod
-    def _element_exist(self, element: dict, index: int = None) -> bool:
-        """Valida si el elemento ya existe en la base de datos.
-            Además, revisa que no esté asignado el id."""
+    @lectura
+    def get_from_df(self, anios=None, sexo=None) -> list:
+        """Busca personas por año de nacimiento y sexo.
+        Args:
+            anios (list): [desde_año, hasta_año].
+            sexo (str | list): sexo o sexos de las personas.
 
-        # cuando indice es None, se usa la funcion para crear un nuevo elemento
-        if index is None:
-            if (self.database == element).all(axis=1).any():
-                print("El elemento ya está presente en la base de datos.")
-                return True
-
-            if (self.database['id'] == element['id']).any():
-                print("El id ya está asignado en la base de datos.")
-                return True
-            return False
-        # cuando indice no es None, se usa la funcion para actualizar un elemento y que no quede repetido
-        else:
-            if (self.database[self.database.index != index] == element).all(axis=1).any():
-                print("El elemento ya está presente en la base de datos.")
-                return True
-            if (self.database[self.database.index != index]['id'] == element['id']).any():
-                print("El id ya está asignado en la base de datos.")
-                return True
-            return False
+        Returns: lista de objetos de la clase.
+        """
+        columnas = self._columnas_tabla()
+        return [self.from_dict(data=VistaFila(columnas, self._campos, posicion))
+                for posicion in self._posiciones(anios=anios, sexo=sexo).tolist()]
+
+    @classmethod
+    @lectura
+    def get_stats(self, anios=None, sexo=None, graficar=False):
+        """Imprime la cantidad de personas que cumplen los filtros (ver get_from_df).
+
+        Returns: tupla (cantidad por año de nacimiento, cantidad por sexo). Los conteos
+            quedan en cache_consultas hasta la próxima modificación y no deben modificarse.
+        """
+        conteos = self._conteos(anios=anios, sexo=sexo)
+        if conteos is None:
+            print("No hay personas que cumplan los filtros.")
+            return None
+        por_anio, por_sexo = conteos
+        print(f"Cantidad de personas: {por_sexo.sum()}")
+        if graficar:
+            _graficar({'Personas por año de nacimiento': por_anio, 'Personas por sexo': por_sexo})
+        return conteos
 
 
 class Usuarios(Personas):
+    __slots__ = ('occupation', 'active_since')
+    _campos = {
+        'id': 'id',
+        'occupation': 'Occupation',
+        'active_since': 'Active Since'
+    }
     _validate_constraints = {
         'id': Union[int, None],
         'occupation': Union[str, None],
         'active_since': Union[str, None],
         'dir_database': Union[str, Path, None]
     }
+    _tabla = 'usuarios'
     database = None
+    _bitacora = None
+    _lock = LockLecturaEscritura('Usuarios')
+    _version = 0
+    _columnas_similitud = None
     persona = Personas()
 
     @validate_params(_validate_constraints)
     def __init__(self, id=None, occupation=None, active_since=None, dir_database=None):
         if dir_database != None:
             Usuarios.dir_database = dir_database
-        self.read()
+        # read no hace nada si la tabla ya está cargada, pero toma el lock para escribir, y
+        # get crea los objetos mientras lo tiene tomado para leer
+        if dir_database != None or not isinstance(self.database, pd.DataFrame):
+            self.read()
         self.id = id
         self.occupation = occupation
         self.active_since = active_since
@@ -286,54 +771,219 @@ class Usuarios(Personas):
     def __repr__(self):
         return f"Usuario: {self.id}, {self.occupation}, {self.active_since}"
 
+    @classmethod
+    def _tablas_relacionadas(self) -> list:
+        return [type(self.persona)]
+
+    @classmethod
+    def _motivo_externo(self, element: dict):
+        """Se chequea dentro de la base de datos de personas que el id esté asignado a una persona."""
+        if not indice_de(self.persona.database).existe_id(element['id']):
+            return "El id no está asignado a ninguna persona."
+        return None
+
+    @classmethod
+    @cacheada(sin_orden=('ocupaciones',))
+    def _posiciones(self, ocupaciones=None) -> np.ndarray:
+        """Posiciones de los usuarios con alguna de las ocupaciones indicadas."""
+        if ocupaciones is None:
+            return np.arange(len(self.database))
+        if isinstance(ocupaciones, str):
+            ocupaciones = [ocupaciones]
+        return np.flatnonzero(self.database['Occupation'].isin(ocupaciones).to_numpy())
+
+    @classmethod
+    @cacheada(sin_orden=('ocupaciones',))
+    def _conteos(self, ocupaciones=None):
+        filas = self.database.iloc[self._posiciones(ocupaciones=ocupaciones)]
+        if filas.empty:
+            return None
+        por_anio = _contar(filas['Active Since'].dt.year.dropna().astype(int)).sort_index()
+        return _contar(filas['Occupation']), por_anio
+
+    @classmethod
+    @lectura
+    def get_from_df(self, ocupaciones=None) -> list:
+        """Busca usuarios por ocupación.
+        Args:
+            ocupaciones (str | list): ocupación u ocupaciones de los usuarios.
+
+        Returns: lista de objetos Usuarios.
+        """
+        columnas = self._columnas_tabla()
+        return [self.from_dict(data=VistaFila(columnas, self._campos, posicion))
+                for posicion in self._posiciones(ocupaciones=ocupaciones).tolist()]
+
+    @classmethod
+    @lectura
+    def get_stats(self, ocupaciones=None, graficar=False):
+        """Imprime la cantidad de usuarios con las ocupaciones indicadas.
+
+        Returns: tupla (cantidad por ocupación, cantidad por año de alta). Los conteos
+            quedan en cache_consultas hasta la próxima modificación y no deben modificarse.
+        """
+        conteos = self._conteos(ocupaciones=ocupaciones)
+        if conteos is None:
+            print("No hay usuarios que cumplan los filtros.")
+            return None
+        por_ocupacion, por_anio = conteos
+        print(f"Cantidad de usuarios: {por_ocupacion.sum()}")
+        if graficar:
+            _graficar({'Usuarios por ocupación': por_ocupacion, 'Usuarios por año de alta': por_anio})
+        return conteos
+
+
+class Peliculas(DataBase):
+    __slots__ = ('id', 'name', 'release_date', 'imdb_url', 'genres')
+    _campos = {
+        'id': 'id',
+        'name': 'Name',
+        'release_date': 'Release Date',
+        'imdb_url': 'IMDB URL'
+    }
+    _validate_constraints = {
+        'id': Union[int, None],
+        'name': Union[str, None],
+        'release_date': Union[str, None],
+        'imdb_url': Union[str, None],
+        'genres': Union[list, None],
+        'dir_database': Union[str, Path, None]
+    }
+    _tabla = 'peliculas'
+    database = None
+    _bitacora = None
+    _lock = LockLecturaEscritura('Peliculas')
+    _version = 0
+    _consultas = None
+
+    @validate_params(_validate_constraints)
+    def __init__(self, id=None, name=None, release_date=None, imdb_url=None, genres=None, dir_database=None):
+        if dir_database != None:
+            Peliculas.dir_database = dir_database
+            self.read()
+        self.id = id
+        self.name = name
+        self.release_date = release_date
+        self.imdb_url = imdb_url
+        self.genres = genres
+
+    def __repr__(self):
+        return f"Pelicula: {self.name}, {self.release_date}, {', '.join(self.genres or [])}"
+
     @classmethod
     def from_dict(cls, data, dir_database=None):
+        # las fechas y urls faltantes vienen como NaN
         return cls(
             id=data['id'],
-            occupation=data['Occupation'],
-            active_since=data['Active Since'],
+            name=data['Name'],
+            release_date=None if pd.isna(data['Release Date']) else a_texto_valor(data['Release Date'], 'Release Date'),
+            imdb_url=None if pd.isna(data['IMDB URL']) else data['IMDB URL'],
+            genres=[genero for genero in GENEROS if data.get(genero)],
             dir_database=dir_database
         )
 
     @classmethod
     def to_class(self, element: dict) -> dict:
+        generos = element.get('genres') or []
         return {
             'id': element['id'],
-            'Occupation': element['occupation'],
-            'Active Since': element['active_since']
+            'Name': element['name'],
+            'Release Date': element['release_date'],
+            'IMDB URL': element['imdb_url'],
+            **{genero: int(genero in generos) for genero in GENEROS}
         }
 
     @classmethod
-    def _element_exist(self, element: dict, index: int = None) -> bool:
-        """Valida si el elemento ya existe en la base de datos.
-            Además, revisa que no esté asignado el id."""
+    def _al_modificar(self, ids=None) -> None:
+        # el índice de consultas se actualiza con las filas afectadas; si no se saben, o si
+        # quedaron más posiciones libres que filas, se vuelve a armar en la próxima búsqueda
+        super()._al_modificar(ids)
+        consultas = self._consultas
+        if consultas is None:
+            return
+        if ids is None or consultas.libres > len(consultas.posiciones):
+            self._consultas = None
+            return
+        presentes = self._etiquetas_de(ids)
+        indice = self._indice()
+        consultas.quitar([etiqueta for etiqueta in consultas.etiquetas_de_ids(ids)
+                          if not indice.tiene_etiqueta(etiqueta)])
+        consultas.actualizar(self.database, presentes)
 
-        # cuando indice es None, se usa la funcion para crear un nuevo elemento
-        # se chequea dentro de la base de datos de personas que el id esté asignado a una persona
-        if index is None:
-            if (self.database == element).all(axis=1).any():
-                print("El elemento ya está presente en la base de datos.")
-                return True
+    @classmethod
+    def _indice_consultas(self) -> IndicePeliculas:
+        # una tabla que cambió de largo sin pasar por _al_modificar (por ejemplo al leerla de
+        # nuevo) se vuelve a indexar
+        if self._consultas is None or len(self._consultas.posiciones) != len(self.database):
+            self._consultas = IndicePeliculas(self.database)
+        return self._consultas
+
+    @classmethod
+    @cacheada(sin_orden=('generos',))
+    def _etiquetas(self, id=None, nombre=None, anios=None, generos=None, todos_los_generos=True):
+        etiquetas = self._indice_consultas().buscar(
+            nombre=nombre, anios=anios, generos=generos, todos_los_generos=todos_los_generos)
+        if id is not None:
+            etiqueta = self.get_index(id)
+            etiquetas = [e for e in etiquetas if e == etiqueta]
+        return etiquetas
 
-            if (self.database['id'] == element['id']).any():
-                print("El id ya está asignado en la base de datos.")
-                return True
+    @classmethod
+    @lectura
+    def get_from_df(self, id=None, nombre=None, anios=None, generos=None, todos_los_generos=True) -> list:
+        """Busca películas combinando los filtros indicados.
+        Args:
+            id (int): id de la película.
+            nombre (str): palabras (o comienzos de palabras) del nombre.
+            anios (list): [desde_año, hasta_año].
+            generos (list): géneros de la película.
+            todos_los_generos (bool): si es False alcanza con que tenga alguno de los géneros.
 
-            if not (self.persona.database['id'] == element['id']).any():
-                print("El id no está asignado a ninguna persona.")
-                return True
+        Returns: lista de objetos Peliculas.
+        """
+        etiquetas = self._etiquetas(id=id, nombre=nombre, anios=anios, generos=generos,
+                                    todos_los_generos=todos_los_generos)
+        return [self.from_dict(data=fila) for fila in self.database.loc[etiquetas].to_dict('records')]
 
-            return False
-        # cuando indice no es None, se usa la funcion para actualizar un elemento y que no quede repetido
-        # se chequea dentro de la base de datos de personas que el id esté asignado a una persona
-        else:
-            if (self.database[self.database.index != index] == element).all(axis=1).any():
-                print("El elemento ya está presente en la base de datos.")
-                return True
-            if (self.database[self.database.index != index]['id'] == element['id']).any():
-                print("El id ya está asignado en la base de datos.")
-                return True
-            if not (self.persona.database['id'] == element['id']).any():
-                print("El id no está asignado a ninguna persona.")
-                return True
-            return False
+    @classmethod
+    @cacheada(sin_orden=('generos',))
+    def _resumen(self, anios=None, generos=None, todos_los_generos=True):
+        """Etiquetas de la película más vieja y la más nueva (None si ninguna tiene fecha),
+        cantidad de películas, cantidad por año y por género; None si ninguna cumple los filtros."""
+        consultas = self._indice_consultas()
+        etiquetas = consultas.buscar(anios=anios, generos=generos, todos_los_generos=todos_los_generos)
+        if len(etiquetas) == 0:
+            return None
+
+        por_anio, por_genero = consultas.conteos(etiquetas)
+        anios_filtrados = consultas.anios[consultas.posiciones_de(etiquetas)]
+        con_fecha = anios_filtrados >= 0
+        vieja = nueva = None
+        if con_fecha.any():
+            vieja = etiquetas[con_fecha][anios_filtrados[con_fecha].argmin()]
+            nueva = etiquetas[con_fecha][anios_filtrados[con_fecha].argmax()]
+        return vieja, nueva, len(etiquetas), por_anio, por_genero
+
+    @classmethod
+    @lectura
+    def get_stats(self, anios=None, generos=None, todos_los_generos=True, graficar=False):
+        """Imprime estadísticas de las películas que cumplen los filtros: la más vieja,
+        la más nueva y la cantidad total, por año y por género.
+
+        Returns: tupla (cantidad por año, cantidad por género). Los conteos quedan en
+            cache_consultas hasta la próxima modificación y no deben modificarse.
+        """
+        resumen = self._resumen(anios=anios, generos=generos, todos_los_generos=todos_los_generos)
+        if resumen is None:
+            print("No hay películas que cumplan los filtros.")
+            return None
+
+        vieja, nueva, cantidad, por_anio, por_genero = resumen
+        if vieja is not None:
+            print(f"Película más vieja: {self.from_dict(data=self.database.loc[vieja].to_dict())}")
+            print(f"Película más nueva: {self.from_dict(data=self.database.loc[nueva].to_dict())}")
+        print(f"Cantidad de películas: {cantidad}")
+
+        if graficar:
+            _graficar({'Películas por año': por_anio, 'Películas por género': por_genero})
+        return por_anio, por_genero
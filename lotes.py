@@ -0,0 +1,107 @@
+import pandas as pd
+
+from almacenamiento import admitir_categorias, etiqueta_nueva
+from duplicados import trasladar_duplicados
+from esquema import alinear_tipos, convertir_fila
+from indices import avisar, indice_de, trasladar
+
+
+def insertar_lote(df: pd.DataFrame, filas: list, columna_id: str = 'id', validar=None):
+    """Valida e inserta un lote de filas con una única concatenación.
+
+    Las filas se validan en una sola pasada contra el índice hash de la tabla y
+    contra las filas anteriores del mismo lote, con sus valores ya llevados a los
+    tipos de las columnas (las que no se pueden convertir se rechazan). Las que no traen id reciben uno
+    en bloque a partir del mayor id existente (la lógica max()+1 de siempre, con el mayor id
+    que lleva el índice).
+
+    Args:
+        df (pd.DataFrame): tabla destino. No se modifica, pero su índice pasa
+            a la tabla devuelta.
+        filas (list): diccionarios con las columnas de df.
+        columna_id (str): columna que funciona como clave primaria.
+        validar (callable): función opcional fila -> motivo de rechazo o None,
+            para los chequeos propios de cada tabla.
+
+    Returns: tupla (df_nuevo, reporte). reporte tiene una fila por elemento del
+        lote con las columnas 'fila', 'id', 'aceptado' y 'motivo'.
+    """
+    indice = indice_de(df, columna_id)
+    columnas = set(df.columns)
+    proximo_id = indice.proximo_id()
+
+    ids_lote = set()
+    filas_lote = set()
+    aceptadas = []
+    reporte = []
+    for fila in filas:
+        fila = dict(fila)
+        # el id en bloque solo se consume si la fila termina aceptada
+        id_automatico = fila.get(columna_id) is None
+        if id_automatico:
+            fila[columna_id] = proximo_id
+        motivo = None
+        faltantes = [col for col in fila if col not in columnas]
+        if faltantes:
+            motivo = f"El campo '{faltantes[0]}' no está presente en la base de datos."
+        else:
+            # los valores se llevan a los tipos de las columnas de la tabla
+            try:
+                fila = convertir_fila(df, fila)
+            except ValueError as e:
+                motivo = str(e)
+        if motivo is None:
+            clave = indice.clave(fila)
+            if indice.existe_fila(fila) or clave in filas_lote:
+                motivo = "El elemento ya está presente en la base de datos."
+            elif indice.existe_id(fila[columna_id]) or fila[columna_id] in ids_lote:
+                motivo = "El id ya está asignado en la base de datos."
+            elif validar is not None:
+                motivo = validar(fila)
+
+        if motivo is None:
+            ids_lote.add(fila[columna_id])
+            filas_lote.add(clave)
+            aceptadas.append(fila)
+            proximo_id += id_automatico
+        elif id_automatico:
+            fila[columna_id] = None
+        reporte.append({'id': fila[columna_id],
+                        'aceptado': motivo is None, 'motivo': motivo})
+
+    # el id queda como object para no convertir a float cuando hay rechazos sin id
+    reporte = pd.DataFrame({
+        'fila': range(len(reporte)),
+        'id': pd.Series([r['id'] for r in reporte], dtype=object),
+        'aceptado': [r['aceptado'] for r in reporte],
+        'motivo': pd.Series([r['motivo'] for r in reporte], dtype=object),
+    })
+    if not aceptadas:
+        return df, reporte
+
+    return agregar_filas(df, aceptadas, columna_id), reporte
+
+
+def agregar_filas(df: pd.DataFrame, filas: list, columna_id: str = 'id') -> pd.DataFrame:
+    """Agrega filas ya validadas (con los valores en los tipos de la tabla, ver
+    esquema.convertir_fila) con una única concatenación.
+
+    Las etiquetas nuevas continúan a la mayor existente para no pisar filas. df no se
+    modifica, pero su índice hash y sus índices de duplicados pasan a la tabla devuelta
+    con las filas nuevas ya registradas.
+    """
+    indice = indice_de(df, columna_id)
+    inicio = etiqueta_nueva(df)
+    etiquetas = range(inicio, inicio + len(filas))
+    nuevas = pd.DataFrame(filas, index=etiquetas, columns=df.columns)
+    # las columnas se alinean a los tipos de la tabla para que la concatenación los conserve
+    admitir_categorias(df, filas)
+    alinear_tipos(nuevas, df)
+    df_nuevo = pd.concat([df, nuevas]) if len(df) else nuevas
+
+    for etiqueta, fila in zip(etiquetas, filas):
+        indice.agregar(etiqueta, fila)
+    trasladar(df, df_nuevo, columna_id)
+    trasladar_duplicados(df, df_nuevo, zip(etiquetas, filas))
+    avisar(df, [fila[columna_id] for fila in filas], df_nuevo)
+    return df_nuevo
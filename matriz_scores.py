@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+EJES = ('usuario', 'pelicula')
+METRICAS = ('coseno', 'pearson')
+
+
+class MatrizScores:
+    """Matriz dispersa (CSR) usuario x película armada desde la tabla de scores.
+
+    Cada usuario es una fila y cada película una columna; los ids se traducen a
+    posiciones con diccionarios, así que no hace falta pivotear el DataFrame.
+    Los scores nuevos quedan pendientes y se incorporan a la matriz con
+    operaciones dispersas la próxima vez que se consulta.
+    """
+
+    def __init__(self, df_scores: pd.DataFrame):
+        usuarios = pd.Index(pd.unique(df_scores['user_id']))
+        peliculas = pd.Index(pd.unique(df_scores['movie_id']))
+        self.ids = {'usuario': usuarios.tolist(), 'pelicula': peliculas.tolist()}
+        self.posiciones = {eje: {id_: pos for pos, id_ in enumerate(ids)}
+                           for eje, ids in self.ids.items()}
+
+        filas = usuarios.get_indexer(df_scores['user_id'])
+        columnas = peliculas.get_indexer(df_scores['movie_id'])
+        self._matriz = sparse.csr_matrix(
+            (df_scores['rating'].to_numpy(dtype='float64'), (filas, columnas)),
+            shape=(len(usuarios), len(peliculas)))
+        self._pendientes = {}
+        self._normalizadas = {}
+
+    # actualización incremental
+
+    def _posicion(self, eje: str, id_) -> int:
+        posiciones = self.posiciones[eje]
+        if id_ not in posiciones:
+            posiciones[id_] = len(self.ids[eje])
+            self.ids[eje].append(id_)
+        return posiciones[id_]
+
+    def agregar(self, user_id, movie_id, rating) -> None:
+        """Agrega (o reemplaza) el score de un usuario a una película."""
+        clave = (self._posicion('usuario', user_id), self._posicion('pelicula', movie_id))
+        self._pendientes[clave] = float(rating)
+
+    def quitar(self, user_id, movie_id) -> None:
+        """Quita el score de un usuario a una película, si existe."""
+        if user_id in self.posiciones['usuario'] and movie_id in self.posiciones['pelicula']:
+            clave = (self.posiciones['usuario'][user_id], self.posiciones['pelicula'][movie_id])
+            self._pendientes[clave] = 0.0
+
+    def agregar_scores(self, df_scores: pd.DataFrame) -> None:
+        """Agrega un lote de scores (con las columnas de scores.csv)."""
+        for user_id, movie_id, rating in zip(df_scores['user_id'].tolist(),
+                                             df_scores['movie_id'].tolist(),
+                                             df_scores['rating'].tolist()):
+            self.agregar(user_id, movie_id, rating)
+
+    @property
+    def matriz(self) -> sparse.csr_matrix:
+        """Matriz CSR con todos los scores, incluidos los pendientes."""
+        if self._pendientes:
+            forma = (len(self.ids['usuario']), len(self.ids['pelicula']))
+            matriz = self._matriz
+            if matriz.shape != forma:
+                # usuarios o películas nuevos agregan filas o columnas vacías
+                matriz = matriz.copy()
+                matriz.resize(forma)
+            filas, columnas = (np.array(eje) for eje in zip(*self._pendientes))
+            valores = np.array(list(self._pendientes.values()))
+            # las posiciones pendientes se borran de la matriz y se vuelven a escribir
+            mascara = sparse.csr_matrix((np.ones(len(valores)), (filas, columnas)), shape=forma)
+            nuevos = sparse.csr_matrix((valores, (filas, columnas)), shape=forma)
+            matriz = matriz - matriz.multiply(mascara) + nuevos
+            matriz.eliminate_zeros()
+            self._matriz = matriz.tocsr()
+            self._pendientes = {}
+            self._normalizadas = {}
+        return self._matriz
+
+    # similitud
+
+    def _normalizada(self, eje: str, metrica: str) -> sparse.csr_matrix:
+        """Matriz del eje con filas de norma 1 (centradas en su media si es pearson)."""
+        if eje not in EJES:
+            raise ValueError(f"El eje debe ser uno de {EJES}")
+        if metrica not in METRICAS:
+            raise ValueError(f"La métrica debe ser una de {METRICAS}")
+        matriz = self.matriz
+        clave = (eje, metrica)
+        if clave not in self._normalizadas:
+            m = (matriz if eje == 'usuario' else matriz.T).tocsr().astype('float64')
+            if metrica == 'pearson':
+                # se centra solo sobre las películas (o usuarios) calificados, sin densificar
+                cantidades = np.diff(m.indptr)
+                medias = np.divide(np.asarray(m.sum(axis=1)).ravel(), cantidades,
+                                   out=np.zeros(m.shape[0]), where=cantidades > 0)
+                m = m.copy()
+                m.data -= np.repeat(medias, cantidades)
+            normas = np.sqrt(np.asarray(m.multiply(m).sum(axis=1)).ravel())
+            inversas = np.divide(1.0, normas, out=np.zeros_like(normas), where=normas > 0)
+            self._normalizadas[clave] = (sparse.diags(inversas) @ m).tocsr()
+        return self._normalizadas[clave]
+
+    def similitud(self, ids, eje: str = 'usuario', metrica: str = 'coseno') -> pd.DataFrame:
+        """Similitud de un lote de usuarios (o películas) contra todos los del mismo eje.
+
+        Returns: DataFrame denso de len(ids) x cantidad de usuarios (o películas),
+            indexado por id en filas y columnas.
+        """
+        normalizada = self._normalizada(eje, metrica)
+        filas = [self.posiciones[eje][id_] for id_ in ids]
+        valores = (normalizada[filas] @ normalizada.T).toarray()
+        return pd.DataFrame(valores, index=list(ids), columns=self.ids[eje])
+
+    def vecinos(self, ids, k: int = 10, eje: str = 'usuario', metrica: str = 'coseno') -> pd.DataFrame:
+        """Los k usuarios (o películas) más similares a cada id del lote, sin contarse a sí mismo.
+
+        Returns: DataFrame con columnas 'id', 'vecino' y 'similitud', ordenado de
+            mayor a menor similitud dentro de cada id.
+        """
+        normalizada = self._normalizada(eje, metrica)
+        filas = np.array([self.posiciones[eje][id_] for id_ in ids], dtype=int)
+        valores = (normalizada[filas] @ normalizada.T).toarray()
+        valores[np.arange(len(filas)), filas] = -np.inf
+        k = min(k, valores.shape[1] - 1)
+        if k <= 0:
+            return pd.DataFrame(columns=['id', 'vecino', 'similitud'])
+
+        # argpartition elige los k mayores sin ordenar toda la fila; después se ordenan solo esos
+        mejores = np.argpartition(-valores, k - 1, axis=1)[:, :k]
+        puntajes = np.take_along_axis(valores, mejores, axis=1)
+        orden = np.argsort(-puntajes, axis=1)
+        mejores = np.take_along_axis(mejores, orden, axis=1)
+        puntajes = np.take_along_axis(puntajes, orden, axis=1)
+
+        ids_eje = np.array(self.ids[eje], dtype=object)
+        return pd.DataFrame({
+            'id': np.repeat(np.array(list(ids), dtype=object), k),
+            'vecino': ids_eje[mejores.ravel()],
+            'similitud': puntajes.ravel(),
+        })
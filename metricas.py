@@ -0,0 +1,230 @@
+import bisect
+import functools
+import random
+import threading
+import time
+from pathlib import Path
+
+# límites superiores (en segundos) de los intervalos de los histogramas de latencia
+LIMITES = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Operacion:
+    """Contadores e histograma de latencia de una operación."""
+
+    __slots__ = ('llamadas', 'errores', 'filas', 'segundos', 'maximo', 'histograma',
+                 'muestras', 'perfil', 'memoria_pico')
+
+    def __init__(self):
+        self.llamadas = 0
+        self.errores = 0
+        self.filas = 0
+        self.segundos = 0.0
+        self.maximo = 0.0
+        # un contador por límite de LIMITES y uno más para lo que los supera
+        self.histograma = [0] * (len(LIMITES) + 1)
+        # llamadas perfiladas, su perfil acumulado y el mayor pico de memoria medido
+        self.muestras = 0
+        self.perfil = None
+        self.memoria_pico = 0
+
+    def percentil(self, p: float) -> float:
+        """Cota superior del percentil p (entre 0 y 1) según el histograma."""
+        objetivo = p * self.llamadas
+        acumulado = 0
+        for limite, cantidad in zip(LIMITES + (self.maximo,), self.histograma):
+            acumulado += cantidad
+            if acumulado >= objetivo and cantidad:
+                return min(limite, self.maximo)
+        return self.maximo
+
+    def resumen(self) -> dict:
+        return {'llamadas': self.llamadas, 'errores': self.errores, 'filas': self.filas,
+                'segundos': self.segundos, 'maximo': self.maximo,
+                'promedio': self.segundos / self.llamadas if self.llamadas else 0.0,
+                'p50': self.percentil(0.5), 'p99': self.percentil(0.99),
+                'histograma': dict(zip([str(limite) for limite in LIMITES] + ['+Inf'], self.histograma)),
+                'muestras': self.muestras, 'memoria_pico': self.memoria_pico}
+
+
+class Registro:
+    """Registro de métricas de todas las operaciones instrumentadas.
+
+    Por cada operación guarda cantidad de llamadas, errores y filas procesadas,
+    el tiempo total y máximo, y un histograma de latencias con intervalos fijos
+    (LIMITES). Se puede volcar como diccionario (volcar) o en el formato de
+    texto de Prometheus (texto) para que lo lea un recolector.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.operaciones = {}
+
+    def _operacion(self, nombre: str) -> Operacion:
+        operacion = self.operaciones.get(nombre)
+        if operacion is None:
+            operacion = self.operaciones.setdefault(nombre, Operacion())
+        return operacion
+
+    def registrar(self, nombre: str, segundos: float, filas: int = 0, error: bool = False) -> None:
+        with self._lock:
+            operacion = self._operacion(nombre)
+            operacion.llamadas += 1
+            operacion.errores += error
+            operacion.filas += filas
+            operacion.segundos += segundos
+            if segundos > operacion.maximo:
+                operacion.maximo = segundos
+            operacion.histograma[bisect.bisect_left(LIMITES, segundos)] += 1
+
+    def registrar_perfil(self, nombre: str, perfil, memoria_pico: int = 0) -> None:
+        with self._lock:
+            operacion = self._operacion(nombre)
+            operacion.muestras += 1
+            if perfil is not None:
+                import pstats
+                if operacion.perfil is None:
+                    operacion.perfil = pstats.Stats(perfil)
+                else:
+                    operacion.perfil.add(perfil)
+            operacion.memoria_pico = max(operacion.memoria_pico, memoria_pico)
+
+    def volcar(self) -> dict:
+        """Métricas de todas las operaciones: nombre -> diccionario con sus valores."""
+        with self._lock:
+            return {nombre: operacion.resumen() for nombre, operacion in sorted(self.operaciones.items())}
+
+    def texto(self) -> str:
+        """Métricas en el formato de texto de Prometheus."""
+        lineas = ['# TYPE operaciones_total counter', '# TYPE operaciones_errores_total counter',
+                  '# TYPE operaciones_filas_total counter', '# TYPE operaciones_segundos histogram']
+        with self._lock:
+            for nombre, op in sorted(self.operaciones.items()):
+                etiqueta = f'operacion="{nombre}"'
+                lineas.append(f'operaciones_total{{{etiqueta}}} {op.llamadas}')
+                lineas.append(f'operaciones_errores_total{{{etiqueta}}} {op.errores}')
+                lineas.append(f'operaciones_filas_total{{{etiqueta}}} {op.filas}')
+                acumulado = 0
+                for limite, cantidad in zip([str(limite) for limite in LIMITES] + ['+Inf'], op.histograma):
+                    acumulado += cantidad
+                    lineas.append(f'operaciones_segundos_bucket{{{etiqueta},le="{limite}"}} {acumulado}')
+                lineas.append(f'operaciones_segundos_sum{{{etiqueta}}} {op.segundos}')
+                lineas.append(f'operaciones_segundos_count{{{etiqueta}}} {op.llamadas}')
+        return '\n'.join(lineas) + '\n'
+
+    def perfil(self, nombre: str):
+        """Perfil de cProfile acumulado de las llamadas muestreadas de una operación (pstats.Stats),
+        o None si no se perfiló ninguna."""
+        with self._lock:
+            operacion = self.operaciones.get(nombre)
+            return None if operacion is None else operacion.perfil
+
+    def guardar_perfiles(self, directorio) -> list:
+        """Guarda un archivo .prof por operación perfilada (se abren con pstats o snakeviz)."""
+        directorio = Path(directorio)
+        directorio.mkdir(parents=True, exist_ok=True)
+        rutas = []
+        with self._lock:
+            for nombre, operacion in self.operaciones.items():
+                if operacion.perfil is not None:
+                    ruta = directorio / f'{nombre}.prof'
+                    operacion.perfil.dump_stats(ruta)
+                    rutas.append(ruta)
+        return rutas
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self.operaciones = {}
+
+
+registro = Registro()
+
+# estado global: con _activo en False las funciones instrumentadas solo pagan un if
+_activo = True
+_muestreo = 0.0
+_memoria = False
+# cProfile y tracemalloc son globales al proceso: se perfila una llamada a la vez
+_perfilando = threading.Lock()
+
+
+def activar() -> None:
+    """Vuelve a registrar métricas (es el estado inicial)."""
+    global _activo
+    _activo = True
+
+
+def desactivar() -> None:
+    """Deja de registrar métricas y de perfilar; las funciones instrumentadas se llaman directamente."""
+    global _activo, _muestreo
+    _activo = False
+    _muestreo = 0.0
+
+
+def perfilar(muestreo: float = 0.01, memoria: bool = False) -> None:
+    """Activa el perfilado: una fracción muestreo de las llamadas corre bajo cProfile y,
+    si memoria es True, también mide con tracemalloc el pico de memoria de la llamada.
+    Con muestreo=0 se desactiva."""
+    global _muestreo, _memoria
+    activar()
+    _muestreo = muestreo
+    _memoria = memoria
+
+
+def _llamar_perfilado(nombre: str, funcion, args, kwargs):
+    # cProfile, pstats y tracemalloc se importan recién al perfilar
+    import cProfile
+    import tracemalloc
+    if not _perfilando.acquire(blocking=False):
+        return funcion(*args, **kwargs)
+    perfil = cProfile.Profile()
+    medir_memoria = _memoria and not tracemalloc.is_tracing()
+    try:
+        if medir_memoria:
+            tracemalloc.start()
+        try:
+            return perfil.runcall(funcion, *args, **kwargs)
+        finally:
+            pico = tracemalloc.get_traced_memory()[1] if medir_memoria else 0
+            if medir_memoria:
+                tracemalloc.stop()
+            registro.registrar_perfil(nombre, perfil, pico)
+    finally:
+        _perfilando.release()
+
+
+def instrumentado(nombre: str = None, filas=None, por_clase: bool = False):
+    """Decorador que registra llamadas, errores, latencia y filas de una función.
+
+    Args:
+        nombre (str): nombre de la operación en el registro (por defecto, el de la función).
+        filas: función (resultado, *args, **kwargs) -> cantidad de filas procesadas.
+        por_clase (bool): para classmethods; antepone al nombre el de la clase con la que se
+            llama (así Personas.new y Peliculas.new se cuentan por separado).
+    """
+    def decorador(funcion):
+        base = nombre or funcion.__name__
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _activo:
+                return funcion(*args, **kwargs)
+            operacion = f'{args[0].__name__}.{base}' if por_clase else base
+            inicio = time.perf_counter()
+            error = True
+            try:
+                if _muestreo and random.random() < _muestreo:
+                    resultado = _llamar_perfilado(operacion, funcion, args, kwargs)
+                else:
+                    resultado = funcion(*args, **kwargs)
+                error = False
+                return resultado
+            finally:
+                cantidad = filas(resultado, *args, **kwargs) if filas is not None and not error else 0
+                registro.registrar(operacion, time.perf_counter() - inicio, cantidad, error)
+        return envoltura
+    return decorador
+
+
+def una_fila(*_, **__) -> int:
+    return 1
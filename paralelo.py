@@ -0,0 +1,300 @@
+"""Estadísticas y chequeos de integridad de los scores repartidos en varios procesos.
+
+La tabla de scores se parte por hash de user_id o de movie_id y cada partición
+la procesa un worker de un pool de procesos. Las columnas (y las tablas chicas
+que hacen falta para ubicar cada score) se copian una sola vez a memoria
+compartida, ordenadas por partición, así que a cada worker solo le llegan los
+nombres de los bloques y el rango de filas que le toca, no DataFrames
+serializados. Cada worker devuelve acumulados parciales (cantidad, suma y suma
+de cuadrados por clave) y las posiciones de las filas inválidas, que después
+se combinan en el proceso principal.
+
+Con procesos=1 las particiones se procesan en el mismo proceso, sin pool.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from estadisticas import LIMITES_ETARIOS, RANGOS_ETARIOS
+from indices import eliminar_filas
+from integridad import COLUMNAS_REPORTE, GrafoIntegridad
+
+# columnas por las que se puede particionar la tabla de scores
+COLUMNAS_PARTICION = ['user_id', 'movie_id']
+
+# constante multiplicativa de Knuth: reparte parejo ids consecutivos o con saltos regulares
+_HASH = np.uint64(2654435761)
+
+# los ids se ubican con una tabla indexada por id si el mayor no pasa de _DENSO veces la cantidad
+_DENSO = 4
+
+
+def procesos_disponibles() -> int:
+    return os.cpu_count() or 1
+
+
+def particiones(claves: np.ndarray, cantidad: int) -> np.ndarray:
+    """Número de partición (0 a cantidad - 1) de cada clave."""
+    return ((claves.astype(np.uint64) * _HASH) % np.uint64(2 ** 32) % np.uint64(cantidad)).astype(np.int64)
+
+
+class _Compartidos:
+    """Arrays copiados a bloques de memoria compartida; se liberan con cerrar()."""
+
+    def __init__(self, arrays: dict):
+        self.bloques = []
+        self.descriptores = {}
+        for nombre, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            bloque = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=bloque.buf)[...] = array
+            self.bloques.append(bloque)
+            self.descriptores[nombre] = (bloque.name, array.shape, array.dtype.str)
+
+    def cerrar(self) -> None:
+        for bloque in self.bloques:
+            bloque.close()
+            bloque.unlink()
+        self.bloques = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.cerrar()
+
+
+def _adjuntar(descriptores: dict) -> tuple:
+    """Abre en un worker los bloques descriptos; devuelve los arrays y los bloques a cerrar."""
+    bloques = []
+    arrays = {}
+    for nombre, (bloque, forma, tipo) in descriptores.items():
+        bloque = shared_memory.SharedMemory(name=bloque)
+        bloques.append(bloque)
+        arrays[nombre] = np.ndarray(forma, dtype=np.dtype(tipo), buffer=bloque.buf)
+    return arrays, bloques
+
+
+def _ejecutar(tarea, descriptores: dict, limites: np.ndarray, procesos: int) -> list:
+    """Corre tarea(descriptores, inicio, fin) sobre cada partición y devuelve los resultados en orden."""
+    rangos = [(int(inicio), int(fin)) for inicio, fin in zip(limites[:-1], limites[1:]) if fin > inicio]
+    if procesos <= 1 or len(rangos) <= 1:
+        return [tarea(descriptores, inicio, fin) for inicio, fin in rangos]
+    with ProcessPoolExecutor(max_workers=min(procesos, len(rangos))) as pool:
+        futuros = [pool.submit(tarea, descriptores, inicio, fin) for inicio, fin in rangos]
+        return [futuro.result() for futuro in futuros]
+
+
+def _particionar(df_scores: pd.DataFrame, columna: str, cantidad: int) -> tuple:
+    """Orden de las filas agrupadas por partición y límites de cada partición en ese orden."""
+    if columna not in COLUMNAS_PARTICION:
+        raise ValueError(f"Solo se puede particionar por {COLUMNAS_PARTICION}")
+    numero = particiones(df_scores[columna].to_numpy(dtype=np.int64), cantidad)
+    # con números de partición chicos el orden estable de numpy es un radix sort, O(n)
+    orden = np.argsort(numero.astype(np.int16 if cantidad < 2 ** 15 else np.int64), kind='stable')
+    limites = np.concatenate([[0], np.cumsum(np.bincount(numero, minlength=cantidad))])
+    return orden, limites
+
+
+def _columnas_scores(df_scores: pd.DataFrame, orden: np.ndarray, fechas: bool = False) -> dict:
+    arrays = {'user_id': df_scores['user_id'].to_numpy(dtype=np.int64)[orden],
+              'movie_id': df_scores['movie_id'].to_numpy(dtype=np.int64)[orden]}
+    if fechas:
+        arrays['rating'] = df_scores['rating'].to_numpy(dtype=np.float64)[orden]
+        fecha = pd.to_datetime(df_scores['Date'], errors='coerce').to_numpy(dtype='datetime64[s]')
+        arrays['fecha'] = fecha[orden]
+    return arrays
+
+
+def _indice(ids: np.ndarray, nombre: str) -> dict:
+    """Arrays para ubicar valores entre ids (sin repetidos) desde un worker con _ubicar.
+    Si los ids son compactos se arma una tabla indexada por id (una búsqueda es un acceso al
+    array); si no, los ids ordenados para buscar por bisección."""
+    ids = np.asarray(ids, dtype=np.int64)
+    if len(ids) and ids.min() >= 0 and ids.max() < _DENSO * len(ids) + 2 ** 16:
+        tabla = np.full(ids.max() + 1, -1, dtype=np.int64)
+        tabla[ids] = np.arange(len(ids))
+        return {f'{nombre}_tabla': tabla}
+    orden = np.argsort(ids)
+    return {f'{nombre}_claves': ids[orden], f'{nombre}_posiciones': orden}
+
+
+def _ubicar(arrays: dict, nombre: str, valores: np.ndarray) -> np.ndarray:
+    """Posición de cada valor en los ids indexados con _indice(ids, nombre), o -1 si no está."""
+    if f'{nombre}_tabla' in arrays:
+        tabla = arrays[f'{nombre}_tabla']
+        dentro = (valores >= 0) & (valores < len(tabla))
+        posiciones = np.full(len(valores), -1, dtype=np.int64)
+        posiciones[dentro] = tabla[valores[dentro]]
+        return posiciones
+    claves = arrays[f'{nombre}_claves']
+    if len(claves) == 0:
+        return np.full(len(valores), -1, dtype=np.int64)
+    posiciones = np.minimum(np.searchsorted(claves, valores), len(claves) - 1)
+    return np.where(claves[posiciones] == valores, arrays[f'{nombre}_posiciones'][posiciones], -1)
+
+
+# ---------------------------------------------------------------- integridad
+
+def _invalidas_particion(descriptores: dict, inicio: int, fin: int) -> dict:
+    arrays, bloques = _adjuntar(descriptores)
+    try:
+        orden = arrays['orden'][inicio:fin]
+        return {columna: orden[_ubicar(arrays, columna, arrays[columna][inicio:fin]) < 0]
+                for columna in COLUMNAS_PARTICION}
+    finally:
+        del arrays
+        for bloque in bloques:
+            bloque.close()
+
+
+def verificar_scores(tablas: dict, procesos: int = None, columna: str = 'user_id') -> pd.DataFrame:
+    """Elimina en el lugar los scores cuyo user_id o movie_id no existen, como
+    GrafoIntegridad.verificar pero con las particiones en un pool de procesos.
+
+    Args:
+        tablas (dict): con 'scores', 'usuarios' y 'peliculas' (ya limpias).
+        procesos (int): cantidad de procesos; por defecto, uno por núcleo.
+        columna (str): columna por la que se particionan los scores.
+
+    Returns: reporte con el formato de GrafoIntegridad.verificar.
+    """
+    procesos = procesos or procesos_disponibles()
+    df_scores = tablas['scores']
+    orden, limites = _particionar(df_scores, columna, procesos)
+    arrays = _columnas_scores(df_scores, orden)
+    arrays['orden'] = orden
+    arrays.update(_indice(tablas['usuarios']['id'].unique(), 'user_id'))
+    arrays.update(_indice(tablas['peliculas']['id'].unique(), 'movie_id'))
+    del orden
+    with _Compartidos(arrays) as compartidos:
+        del arrays
+        parciales = _ejecutar(_invalidas_particion, compartidos.descriptores, limites, procesos)
+
+    relaciones = {'user_id': ('usuarios', 'id'), 'movie_id': ('peliculas', 'id')}
+    reporte = []
+    invalidas = np.zeros(len(df_scores), dtype=bool)
+    for col_hija, (padre, col_padre) in relaciones.items():
+        posiciones = np.sort(np.concatenate([parcial[col_hija] for parcial in parciales]
+                                            or [np.empty(0, dtype=np.int64)]))
+        invalidas[posiciones] = True
+        reporte.append(GrafoIntegridad._fila_reporte(padre, col_padre, 'scores', col_hija,
+                                                     df_scores.index[posiciones]))
+    if invalidas.any():
+        eliminar_filas(df_scores, df_scores.index[invalidas])
+    return pd.DataFrame(reporte, columns=COLUMNAS_REPORTE)
+
+
+# ---------------------------------------------------------------- estadísticas
+
+def _agrupar(codigos: np.ndarray, ratings: np.ndarray) -> tuple:
+    """Claves distintas y cantidad, suma y suma de cuadrados de los ratings de cada una."""
+    if len(codigos) and codigos.min() >= 0 and codigos.max() < _DENSO * len(codigos) + 2 ** 16:
+        # claves compactas (ids o códigos): se cuenta directamente por valor, sin ordenar
+        n = np.bincount(codigos)
+        claves = np.flatnonzero(n)
+        return (claves, n[claves], np.bincount(codigos, ratings)[claves],
+                np.bincount(codigos, ratings * ratings)[claves])
+    claves, inversa = np.unique(codigos, return_inverse=True)
+    return (claves, np.bincount(inversa, minlength=len(claves)),
+            np.bincount(inversa, ratings, minlength=len(claves)),
+            np.bincount(inversa, ratings * ratings, minlength=len(claves)))
+
+
+def _acumular_particion(descriptores: dict, inicio: int, fin: int) -> dict:
+    arrays, bloques = _adjuntar(descriptores)
+    try:
+        usuarios = arrays['user_id'][inicio:fin]
+        peliculas = arrays['movie_id'][inicio:fin]
+        ratings = arrays['rating'][inicio:fin]
+        parciales = {'usuario': _agrupar(usuarios, ratings), 'pelicula': _agrupar(peliculas, ratings)}
+
+        # atributos de la película de cada score
+        pos = _ubicar(arrays, 'pelicula', peliculas)
+        conocida = pos >= 0
+        pos, r = pos[conocida], ratings[conocida]
+        anios = arrays['anio_pelicula'][pos]
+        con_anio = anios >= 0
+        parciales['anio'] = _agrupar(anios[con_anio], r[con_anio])
+        generos = arrays['generos'][pos].astype(np.float64)
+        parciales['genero'] = (np.arange(generos.shape[1]), generos.sum(axis=0).astype(np.int64),
+                               r @ generos, (r * r) @ generos)
+
+        # atributos del usuario de cada score
+        pos = _ubicar(arrays, 'usuario', usuarios)
+        conocido = pos >= 0
+        pos, r, fechas = pos[conocido], ratings[conocido], arrays['fecha'][inicio:fin][conocido]
+        for dimension in ('sexo', 'ocupacion'):
+            codigos = arrays[dimension][pos]
+            valido = codigos >= 0
+            parciales[dimension] = _agrupar(codigos[valido], r[valido])
+        con_fecha = ~np.isnat(fechas)
+        edades = fechas[con_fecha].astype('datetime64[Y]').astype(np.int64) + 1970 \
+            - arrays['nacimiento'][pos[con_fecha]]
+        rangos = np.searchsorted(LIMITES_ETARIOS, edades, side='right') - 1
+        valido = rangos >= 0
+        parciales['rango_etario'] = _agrupar(rangos[valido], r[con_fecha][valido])
+        return parciales
+    finally:
+        del arrays
+        for bloque in bloques:
+            bloque.close()
+
+
+def _combinar(parciales: list) -> tuple:
+    """Suma los acumulados parciales de una dimensión (las claves pueden repetirse entre particiones)."""
+    claves = np.concatenate([p[0] for p in parciales])
+    claves, inversa = np.unique(claves, return_inverse=True)
+    return (claves,) + tuple(np.bincount(inversa, np.concatenate([p[i] for p in parciales]),
+                                         minlength=len(claves)) for i in (1, 2, 3))
+
+
+def acumular(estadisticas, df_scores: pd.DataFrame, generos: list, matriz_generos: np.ndarray,
+             procesos: int = None, columna: str = 'user_id') -> dict:
+    """Acumulados por dimensión de todos los scores, con el formato de EstadisticasScores.acumulados.
+
+    Usa las películas y usuarios ya indexados en estadisticas (EstadisticasScores) para
+    armar las tablas chicas que reciben los workers.
+    """
+    procesos = procesos or procesos_disponibles()
+    orden, limites = _particionar(df_scores, columna, procesos)
+    arrays = _columnas_scores(df_scores, orden, fechas=True)
+    del orden
+
+    # tablas chicas, en el orden de estadisticas.peliculas y estadisticas.usuarios
+    ids_peliculas = np.fromiter(estadisticas.peliculas, dtype=np.int64, count=len(estadisticas.peliculas))
+    arrays.update(_indice(ids_peliculas, 'pelicula'))
+    arrays['anio_pelicula'] = np.array([-1 if anio is None else anio
+                                        for anio, _ in estadisticas.peliculas.values()], dtype=np.int64)
+    arrays['generos'] = np.asarray(matriz_generos, dtype=bool).reshape(len(ids_peliculas), len(generos))
+
+    ids_usuarios = np.fromiter(estadisticas.usuarios, dtype=np.int64, count=len(estadisticas.usuarios))
+    arrays.update(_indice(ids_usuarios, 'usuario'))
+    sexos, nacimientos, ocupaciones = zip(*estadisticas.usuarios.values()) if estadisticas.usuarios \
+        else ((), (), ())
+    codigos_sexo, categorias_sexo = pd.factorize(pd.Series(sexos, dtype=object))
+    codigos_ocupacion, categorias_ocupacion = pd.factorize(pd.Series(ocupaciones, dtype=object))
+    arrays['sexo'] = codigos_sexo
+    arrays['ocupacion'] = codigos_ocupacion
+    arrays['nacimiento'] = np.array(nacimientos, dtype=np.int64)
+
+    with _Compartidos(arrays) as compartidos:
+        del arrays
+        parciales = _ejecutar(_acumular_particion, compartidos.descriptores, limites, procesos)
+
+    etiquetas = {'sexo': list(categorias_sexo), 'ocupacion': list(categorias_ocupacion),
+                 'rango_etario': RANGOS_ETARIOS, 'genero': generos}
+    acumulados = {}
+    for dimension in parciales[0] if parciales else []:
+        claves, n, sumas, cuadrados = _combinar([parcial[dimension] for parcial in parciales])
+        nombres = etiquetas.get(dimension)
+        acumulados[dimension] = {
+            (nombres[clave] if nombres is not None else clave): [int(cantidad), float(suma), float(cuadrado)]
+            for clave, cantidad, suma, cuadrado in zip(claves.tolist(), n.tolist(), sumas.tolist(),
+                                                       cuadrados.tolist())
+            if cantidad > 0
+        }
+    return acumulados
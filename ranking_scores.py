@@ -0,0 +1,259 @@
+"""Rankings y percentiles de calificaciones sin ordenar los scores.
+
+Como las calificaciones son enteros de 1 a 5, alcanza con guardar para cada
+película, usuario y género cuántos scores de cada valor tiene: de ese
+histograma de 5 casillas salen en forma exacta la cantidad, el promedio y
+cualquier percentil. Los mejores N se eligen con una selección parcial
+(np.partition) sobre una entrada por clave y solo se ordenan los elegidos, así
+que una consulta depende de la cantidad de películas o usuarios y no de la de
+scores.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from esquema import GENEROS
+
+CALIFICACIONES = np.arange(1, 6)
+CRITERIOS = ('promedio', 'cantidad')
+
+
+def _ratings(valores) -> np.ndarray:
+    ratings = np.asarray(valores, dtype=np.int64)
+    if ((ratings < 1) | (ratings > 5)).any():
+        raise ValueError("Las calificaciones deben ser enteros de 1 a 5.")
+    return ratings
+
+
+def _percentiles(conteos: np.ndarray, cantidad: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Percentiles q (entre 0 y 1) de cada fila de conteos, con interpolación lineal entre
+    los scores vecinos (como Series.quantile). Las filas sin scores dan NaN."""
+    acumulado = conteos.cumsum(axis=1)
+    posicion = np.maximum(cantidad[:, None] - 1, 0) * q[None, :]
+    abajo, arriba = np.floor(posicion), np.ceil(posicion)
+    # calificación del score que queda en cada posición de la fila ordenada
+    valor_abajo = 1 + (acumulado[:, None, :] <= abajo[:, :, None]).sum(axis=2)
+    valor_arriba = 1 + (acumulado[:, None, :] <= arriba[:, :, None]).sum(axis=2)
+    resultado = valor_abajo + (posicion - abajo) * (valor_arriba - valor_abajo)
+    return np.where(cantidad[:, None] > 0, resultado, np.nan)
+
+
+def _mejores(valores: np.ndarray, desempate: np.ndarray, ids: np.ndarray, n: int) -> np.ndarray:
+    """Posiciones de los n mayores valores, de mayor a menor. Los empates se ordenan por
+    desempate (mayor primero) y después por id, también en el límite de los n."""
+    if n < len(valores):
+        umbral = np.partition(valores, len(valores) - n)[len(valores) - n]
+        candidatos = np.flatnonzero(valores >= umbral)
+    else:
+        candidatos = np.arange(len(valores))
+    orden = np.lexsort((ids[candidatos], -desempate[candidatos], -valores[candidatos]))
+    return candidatos[orden[:n]]
+
+
+class _Histogramas:
+    """Histograma de calificaciones por clave (una fila por clave, una columna por
+    calificación), con la cantidad y la suma de cada clave."""
+
+    def __init__(self, ids, conteos: np.ndarray):
+        self.ids = pd.Index(ids)
+        self.conteos = conteos.astype(np.int64)
+        self.cantidad = self.conteos.sum(axis=1)
+        self.suma = self.conteos @ CALIFICACIONES
+
+    @classmethod
+    def contar(cls, claves, ratings: np.ndarray) -> '_Histogramas':
+        """Histogramas de los scores con esas claves y calificaciones."""
+        ids, codigos = np.unique(np.asarray(claves), return_inverse=True)
+        return cls(ids, np.bincount(codigos * 5 + ratings - 1, minlength=len(ids) * 5).reshape(-1, 5))
+
+    def filas(self, claves) -> np.ndarray:
+        """Posiciones de las claves; las que no estaban se agregan con el histograma vacío."""
+        posiciones = self.ids.get_indexer(claves)
+        nuevas = posiciones < 0
+        if nuevas.any():
+            agregadas = pd.unique(np.asarray(claves)[nuevas])
+            self.ids = self.ids.append(pd.Index(agregadas))
+            self.conteos = np.vstack([self.conteos, np.zeros((len(agregadas), 5), dtype=self.conteos.dtype)])
+            self.cantidad = np.concatenate([self.cantidad, np.zeros(len(agregadas), dtype=self.cantidad.dtype)])
+            self.suma = np.concatenate([self.suma, np.zeros(len(agregadas), dtype=self.suma.dtype)])
+            posiciones = self.ids.get_indexer(claves)
+        return posiciones
+
+    def sumar(self, posiciones: np.ndarray, ratings: np.ndarray, signo: int) -> None:
+        np.add.at(self.conteos, (posiciones, ratings - 1), signo)
+        np.add.at(self.cantidad, posiciones, signo)
+        np.add.at(self.suma, posiciones, signo * ratings)
+
+
+class RankingScores:
+    """Cantidad, promedio, histograma y percentiles de las calificaciones por película,
+    usuario y género, con consultas de los mejores N.
+
+    Args:
+        df_scores (pd.DataFrame): scores con las columnas de scores.csv.
+        df_peliculas (pd.DataFrame): películas con una columna por género. Sin ellas no
+            hay dimensión 'genero'.
+
+    Se arma una sola vez sobre toda la tabla y después se mantiene con agregar y quitar
+    (o sus versiones en lote), en O(1) por score. Los resultados de las consultas quedan
+    guardados hasta el próximo cambio; no deben modificarse.
+    """
+
+    def __init__(self, df_scores: pd.DataFrame, df_peliculas: pd.DataFrame = None):
+        self._lock = threading.RLock()
+        ratings = _ratings(df_scores['rating'].to_numpy())
+        self._histogramas = {
+            'pelicula': _Histogramas.contar(df_scores['movie_id'].to_numpy(dtype=np.int64), ratings),
+            'usuario': _Histogramas.contar(df_scores['user_id'].to_numpy(dtype=np.int64), ratings),
+        }
+        self._resultados = {}
+        if df_peliculas is None:
+            self._generos_peliculas = None
+            return
+        generos = [genero for genero in GENEROS if genero in df_peliculas.columns]
+        self._generos_peliculas = pd.DataFrame(
+            df_peliculas[generos].fillna(False).to_numpy(dtype=bool), columns=generos,
+            index=pd.Index(df_peliculas['id'].to_numpy(dtype=np.int64))).groupby(level=0).max()
+        # géneros de cada fila del histograma de películas; un score suma a todos los de su película
+        self._matriz_generos = self._generos_de(self._histogramas['pelicula'].ids)
+        self._histogramas['genero'] = _Histogramas(
+            generos, self._matriz_generos.T.astype(np.int64) @ self._histogramas['pelicula'].conteos)
+
+    def _generos_de(self, movie_ids) -> np.ndarray:
+        # las películas que no están en la tabla no suman a ningún género
+        return self._generos_peliculas.reindex(movie_ids, fill_value=False).to_numpy(dtype=bool)
+
+    def _histograma(self, dimension: str) -> _Histogramas:
+        if dimension not in self._histogramas:
+            raise ValueError(f"La dimensión debe ser una de {list(self._histogramas)}")
+        return self._histogramas[dimension]
+
+    # actualización incremental
+
+    def _sumar(self, user_ids, movie_ids, ratings, signo: int) -> None:
+        ratings = _ratings(ratings)
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        with self._lock:
+            self._resultados = {}
+            peliculas = self._histogramas['pelicula']
+            posiciones = peliculas.filas(movie_ids)
+            peliculas.sumar(posiciones, ratings, signo)
+            usuarios = self._histogramas['usuario']
+            usuarios.sumar(usuarios.filas(np.asarray(user_ids, dtype=np.int64)), ratings, signo)
+            if 'genero' in self._histogramas:
+                if len(self._matriz_generos) < len(peliculas.ids):
+                    nuevas = peliculas.ids[len(self._matriz_generos):]
+                    self._matriz_generos = np.vstack([self._matriz_generos, self._generos_de(nuevas)])
+                # cada score suma su calificación a cada género de su película
+                por_score = self._matriz_generos[posiciones]
+                scores, columnas = np.nonzero(por_score)
+                self._histogramas['genero'].sumar(columnas, ratings[scores], signo)
+
+    def agregar(self, user_id, movie_id, rating) -> None:
+        """Suma un score a los histogramas de su película, su usuario y sus géneros."""
+        self._sumar([user_id], [movie_id], [rating], 1)
+
+    def quitar(self, user_id, movie_id, rating) -> None:
+        """Resta un score de los histogramas de su película, su usuario y sus géneros."""
+        self._sumar([user_id], [movie_id], [rating], -1)
+
+    def agregar_scores(self, df_scores: pd.DataFrame) -> None:
+        """Suma un lote de scores (con las columnas de scores.csv)."""
+        self._sumar(df_scores['user_id'].to_numpy(), df_scores['movie_id'].to_numpy(),
+                    df_scores['rating'].to_numpy(), 1)
+
+    def quitar_scores(self, df_scores: pd.DataFrame) -> None:
+        """Resta un lote de scores, por ejemplo los que devuelve una baja en cascada."""
+        self._sumar(df_scores['user_id'].to_numpy(), df_scores['movie_id'].to_numpy(),
+                    df_scores['rating'].to_numpy(), -1)
+
+    # consultas
+
+    def cantidad(self, dimension: str, clave) -> int:
+        with self._lock:
+            histograma = self._histograma(dimension)
+            posicion = histograma.ids.get_indexer([clave])[0]
+            return 0 if posicion < 0 else int(histograma.cantidad[posicion])
+
+    def histograma(self, dimension: str, clave) -> pd.Series:
+        """Cantidad de scores de cada calificación (1 a 5) para una clave de la dimensión."""
+        with self._lock:
+            histograma = self._histograma(dimension)
+            posicion = histograma.ids.get_indexer([clave])[0]
+            conteos = np.zeros(5, dtype=np.int64) if posicion < 0 else histograma.conteos[posicion]
+            return pd.Series(conteos, index=pd.Index(CALIFICACIONES, name='rating'), name='cantidad')
+
+    def percentil(self, dimension: str, clave, q: float = 50):
+        """Percentil q (de 0 a 100) de las calificaciones de una clave, o None si no tiene scores.
+        Args:
+            dimension (str): 'pelicula', 'usuario' o 'genero'.
+            clave: id de la película o del usuario, o nombre del género.
+        """
+        with self._lock:
+            histograma = self._histograma(dimension)
+            posicion = histograma.ids.get_indexer([clave])[0]
+            if posicion < 0 or histograma.cantidad[posicion] <= 0:
+                return None
+            fila = slice(posicion, posicion + 1)
+            return float(_percentiles(histograma.conteos[fila], histograma.cantidad[fila],
+                                      np.array([q / 100]))[0, 0])
+
+    def percentiles(self, dimension: str = 'genero', q=(25, 50, 75), minimo: int = 1) -> pd.DataFrame:
+        """Percentiles de las calificaciones de todas las claves con al menos minimo scores.
+
+        Returns: DataFrame con una fila por clave y las columnas cantidad, promedio y una
+            por percentil ('p25', 'p50', ...).
+        """
+        q = tuple(q)
+        clave = ('percentiles', dimension, q, minimo)
+        with self._lock:
+            if clave not in self._resultados:
+                histograma = self._histograma(dimension)
+                filas = np.flatnonzero(histograma.cantidad >= max(minimo, 1))
+                valores = _percentiles(histograma.conteos[filas], histograma.cantidad[filas],
+                                       np.asarray(q, dtype=float) / 100)
+                self._resultados[clave] = self._tabla(
+                    dimension, histograma, filas,
+                    {f'p{percentil:g}': columna for percentil, columna in zip(q, valores.T)})
+            return self._resultados[clave]
+
+    def mejores(self, dimension: str = 'pelicula', n: int = 10, por: str = 'promedio',
+                minimo: int = 1, ascendente: bool = False) -> pd.DataFrame:
+        """Las n claves con mayor promedio o cantidad de scores, por ejemplo las 10 películas
+        mejor calificadas con al menos 50 votos o los usuarios que más calificaron.
+        Args:
+            dimension (str): 'pelicula', 'usuario' o 'genero'.
+            n (int): cantidad de claves a devolver.
+            por (str): 'promedio' o 'cantidad'.
+            minimo (int): cantidad mínima de scores de una clave para entrar en el ranking.
+            ascendente (bool): si es True devuelve las de menor promedio o cantidad.
+
+        Returns: DataFrame con las columnas cantidad y promedio, ordenado por el criterio.
+            Los empates se ordenan por cantidad de scores (más primero) y después por clave.
+        """
+        if por not in CRITERIOS:
+            raise ValueError(f"El criterio debe ser uno de {list(CRITERIOS)}")
+        clave = ('mejores', dimension, n, por, minimo, ascendente)
+        with self._lock:
+            if clave not in self._resultados:
+                histograma = self._histograma(dimension)
+                filas = np.flatnonzero(histograma.cantidad >= max(minimo, 1))
+                cantidad = histograma.cantidad[filas]
+                if por == 'promedio':
+                    valores, desempate = histograma.suma[filas] / cantidad, cantidad
+                else:
+                    valores, desempate = cantidad.astype(float), histograma.suma[filas] / cantidad
+                signo = -1 if ascendente else 1
+                # las claves de genero son textos: el último desempate es su posición
+                ids = histograma.ids.to_numpy()[filas] if dimension != 'genero' else filas
+                elegidas = filas[_mejores(signo * valores, desempate, ids, n)]
+                self._resultados[clave] = self._tabla(dimension, histograma, elegidas)
+            return self._resultados[clave]
+
+    @staticmethod
+    def _tabla(dimension: str, histograma: _Histogramas, filas: np.ndarray, columnas: dict = None) -> pd.DataFrame:
+        nombre = {'pelicula': 'movie_id', 'usuario': 'user_id', 'genero': 'genero'}[dimension]
+        cantidad = histograma.cantidad[filas]
+        return pd.DataFrame({'cantidad': cantidad, 'promedio': histograma.suma[filas] / cantidad, **(columnas or {})},
+                            index=pd.Index(histograma.ids[filas], name=nombre))
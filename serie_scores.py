@@ -0,0 +1,291 @@
+import numpy as np
+import pandas as pd
+
+# valor de NaT al ver fechas datetime64 como enteros
+_NAT = np.iinfo('int64').min
+COLUMNAS = ('tiempos', 'usuarios', 'peliculas', 'ratings')
+
+
+def _segundos(fechas) -> np.ndarray:
+    """Fechas (columna Date, lista o array) como segundos desde 1970; las faltantes quedan como _NAT."""
+    fechas = pd.Series(fechas)
+    if not pd.api.types.is_datetime64_any_dtype(fechas):
+        fechas = pd.to_datetime(fechas, errors='coerce')
+    return fechas.to_numpy(dtype='datetime64[s]').view('int64')
+
+
+def _segundo(fecha) -> int:
+    return int(np.datetime64(pd.Timestamp(fecha), 's').astype('int64'))
+
+
+def _ancho(ancho) -> int:
+    """Ancho de ventana en segundos: un número de días o un texto como '1D', '6h' o '30min'."""
+    if isinstance(ancho, (int, np.integer)):
+        segundos = int(ancho) * 86400
+    else:
+        segundos = int(pd.Timedelta(ancho).total_seconds())
+    if segundos <= 0:
+        raise ValueError("El ancho de la ventana debe ser positivo.")
+    return segundos
+
+
+def _recorte(tiempos: np.ndarray, desde, hasta) -> tuple:
+    """Posiciones [inicio, fin) de desde <= tiempo < hasta en tiempos (ordenados), por búsqueda binaria."""
+    inicio = 0 if desde is None else int(np.searchsorted(tiempos, _segundo(desde), side='left'))
+    fin = len(tiempos) if hasta is None else int(np.searchsorted(tiempos, _segundo(hasta), side='left'))
+    return inicio, max(fin, inicio)
+
+
+def _fechas(segundos: np.ndarray) -> pd.DatetimeIndex:
+    return pd.DatetimeIndex(segundos.astype('datetime64[s]'))
+
+
+class SerieScores:
+    """Scores ordenados por fecha, para consultas por ventanas de tiempo.
+
+    Las columnas se guardan como arrays de numpy ordenados por el momento de
+    cada score, así que un rango de fechas es un corte [inicio, fin) que se
+    ubica con búsqueda binaria y cada consulta recorre solo los scores del
+    rango, no la tabla completa. Para los promedios móviles por película se
+    arma además (al pedirlo) un orden por película y fecha.
+
+    Los scores nuevos o quitados quedan pendientes y se incorporan la próxima
+    vez que se consulta. Como normalmente llegan con fechas posteriores a las
+    existentes, alcanza con agregarlos al final; si no, se insertan en su
+    posición en una sola pasada. Los scores sin fecha no se guardan.
+    """
+
+    def __init__(self, df_scores: pd.DataFrame):
+        segundos = _segundos(df_scores['Date'])
+        validos = segundos != _NAT
+        orden = np.argsort(segundos[validos], kind='stable')
+        self.tiempos = segundos[validos][orden]
+        self.usuarios = df_scores['user_id'].to_numpy(dtype='int32')[validos][orden]
+        self.peliculas = df_scores['movie_id'].to_numpy(dtype='int32')[validos][orden]
+        self.ratings = df_scores['rating'].to_numpy(dtype='int8')[validos][orden]
+        self._agregados = []
+        self._quitados = []
+        self._por_pelicula = None
+
+    def __len__(self) -> int:
+        self._consolidar()
+        return len(self.tiempos)
+
+    # actualización incremental
+
+    def agregar(self, user_id, movie_id, rating, fecha) -> None:
+        """Agrega un score; se incorpora en orden en la próxima consulta."""
+        segundo = _segundo(fecha)
+        if segundo != _NAT:
+            self._agregados.append((segundo, user_id, movie_id, rating))
+
+    def quitar(self, user_id, movie_id, rating, fecha) -> None:
+        """Quita un score (el primero igual, si hay repetidos) en la próxima consulta."""
+        segundo = _segundo(fecha)
+        if segundo != _NAT:
+            self._quitados.append((segundo, user_id, movie_id, rating))
+
+    def agregar_scores(self, df_scores: pd.DataFrame) -> None:
+        """Agrega un lote de scores (con las columnas de scores.csv)."""
+        for fila in _filas(df_scores):
+            self._agregados.append(fila)
+
+    def quitar_scores(self, df_scores: pd.DataFrame) -> None:
+        """Quita un lote de scores (con las columnas de scores.csv)."""
+        for fila in _filas(df_scores):
+            self._quitados.append(fila)
+
+    def descartar(self, usuarios=None, peliculas=None) -> int:
+        """Quita todos los scores de los usuarios o películas indicados (por ejemplo,
+        después de una baja en cascada). Devuelve la cantidad de scores quitados."""
+        self._consolidar()
+        quitar = np.zeros(len(self.tiempos), dtype=bool)
+        if usuarios is not None:
+            quitar |= np.isin(self.usuarios, np.asarray(list(usuarios)))
+        if peliculas is not None:
+            quitar |= np.isin(self.peliculas, np.asarray(list(peliculas)))
+        if quitar.any():
+            self._conservar(~quitar)
+        return int(quitar.sum())
+
+    def _conservar(self, mascara: np.ndarray) -> None:
+        for columna in COLUMNAS:
+            setattr(self, columna, getattr(self, columna)[mascara])
+        self._por_pelicula = None
+
+    def _consolidar(self) -> None:
+        if self._agregados:
+            self._insertar(self._agregados)
+            self._agregados = []
+        if self._quitados:
+            self._borrar(self._quitados)
+            self._quitados = []
+
+    def _insertar(self, filas: list) -> None:
+        nuevos = [np.array(valores, dtype=getattr(self, columna).dtype)
+                  for columna, valores in zip(COLUMNAS, zip(*filas))]
+        orden = np.argsort(nuevos[0], kind='stable')
+        nuevos = [valores[orden] for valores in nuevos]
+        if not len(self.tiempos) or nuevos[0][0] >= self.tiempos[-1]:
+            # el caso habitual: todos los scores nuevos son posteriores a los existentes
+            for columna, valores in zip(COLUMNAS, nuevos):
+                setattr(self, columna, np.concatenate([getattr(self, columna), valores]))
+        else:
+            # 'right' deja cada score nuevo después de los existentes con la misma fecha
+            posiciones = np.searchsorted(self.tiempos, nuevos[0], side='right')
+            for columna, valores in zip(COLUMNAS, nuevos):
+                setattr(self, columna, np.insert(getattr(self, columna), posiciones, valores))
+        self._por_pelicula = None
+
+    def _borrar(self, filas: list) -> None:
+        conservar = np.ones(len(self.tiempos), dtype=bool)
+        for segundo, user_id, movie_id, rating in filas:
+            # solo se revisan los scores del mismo segundo
+            inicio = np.searchsorted(self.tiempos, segundo, side='left')
+            fin = np.searchsorted(self.tiempos, segundo, side='right')
+            iguales = np.flatnonzero(conservar[inicio:fin]
+                                     & (self.usuarios[inicio:fin] == user_id)
+                                     & (self.peliculas[inicio:fin] == movie_id)
+                                     & (self.ratings[inicio:fin] == rating))
+            if len(iguales):
+                conservar[inicio + iguales[0]] = False
+        if not conservar.all():
+            self._conservar(conservar)
+
+    # rangos
+
+    def rango(self, desde=None, hasta=None) -> tuple:
+        """Posiciones [inicio, fin) de los scores con desde <= fecha < hasta, por búsqueda binaria.
+        Sin desde (o sin hasta) el rango empieza en el primer score (o termina en el último)."""
+        self._consolidar()
+        return _recorte(self.tiempos, desde, hasta)
+
+    def scores(self, desde=None, hasta=None) -> pd.DataFrame:
+        """Scores del rango, ordenados por fecha, con las columnas de scores.csv."""
+        inicio, fin = self.rango(desde, hasta)
+        return pd.DataFrame({'user_id': self.usuarios[inicio:fin], 'movie_id': self.peliculas[inicio:fin],
+                             'rating': self.ratings[inicio:fin],
+                             'Date': self.tiempos[inicio:fin].astype('datetime64[s]')})
+
+    def _pelicula(self, movie_id) -> np.ndarray:
+        """Posiciones de los scores de una película, en orden de fecha."""
+        if self._por_pelicula is None:
+            # el orden estable por película conserva el orden por fecha dentro de cada una
+            orden = np.argsort(self.peliculas, kind='stable')
+            self._por_pelicula = (orden, self.peliculas[orden])
+        orden, peliculas = self._por_pelicula
+        inicio = np.searchsorted(peliculas, movie_id, side='left')
+        fin = np.searchsorted(peliculas, movie_id, side='right')
+        return orden[inicio:fin]
+
+    # consultas
+
+    def ventanas(self, ancho='1D', desde=None, hasta=None, movie_id=None) -> pd.DataFrame:
+        """Cantidad y promedio de los scores por ventanas fijas consecutivas (tumbling).
+
+        Args:
+            ancho: ancho de cada ventana, en días (int) o como '1D', '7D', '6h'. Las
+                ventanas se alinean a múltiplos del ancho (las de un día empiezan a las 0 h).
+            desde, hasta: rango de fechas [desde, hasta); por defecto, todos los scores.
+            movie_id: si se indica, solo los scores de esa película.
+
+        Returns: DataFrame indexado por el comienzo de cada ventana, con columnas
+            'cantidad' y 'promedio'. Las ventanas sin scores dentro del rango quedan con
+            cantidad 0 y promedio NaN.
+        """
+        segundos = _ancho(ancho)
+        self._consolidar()
+        if movie_id is None:
+            inicio, fin = self.rango(desde, hasta)
+            tiempos, ratings = self.tiempos[inicio:fin], self.ratings[inicio:fin]
+        else:
+            posiciones = self._pelicula(movie_id)
+            tiempos = self.tiempos[posiciones]
+            inicio, fin = _recorte(tiempos, desde, hasta)
+            tiempos, ratings = tiempos[inicio:fin], self.ratings[posiciones[inicio:fin]]
+        if not len(tiempos):
+            return pd.DataFrame({'cantidad': pd.Series(dtype='int64'), 'promedio': pd.Series(dtype='float64')},
+                                index=pd.DatetimeIndex([], dtype='datetime64[s]'))
+
+        numeros = tiempos // segundos
+        primera = numeros[0]
+        cantidades = np.bincount(numeros - primera)
+        sumas = np.bincount(numeros - primera, weights=ratings)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            promedios = sumas / cantidades
+        comienzos = (primera + np.arange(len(cantidades))) * segundos
+        return pd.DataFrame({'cantidad': cantidades, 'promedio': promedios}, index=_fechas(comienzos))
+
+    def por_dia(self, desde=None, hasta=None, movie_id=None) -> pd.DataFrame:
+        """Cantidad y promedio de los scores de cada día (ver ventanas)."""
+        return self.ventanas('1D', desde, hasta, movie_id)
+
+    def promedio_movil(self, movie_id, ventana='7D', desde=None, hasta=None) -> pd.DataFrame:
+        """Promedio móvil de una película: para cada uno de sus scores, cantidad y promedio
+        de los scores de la película en la ventana (fecha - ventana, fecha].
+        Es lo mismo que rolling(ventana, on='Date') sobre sus scores, sin filtrar la tabla.
+
+        Returns: DataFrame indexado por la fecha de cada score, con columnas 'cantidad' y 'promedio'.
+        """
+        segundos = _ancho(ventana)
+        self._consolidar()
+        posiciones = self._pelicula(movie_id)
+        tiempos = self.tiempos[posiciones]
+        acumulados = np.concatenate([[0], np.cumsum(self.ratings[posiciones], dtype='int64')])
+        # cada ventana empieza en el primer score posterior a fecha - ventana
+        finales = np.arange(1, len(tiempos) + 1)
+        iniciales = np.searchsorted(tiempos, tiempos - segundos, side='right')
+        inicio, fin = _recorte(tiempos, desde, hasta)
+        cantidades = (finales - iniciales)[inicio:fin]
+        sumas = (acumulados[finales] - acumulados[iniciales])[inicio:fin]
+        return pd.DataFrame({'cantidad': cantidades, 'promedio': sumas / cantidades},
+                            index=_fechas(tiempos[inicio:fin]))
+
+    def tendencias(self, dias: int = 7, n: int = 10, hasta=None, minimo: int = 1) -> pd.DataFrame:
+        """Películas más calificadas en los últimos dias días, comparadas con los dias anteriores.
+
+        Args:
+            dias (int): largo de la ventana en días.
+            n (int): cantidad de películas a devolver.
+            hasta: fin (excluido) de la ventana; por defecto, justo después del último score.
+            minimo (int): cantidad mínima de scores en la ventana para aparecer.
+
+        Returns: DataFrame indexado por movie_id con columnas 'cantidad' y 'promedio' (en
+            la ventana), 'anterior' (cantidad en la ventana previa del mismo largo) y
+            'crecimiento' (cantidad - anterior), de mayor a menor cantidad.
+        """
+        self._consolidar()
+        if hasta is None:
+            fin = len(self.tiempos)
+            limite = int(self.tiempos[-1]) + 1 if fin else 0
+        else:
+            limite = _segundo(hasta)
+            fin = int(np.searchsorted(self.tiempos, limite, side='left'))
+        segundos = _ancho(dias)
+        inicio = int(np.searchsorted(self.tiempos, limite - segundos, side='left'))
+        previo = int(np.searchsorted(self.tiempos, limite - 2 * segundos, side='left'))
+
+        peliculas, posiciones, cantidades = np.unique(self.peliculas[inicio:fin], return_inverse=True,
+                                                      return_counts=True)
+        sumas = np.bincount(posiciones, weights=self.ratings[inicio:fin], minlength=len(peliculas))
+        anteriores_ids, anteriores = np.unique(self.peliculas[previo:inicio], return_counts=True)
+        anterior = np.zeros(len(peliculas), dtype='int64')
+        comunes = np.isin(peliculas, anteriores_ids)
+        anterior[comunes] = anteriores[np.searchsorted(anteriores_ids, peliculas[comunes])]
+
+        elegidas = np.flatnonzero(cantidades >= minimo)
+        # de mayor a menor cantidad y, a igual cantidad, de mayor a menor promedio
+        promedios = sumas / np.maximum(cantidades, 1)
+        elegidas = elegidas[np.lexsort((-promedios[elegidas], -cantidades[elegidas]))][:n]
+        return pd.DataFrame({'cantidad': cantidades[elegidas], 'promedio': promedios[elegidas],
+                             'anterior': anterior[elegidas],
+                             'crecimiento': cantidades[elegidas] - anterior[elegidas]},
+                            index=pd.Index(peliculas[elegidas], name='movie_id'))
+
+
+def _filas(df_scores: pd.DataFrame):
+    segundos = _segundos(df_scores['Date'])
+    validos = segundos != _NAT
+    return zip(segundos[validos].tolist(), df_scores['user_id'].to_numpy()[validos].tolist(),
+               df_scores['movie_id'].to_numpy()[validos].tolist(),
+               df_scores['rating'].to_numpy()[validos].tolist())
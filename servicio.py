@@ -0,0 +1,287 @@
+"""Servicio local (asyncio) sobre las tablas de johann_clases.
+
+Protocolo: una línea JSON por pedido y una línea JSON por respuesta, sobre TCP.
+Cada pedido trae 'op' y 'tabla', y opcionalmente 'pedido' (un número que se
+devuelve en la respuesta, para poder mandar varios pedidos sin esperar):
+
+    {"pedido": 1, "op": "new", "tabla": "personas", "elemento": {...}, "conflicto": "rechazar"}
+    {"pedido": 2, "op": "get", "tabla": "personas", "id": 15}
+    {"pedido": 3, "op": "update", "tabla": "personas", "id": 15, "elemento": {...}}
+    {"pedido": 4, "op": "delete", "tabla": "personas", "id": 15}
+    {"pedido": 5, "op": "stats", "tabla": "peliculas", "anios": [1990, 1995], "generos": ["Drama"]}
+    {"pedido": 6, "op": "stats", "tabla": "scores", "dimension": "usuario"}
+    {"pedido": 7, "op": "stats", "tabla": "personas", "anios": [1970, 1980], "sexo": "F"}
+    {"pedido": 8, "op": "metricas", "formato": "prometheus"}
+    {"pedido": 9, "op": "cache"}
+
+Respuesta: {"pedido": 1, "ok": true, "resultado": ...} o {"pedido": 1, "ok": false, "error": "..."}.
+'metricas' devuelve el registro de métricas de las operaciones (metricas.registro) como
+diccionario o, con "formato": "prometheus", como texto para un recolector.
+'cache' devuelve los aciertos, fallos y desalojos del cache de consultas (cache_consultas).
+
+Las altas que llegan dentro de una misma ventana de tiempo se juntan en una
+única llamada a new_many por tabla y forma de resolver conflictos, así que
+muchos clientes concurrentes pagan una sola concatenación. Las operaciones
+sobre las tablas corren en un hilo aparte; los locks de cada tabla las
+mantienen consistentes.
+
+Uso (desde la raíz del repositorio):
+    python -m servicio [--puerto 8765] [--ventana 0.002] [--perfil 0.01] [--perfil-memoria]
+"""
+import argparse
+import asyncio
+import json
+from pathlib import Path
+
+import numpy as np
+
+import cache_consultas
+import estadisticas
+import metricas
+from almacenamiento import leer_tabla
+from concurrencia import bloquear
+from johann_clases import CONFLICTOS, Peliculas, Personas, Usuarios
+
+RAIZ = Path(__file__).resolve().parent
+TABLAS = {'personas': Personas, 'usuarios': Usuarios, 'peliculas': Peliculas}
+# parámetros de get_stats que se toman del pedido y nombres de los conteos que devuelve
+STATS = {Peliculas: (('anios', 'generos', 'todos_los_generos'), ('por_anio', 'por_genero')),
+         Usuarios: (('ocupaciones',), ('por_ocupacion', 'por_anio_alta')),
+         Personas: (('anios', 'sexo'), ('por_anio', 'por_sexo'))}
+
+
+class ErrorPedido(Exception):
+    """Pedido mal formado o que no se puede resolver."""
+
+
+def _serializable(valor):
+    if isinstance(valor, np.generic):
+        return valor.item()
+    return str(valor)
+
+
+def _conteos(serie) -> dict:
+    return {str(clave): int(valor) for clave, valor in serie.items()}
+
+
+class Servicio:
+    """Atiende pedidos de alta, consulta, modificación, baja y estadísticas.
+
+    Args:
+        tablas (dict): nombre -> clase de DataBase con la base de datos ya cargada.
+        ventana (float): segundos que espera una alta a que lleguen otras para
+            procesarlas juntas.
+        maximo (int): cantidad de altas a partir de la cual el lote se procesa
+            sin esperar al fin de la ventana.
+    """
+
+    def __init__(self, tablas: dict = None, ventana: float = 0.002, maximo: int = 1024):
+        self.tablas = TABLAS if tablas is None else tablas
+        self.ventana = ventana
+        self.maximo = maximo
+        # (tabla, conflicto) -> altas pendientes [(elemento, futuro)]
+        self._pendientes = {}
+        self._lotes = {}
+        self._servidor = None
+
+    # altas en lote
+
+    async def _alta(self, tabla: str, elemento: dict, conflicto: str) -> dict:
+        if conflicto not in CONFLICTOS:
+            raise ErrorPedido(f"El conflicto debe resolverse con una de {CONFLICTOS}")
+        clave = (tabla, conflicto)
+        futuro = asyncio.get_running_loop().create_future()
+        pendientes = self._pendientes.setdefault(clave, [])
+        pendientes.append((elemento, futuro))
+        if clave not in self._lotes:
+            self._lotes[clave] = asyncio.create_task(self._procesar_lote(clave))
+        elif len(pendientes) >= self.maximo:
+            self._lotes[clave].cancel()
+            self._lotes[clave] = asyncio.create_task(self._procesar_lote(clave, esperar=False))
+        return await futuro
+
+    async def _procesar_lote(self, clave: tuple, esperar: bool = True) -> None:
+        if esperar:
+            try:
+                await asyncio.sleep(self.ventana)
+            except asyncio.CancelledError:
+                # el lote se llenó antes del fin de la ventana y ya lo procesa otra tarea
+                return
+        lote = self._pendientes.pop(clave, [])
+        self._lotes.pop(clave, None)
+        if not lote:
+            return
+        tabla, conflicto = clave
+        elementos = [elemento for elemento, _ in lote]
+        try:
+            reporte = await asyncio.to_thread(self.tablas[tabla].new_many, elementos, conflicto)
+        except Exception as e:
+            for _, futuro in lote:
+                futuro.set_exception(ErrorPedido(f"No se pudo procesar el alta: {e}"))
+            return
+        for (_, futuro), fila in zip(lote, reporte.to_dict('records')):
+            futuro.set_result({'id': fila['id'], 'aceptado': fila['aceptado'], 'motivo': fila['motivo']})
+
+    # operaciones individuales (corren en un hilo aparte)
+
+    def _tabla(self, pedido: dict):
+        if pedido.get('tabla') not in self.tablas:
+            raise ErrorPedido(f"La tabla debe ser una de {list(self.tablas)}")
+        return self.tablas[pedido['tabla']]
+
+    @staticmethod
+    def _get(clase, id):
+        with clase._lock.lectura():
+            index = clase.get_index(id)
+            if index is None:
+                raise ErrorPedido("El elemento no está presente en la base de datos.")
+            return clase.get_many([index])[0].to_dict()
+
+    @staticmethod
+    def _modificar(clase, metodo, id, *args) -> bool:
+        # la versión de la tabla solo cambia si la operación se hizo. Se toman los mismos locks y
+        # en el mismo orden que el decorador escritura de update y delete, así no se bloquea con
+        # otras operaciones sobre las tablas relacionadas
+        with bloquear(escrituras=[clase._lock],
+                      lecturas=[tabla._lock for tabla in clase._tablas_relacionadas()]):
+            index = clase.get_index(id)
+            if index is None:
+                raise ErrorPedido("El elemento no está presente en la base de datos.")
+            version = clase._version
+            metodo(index, *args)
+            return clase._version != version
+
+    @staticmethod
+    def _stats(clase, pedido: dict):
+        if pedido['tabla'] == 'scores':
+            actuales = estadisticas.actuales()
+            if actuales is None:
+                raise ErrorPedido("No hay estadísticas de scores cargadas.")
+            dimension = pedido.get('dimension', 'usuario')
+            if dimension not in actuales.acumulados:
+                raise ErrorPedido(f"La dimensión debe ser una de {list(actuales.acumulados)}")
+            return actuales.resumen(dimension).reset_index(names='clave').to_dict('records')
+        tabla = next((base for base in clase.__mro__ if base in STATS), None)
+        if tabla is None:
+            raise ErrorPedido(f"La tabla '{pedido['tabla']}' no tiene estadísticas.")
+        parametros, nombres = STATS[tabla]
+        conteos = clase.get_stats(**{p: pedido[p] for p in parametros if p in pedido})
+        if conteos is None:
+            return {nombre: {} for nombre in nombres}
+        return {nombre: _conteos(conteo) for nombre, conteo in zip(nombres, conteos)}
+
+    async def resolver(self, pedido: dict):
+        """Resuelve un pedido y devuelve su resultado (lanza ErrorPedido si no se puede)."""
+        op = pedido.get('op')
+        if op == 'metricas':
+            if pedido.get('formato') == 'prometheus':
+                return metricas.registro.texto()
+            return metricas.registro.volcar()
+        if op == 'cache':
+            return cache_consultas.cache.estadisticas()
+        if op == 'stats' and pedido.get('tabla') == 'scores':
+            return await asyncio.to_thread(self._stats, None, pedido)
+        clase = self._tabla(pedido)
+        if op == 'new':
+            return await self._alta(pedido['tabla'], pedido.get('elemento', {}),
+                                    pedido.get('conflicto', 'rechazar'))
+        if op == 'get':
+            return await asyncio.to_thread(self._get, clase, pedido.get('id'))
+        if op == 'update':
+            return await asyncio.to_thread(self._modificar, clase, clase.update,
+                                           pedido.get('id'), pedido.get('elemento', {}))
+        if op == 'delete':
+            return await asyncio.to_thread(self._modificar, clase, clase.delete, pedido.get('id'))
+        if op == 'stats':
+            return await asyncio.to_thread(self._stats, clase, pedido)
+        raise ErrorPedido("La operación debe ser 'new', 'get', 'update', 'delete', 'stats', 'metricas' o 'cache'.")
+
+    # conexiones
+
+    async def _responder(self, linea: bytes, escritor: asyncio.StreamWriter) -> None:
+        respuesta = {}
+        try:
+            pedido = json.loads(linea)
+            if not isinstance(pedido, dict):
+                raise ErrorPedido("El pedido debe ser un objeto JSON.")
+            respuesta['pedido'] = pedido.get('pedido')
+            respuesta['resultado'] = await self.resolver(pedido)
+            respuesta['ok'] = True
+        except (ErrorPedido, KeyError, TypeError, ValueError) as e:
+            respuesta['ok'] = False
+            respuesta['error'] = str(e)
+        except Exception as e:
+            # cualquier otro error también se responde, así el cliente no queda esperando
+            respuesta['ok'] = False
+            respuesta['error'] = f"Error interno: {e}"
+        escritor.write(json.dumps(respuesta, default=_serializable).encode() + b'\n')
+
+    async def atender(self, lector: asyncio.StreamReader, escritor: asyncio.StreamWriter) -> None:
+        """Atiende una conexión: cada línea es un pedido y se resuelve sin esperar a los anteriores."""
+        tareas = set()
+        try:
+            while linea := await lector.readline():
+                tarea = asyncio.create_task(self._responder(linea, escritor))
+                tareas.add(tarea)
+                tarea.add_done_callback(tareas.discard)
+                if escritor.transport.get_write_buffer_size() > 1 << 20:
+                    await escritor.drain()
+            if tareas:
+                await asyncio.gather(*tareas)
+            await escritor.drain()
+        except ConnectionError:
+            pass
+        finally:
+            escritor.close()
+
+    async def iniciar(self, host: str = '127.0.0.1', puerto: int = 8765) -> None:
+        self._servidor = await asyncio.start_server(self.atender, host, puerto, limit=1 << 20)
+        print(f"Servicio escuchando en {host}:{puerto}", flush=True)
+
+    async def servir(self, host: str = '127.0.0.1', puerto: int = 8765) -> None:
+        await self.iniciar(host, puerto)
+        async with self._servidor:
+            await self._servidor.serve_forever()
+
+
+def cargar_tablas(directorio=RAIZ, extension: str = 'csv') -> dict:
+    """Carga en las clases las bases de datos de personas, usuarios y películas, y arma
+    las estadísticas de scores si el archivo existe."""
+    directorio = Path(directorio)
+    Personas(dir_database=directorio / f'personas.{extension}')
+    Usuarios(dir_database=directorio / f'usuarios.{extension}')
+    Peliculas(dir_database=directorio / f'peliculas.{extension}')
+    ruta_scores = directorio / f'scores.{extension}'
+    if ruta_scores.exists():
+        estadisticas.registrar(estadisticas.EstadisticasScores(
+            leer_tabla(ruta_scores, 'scores'), Usuarios.database, Personas.database, Peliculas.database))
+    return TABLAS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--directorio', default=str(RAIZ))
+    parser.add_argument('--extension', default='csv')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--ventana', type=float, default=0.002)
+    parser.add_argument('--maximo', type=int, default=1024)
+    parser.add_argument('--perfil', type=float, default=0.0,
+                        help='fracción de las operaciones que se perfilan con cProfile')
+    parser.add_argument('--perfil-memoria', action='store_true',
+                        help='medir también el pico de memoria de las operaciones perfiladas')
+    args = parser.parse_args()
+
+    if args.perfil:
+        metricas.perfilar(args.perfil, args.perfil_memoria)
+
+    servicio = Servicio(cargar_tablas(args.directorio, args.extension),
+                        ventana=args.ventana, maximo=args.maximo)
+    try:
+        asyncio.run(servicio.servir(args.host, args.puerto))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+"""Generador vectorizado de datos sintéticos para pruebas de carga y de escala.
+
+Arma las cinco tablas completas (personas, trabajadores, usuarios, películas y
+scores) como columnas de NumPy/pandas, con integridad referencial entre ellas:
+usuarios y trabajadores son personas existentes y cada score es de un usuario
+y una película existentes, sin pares (usuario, película) repetidos.
+
+Los textos se eligen de un conjunto acotado de valores armado una sola vez
+(nombres, códigos postales, fechas), así que el costo por fila es el de
+indexar un array y no el de llamar a Faker campo por campo. Con la misma
+semilla se obtienen exactamente las mismas tablas.
+
+Uso (desde la raíz del repositorio):
+    python -m sinteticos --escala 10 --directorio datos --extension parquet [--semilla 0]
+"""
+import argparse
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from almacenamiento import GENEROS
+
+# tamaños de las tablas originales; --escala los multiplica
+BASE = {'personas': 943, 'trabajadores': 15, 'usuarios': 943, 'peliculas': 1682, 'scores': 100000}
+
+# distribuciones observadas en los datos originales
+PROB_RATINGS = [0.061, 0.114, 0.271, 0.342, 0.212]
+PROB_GENEROS = dict(zip(GENEROS, [0.001, 0.149, 0.08, 0.025, 0.073, 0.3, 0.065, 0.03, 0.431, 0.013,
+                                  0.014, 0.055, 0.033, 0.036, 0.147, 0.06, 0.149, 0.042, 0.016]))
+OCUPACIONES = ['technician', 'other', 'writer', 'executive', 'administrator', 'student', 'lawyer',
+               'educator', 'scientist', 'ITBA', 'programmer', 'librarian', 'homemaker', 'artist',
+               'engineer', 'entertainment', 'marketing', 'none', 'healthcare', 'retired',
+               'salesman', 'doctor']
+PUESTOS = ['Analyst', 'CTO', 'CFO', 'CEO', 'Sales Regional Manager', 'Marketing Regional Manager',
+           'IT Manager', 'IT']
+HORARIOS = ['9 - 18', '7 - 16', '20 - 04', '8-17']
+# proporción de códigos postales alfanuméricos (canadienses, como 'T8H1N') en los datos originales
+PROB_CP_ALFANUMERICO = 0.02
+
+# cantidad máxima de valores distintos de cada columna de texto
+TAMANIO_CONJUNTO = 1 << 16
+
+
+@lru_cache(maxsize=None)
+def _vocabulario() -> tuple:
+    # Faker solo se usa para tomar sus listas de nombres y palabras, una única vez
+    from faker.providers.lorem.en_US import Provider as Lorem
+    from faker.providers.person.en_US import Provider as Persona
+
+    def pesos(valores):
+        if isinstance(valores, dict):
+            p = np.array(list(valores.values()), dtype='float64')
+            return np.array(list(valores), dtype=object), p / p.sum()
+        return np.array(valores, dtype=object), None
+    return pesos(Persona.first_names), pesos(Persona.last_names), np.array(Lorem.word_list, dtype=object)
+
+
+def pesos_zipf(cantidad: int, exponente: float, rng: np.random.Generator) -> np.ndarray:
+    """Probabilidades tipo Zipf (proporcionales a 1 / rango^exponente) repartidas al azar
+    entre cantidad elementos. Con exponente 0 la distribución es uniforme."""
+    rangos = rng.permutation(cantidad) + 1
+    pesos = rangos.astype('float64') ** -exponente
+    return pesos / pesos.sum()
+
+
+def _elegir(rng: np.random.Generator, valores, n: int, p=None) -> np.ndarray:
+    valores = np.asarray(valores, dtype=object)
+    return valores[rng.choice(len(valores), size=n, p=p)]
+
+
+def _fechas(rng: np.random.Generator, n: int, desde: str, hasta: str, unidad: str = 's') -> np.ndarray:
+    desde, hasta = np.datetime64(desde, unidad), np.datetime64(hasta, unidad)
+    return desde + rng.integers(0, (hasta - desde).astype('int64'), size=n).astype(f'timedelta64[{unidad}]')
+
+
+def _fechas_texto(rng: np.random.Generator, n: int, desde: str, hasta: str, formato: str) -> np.ndarray:
+    """Fechas al azar como texto, elegidas de un conjunto de a lo sumo TAMANIO_CONJUNTO fechas."""
+    conjunto = pd.DatetimeIndex(_fechas(rng, min(n, TAMANIO_CONJUNTO), desde, hasta)).strftime(formato)
+    return _elegir(rng, conjunto.to_numpy(dtype=object), n)
+
+
+def _ids_de(rng: np.random.Generator, ids: np.ndarray, n: int) -> np.ndarray:
+    # n ids distintos de la tabla padre, en orden
+    if n > len(ids):
+        raise ValueError(f"No se pueden elegir {n} ids distintos entre {len(ids)}.")
+    if n == len(ids):
+        return ids.copy()
+    return np.sort(rng.choice(ids, size=n, replace=False))
+
+
+def _sortear(rng: np.random.Generator, p: np.ndarray, n: int) -> np.ndarray:
+    """n posiciones al azar según las probabilidades p.
+    Con muchas posiciones, cuántas veces sale cada una se sortea de una vez con una
+    multinomial y después se mezclan, que es bastante más rápido que rng.choice."""
+    if len(p) <= 64:
+        acumuladas = np.cumsum(p)
+        return np.searchsorted(acumuladas / acumuladas[-1], rng.random(n), side='right')
+    return rng.permutation(np.repeat(np.arange(len(p)), rng.multinomial(n, p)))
+
+
+def _sin_repetidos(claves: np.ndarray) -> np.ndarray:
+    # ordenar y comparar con el vecino es más rápido que np.unique para enteros
+    claves.sort()
+    return claves[np.concatenate(([True], claves[1:] != claves[:-1]))]
+
+
+def generar_personas(rng: np.random.Generator, n: int, anios=(1925, 1991)) -> pd.DataFrame:
+    (nombres, p_nombres), (apellidos, p_apellidos), _ = _vocabulario()
+    tamanio = min(n, TAMANIO_CONJUNTO)
+    completos = (_elegir(rng, nombres, tamanio, p_nombres) + ' '
+                 + _elegir(rng, apellidos, tamanio, p_apellidos))
+    codigos = np.char.zfill(rng.integers(0, 100000, size=tamanio).astype(str), 5).astype(object)
+    # como en los originales, algunos códigos alfanuméricos hacen que la columna se lea como texto
+    alfanumericos = max(1, int(tamanio * PROB_CP_ALFANUMERICO))
+    letras = np.array(list('ABCEGHJKLMNPRSTVXY'), dtype=object)
+    digitos = np.array(list('0123456789'), dtype=object)
+    codigos[:alfanumericos] = (letras[rng.integers(0, len(letras), alfanumericos)]
+                               + digitos[rng.integers(0, 10, alfanumericos)]
+                               + letras[rng.integers(0, len(letras), alfanumericos)]
+                               + digitos[rng.integers(0, 10, alfanumericos)]
+                               + letras[rng.integers(0, len(letras), alfanumericos)])
+    return pd.DataFrame({
+        'id': np.arange(1, n + 1),
+        'Full Name': _elegir(rng, completos, n),
+        'year of birth': rng.integers(anios[0], anios[1] + 1, size=n),
+        'Gender': pd.Categorical.from_codes(rng.integers(0, 2, size=n), ['F', 'M']),
+        'Zip Code': _elegir(rng, codigos, n),
+    })
+
+
+def generar_usuarios(rng: np.random.Generator, ids_personas: np.ndarray, n: int) -> pd.DataFrame:
+    ids = _ids_de(rng, ids_personas, n)
+    return pd.DataFrame({
+        'id': ids,
+        'Occupation': pd.Categorical.from_codes(rng.integers(0, len(OCUPACIONES), size=n), OCUPACIONES),
+        'Active Since': _fechas_texto(rng, n, '1997-09-20', '1998-04-23', '%Y-%m-%d %H:%M:%S'),
+    })
+
+
+def generar_trabajadores(rng: np.random.Generator, ids_personas: np.ndarray, n: int) -> pd.DataFrame:
+    ids = _ids_de(rng, ids_personas, n)
+    return pd.DataFrame({
+        'id': ids,
+        'Position': _elegir(rng, PUESTOS, n),
+        'Category': pd.Categorical.from_codes(rng.integers(0, 3, size=n), ['A', 'B', 'C']),
+        'Working Hours': _elegir(rng, HORARIOS, n),
+        'Start Date': _fechas_texto(rng, n, '1990-01-01', '1998-04-23', '%Y-%m-%d'),
+    })
+
+
+def generar_peliculas(rng: np.random.Generator, n: int, prob_generos: dict = None,
+                      anios=(1920, 1998)) -> pd.DataFrame:
+    """Películas con géneros independientes, cada uno con su probabilidad (por defecto las
+    de los datos originales). Las que no quedan con ningún género se marcan 'unknown'."""
+    prob_generos = {**PROB_GENEROS, **(prob_generos or {})}
+    _, _, palabras = _vocabulario()
+    # los estrenos se concentran en los últimos años, como en los datos originales
+    anios_estreno = np.clip(anios[1] - rng.exponential(6, size=n).astype('int64'), anios[0], anios[1])
+    estrenos = (anios_estreno - 1970).astype('datetime64[Y]').astype('datetime64[D]') \
+        + rng.integers(0, 365, size=n).astype('timedelta64[D]')
+    # cada día distinto se formatea una sola vez
+    dias, posiciones = np.unique(estrenos, return_inverse=True)
+    estrenos = pd.DatetimeIndex(dias).strftime('%d-%b-%Y').to_numpy(dtype=object)[posiciones]
+    titulos = [f'{a.capitalize()} {b} ({anio})' for a, b, anio in
+               zip(_elegir(rng, palabras, n), _elegir(rng, palabras, n), anios_estreno.tolist())]
+
+    nombres = pd.Series(titulos)
+    df = pd.DataFrame({
+        'id': np.arange(1, n + 1),
+        'Name': nombres,
+        'Release Date': estrenos,
+        'IMDB URL': 'http://us.imdb.com/M/title-exact?' + nombres.str.replace(' ', '%20', regex=False),
+    })
+    probabilidades = np.array([prob_generos[genero] for genero in GENEROS])
+    generos = rng.random((n, len(GENEROS))) < probabilidades
+    generos[~generos.any(axis=1), GENEROS.index('unknown')] = True
+    return pd.concat([df, pd.DataFrame(generos.astype('int64'), columns=GENEROS)], axis=1)
+
+
+def generar_scores(rng: np.random.Generator, ids_usuarios: np.ndarray, ids_peliculas: np.ndarray,
+                   n: int, zipf_usuarios: float = 1.0, zipf_peliculas: float = 1.0,
+                   prob_ratings=PROB_RATINGS) -> pd.DataFrame:
+    """Scores de usuarios y películas existentes, sin pares repetidos.
+
+    La actividad de los usuarios y la popularidad de las películas siguen
+    distribuciones tipo Zipf con los exponentes indicados. La fecha queda como
+    datetime64 (se guarda en CSV con el mismo formato que los datos originales).
+    """
+    usuarios, peliculas = len(ids_usuarios), len(ids_peliculas)
+    if n > usuarios * peliculas:
+        raise ValueError(f"No hay {n} pares distintos de usuario y película.")
+    p_usuarios = pesos_zipf(usuarios, zipf_usuarios, rng)
+    p_peliculas = pesos_zipf(peliculas, zipf_peliculas, rng)
+
+    # se sortean pares de más y se descartan los repetidos hasta completar n. Con
+    # distribuciones muy concentradas se repiten muchos pares, así que cada vuelta
+    # sortea según la proporción de pares nuevos que salieron en la anterior
+    claves = np.empty(0, dtype='int64')
+    tasa = 1.0
+    while len(claves) < n:
+        extra = min(int((n - len(claves)) / tasa * 1.1), 4 * n) + 16
+        # basta con mezclar uno de los dos ejes para que los pares sean independientes
+        nuevas = (np.repeat(np.arange(usuarios, dtype='int64'), rng.multinomial(extra, p_usuarios))
+                  * peliculas + _sortear(rng, p_peliculas, extra))
+        antes = len(claves)
+        claves = _sin_repetidos(np.concatenate([claves, nuevas]))
+        tasa = max((len(claves) - antes) / extra, 0.01)
+    claves = rng.permutation(claves)[:n]
+
+    return pd.DataFrame({
+        'user_id': np.asarray(ids_usuarios)[claves // peliculas],
+        'movie_id': np.asarray(ids_peliculas)[claves % peliculas],
+        'rating': _sortear(rng, np.asarray(prob_ratings, dtype='float64'), n) + 1,
+        'Date': _fechas(rng, n, '1997-09-20', '1998-04-23'),
+    })
+
+
+def generar(personas: int = BASE['personas'], trabajadores: int = BASE['trabajadores'],
+            usuarios: int = BASE['usuarios'], peliculas: int = BASE['peliculas'],
+            scores: int = BASE['scores'], semilla=None, zipf_usuarios: float = 1.0,
+            zipf_peliculas: float = 1.0, prob_ratings=PROB_RATINGS, prob_generos: dict = None):
+    """Genera las cinco tablas con integridad referencial.
+
+    Args:
+        personas, trabajadores, usuarios, peliculas, scores (int): cantidad de filas de cada
+            tabla. usuarios y trabajadores no pueden superar a personas.
+        semilla (int): semilla del generador; con la misma semilla se obtienen las mismas tablas.
+        zipf_usuarios, zipf_peliculas (float): exponentes de la actividad de los usuarios y de
+            la popularidad de las películas (0 es uniforme).
+        prob_ratings (list): probabilidad de cada rating, de 1 en adelante.
+        prob_generos (dict): probabilidad de cada género (los que no se indican usan la original).
+
+    Returns: tupla (df_personas, df_trabajadores, df_usuarios, df_peliculas, df_scores), en el
+        mismo orden que load_all y save_all.
+    """
+    rng = np.random.default_rng(semilla)
+    df_personas = generar_personas(rng, personas)
+    ids_personas = df_personas['id'].to_numpy()
+    df_trabajadores = generar_trabajadores(rng, ids_personas, trabajadores)
+    df_usuarios = generar_usuarios(rng, ids_personas, usuarios)
+    df_peliculas = generar_peliculas(rng, peliculas, prob_generos)
+    df_scores = generar_scores(rng, df_usuarios['id'].to_numpy(), df_peliculas['id'].to_numpy(),
+                               scores, zipf_usuarios, zipf_peliculas, prob_ratings)
+    return df_personas, df_trabajadores, df_usuarios, df_peliculas, df_scores
+
+
+def generar_escala(escala: float, semilla=None, **kwargs):
+    """Genera las tablas con escala veces la cantidad de filas de los datos originales."""
+    tamanios = {tabla: max(1, int(round(cantidad * escala))) for tabla, cantidad in BASE.items()}
+    return generar(**tamanios, semilla=semilla, **kwargs)
+
+
+def main():
+    from initializationFunctions import save_all
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--escala', type=float, default=1)
+    parser.add_argument('--directorio', default='.')
+    parser.add_argument('--extension', default='csv')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--zipf-usuarios', type=float, default=1.0)
+    parser.add_argument('--zipf-peliculas', type=float, default=1.0)
+    args = parser.parse_args()
+
+    tablas = generar_escala(args.escala, args.semilla, zipf_usuarios=args.zipf_usuarios,
+                            zipf_peliculas=args.zipf_peliculas)
+    directorio = Path(args.directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    archivos = [directorio / f'{tabla}.{args.extension}' for tabla in BASE]
+    if save_all(*tablas, *archivos) == 0:
+        for tabla, df in zip(BASE, tablas):
+            print(f'{tabla}: {len(df)} filas')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,17 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# los módulos del trabajo están en la raíz del repositorio, junto a los CSV
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+from almacenamiento import leer_tabla  # noqa: E402
+
+
+@pytest.fixture
+def tablas():
+    """Tablas de los CSV del repositorio con los tipos de su esquema."""
+    return {tabla: leer_tabla(RAIZ / f'{tabla}.csv', tabla)
+            for tabla in ('personas', 'usuarios', 'trabajadores', 'peliculas', 'scores')}
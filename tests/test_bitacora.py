@@ -0,0 +1,83 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from almacenamiento import leer_tabla
+from bitacora import Bitacora
+from esquema import convertir_fila
+from indices import indice_de
+from johann_clases import Personas
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def _fila(df, valor_id):
+    return df.loc[df['id'] == valor_id].iloc[0].to_dict()
+
+
+def test_reproducir_aplica_el_estado_final_de_cada_id(tablas, tmp_path):
+    personas = tablas['personas']
+    original = personas.copy()
+    bitacora = Bitacora(tmp_path / 'personas.log')
+    nueva = convertir_fila(personas, {'id': 5000, 'Full Name': 'Zacarias Quenobi', 'year of birth': 1901,
+                                      'Gender': 'X', 'Zip Code': '99999'})
+    bitacora.registrar('new', 5000, nueva)
+    bitacora.registrar('update', 5000, {**nueva, 'Full Name': 'Zacarias Q.'})
+    bitacora.registrar('update', 1, {**_fila(personas, 1), 'Full Name': 'Cambiado'})
+    bitacora.registrar('update', 2, {**_fila(personas, 2), 'id': 6000})
+    bitacora.registrar('delete', 3)
+
+    resultado = bitacora.reproducir(personas)
+    bitacora.cerrar()
+
+    ids = set(original['id']) - {2, 3} | {5000, 6000}
+    assert set(resultado['id']) == ids and len(resultado) == len(ids)
+    assert _fila(resultado, 5000)['Full Name'] == 'Zacarias Q.'
+    assert _fila(resultado, 1)['Full Name'] == 'Cambiado'
+    assert _fila(resultado, 6000)['Full Name'] == _fila(original, 2)['Full Name']
+    assert resultado.dtypes.astype(str).equals(original.dtypes.astype(str))
+    assert resultado.index.is_unique
+    assert indice_de(resultado).por_id == dict(zip(resultado['id'].tolist(), resultado.index.tolist()))
+
+    # aplicar dos veces la misma bitácora da el mismo resultado
+    otra = Bitacora(tmp_path / 'personas.log')
+    assert otra.reproducir(resultado.copy()).reset_index(drop=True).equals(resultado.reset_index(drop=True))
+    otra.cerrar()
+
+
+@pytest.fixture
+def personas_con_bitacora(tmp_path):
+    ruta = tmp_path / 'personas.csv'
+    shutil.copy(RAIZ / 'personas.csv', ruta)
+    Personas.database, Personas.dir_database = None, ruta
+    Personas.read()
+    Personas.enable_journal()
+    yield Personas
+    Personas._bitacora.cerrar()
+    Personas._bitacora = Personas.database = None
+    del Personas.dir_database
+
+
+def test_database_recupera_los_cambios_de_la_bitacora(personas_con_bitacora):
+    personas = personas_con_bitacora
+    personas.new({'id': 5000, 'full_name': 'Zacarias Quenobi', 'year_of_birth': 1901,
+                  'gender': 'M', 'zip_code': '99999'})
+    etiqueta = personas.get_index(1)
+    fila = personas.database.loc[etiqueta]
+    personas.update(etiqueta, {'id': 1, 'full_name': 'Cambiado', 'year_of_birth': fila['year of birth'],
+                               'gender': fila['Gender'], 'zip_code': fila['Zip Code']})
+    personas.delete(personas.get_index(3))
+    esperado = personas.database.reset_index(drop=True)
+    assert _fila(esperado, 1)['Full Name'] == 'Cambiado'
+    assert 5000 in set(esperado['id']) and 3 not in set(esperado['id'])
+
+    # un proceso nuevo lee la foto vieja y le aplica la bitácora
+    personas.database = None
+    personas.read()
+    assert personas.database.reset_index(drop=True).equals(esperado)
+
+    # después de compactar, la foto ya tiene los cambios y la bitácora queda vacía
+    personas.compact(background=False)
+    assert leer_tabla(personas.dir_database, 'personas').equals(esperado)
+    assert personas._bitacora.ruta.stat().st_size == 0
@@ -0,0 +1,42 @@
+import pytest
+
+from estadisticas import EstadisticasScores
+from integridad import GrafoIntegridad
+
+
+def _estadisticas(scores, tablas):
+    return EstadisticasScores(scores, tablas['usuarios'], tablas['personas'], tablas['peliculas'])
+
+
+def _comparar(estadisticas, esperadas):
+    for dimension, acumulados in esperadas.acumulados.items():
+        assert estadisticas.acumulados[dimension].keys() == acumulados.keys(), dimension
+        for clave, acumulado in acumulados.items():
+            assert estadisticas.acumulados[dimension][clave] == pytest.approx(acumulado)
+
+
+def test_promedios_coinciden_con_groupby(tablas):
+    estadisticas = _estadisticas(tablas['scores'], tablas)
+    promedios = tablas['scores'].groupby('movie_id')['rating'].mean()
+    for id_pelicula in promedios.index[:50]:
+        assert estadisticas.promedio('pelicula', id_pelicula) == pytest.approx(promedios[id_pelicula])
+    assert estadisticas.promedio('pelicula', -1) is None
+
+
+def test_acumulados_siguen_las_bajas_en_cascada(tablas):
+    antes = {tabla: df.copy() for tabla, df in tablas.items()}
+    estadisticas = _estadisticas(tablas['scores'], tablas)
+    scores = tablas['scores']
+    ids = scores['user_id'].drop_duplicates().iloc[:3].tolist()
+
+    GrafoIntegridad().baja_en_cascada(tablas, 'personas', ids)
+    quitados = antes['scores'].loc[antes['scores'].index.difference(scores.index)]
+    estadisticas.quitar_scores(quitados)
+
+    assert len(quitados) > 0
+    assert all(estadisticas.cantidad('usuario', id_usuario) == 0 for id_usuario in ids)
+    _comparar(estadisticas, _estadisticas(scores, antes))
+
+    # volver a agregarlos deja los acumulados como al armarlos sobre todos los scores
+    estadisticas.agregar_scores(quitados)
+    _comparar(estadisticas, _estadisticas(antes['scores'], antes))
@@ -0,0 +1,43 @@
+import shutil
+from pathlib import Path
+
+from almacenamiento import leer_tabla
+from guardado import guardar, guardar_tabla, registrar_lectura
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def test_guardar_tabla_detecta_cambios_hechos_con_pandas(tmp_path):
+    ruta = tmp_path / 'personas.csv'
+    shutil.copy(RAIZ / 'personas.csv', ruta)
+    personas = leer_tabla(ruta, 'personas')
+    registrar_lectura(personas, ruta)
+    assert guardar_tabla(personas, ruta)[0] == 0
+
+    # un cambio que no pasa por indices.avisar no cambia la versión de la tabla
+    personas.loc[personas.index[0], 'Full Name'] = 'CHANGED'
+    assert guardar_tabla(personas, ruta)[0] == 1
+    assert leer_tabla(ruta, 'personas').at[0, 'Full Name'] == 'CHANGED'
+    assert guardar_tabla(personas, ruta)[0] == 0
+
+
+def test_guardar_reescribe_solo_lo_que_cambio(tablas, tmp_path):
+    tablas = {tabla: tablas[tabla] for tabla in ('personas', 'usuarios', 'scores')}
+    archivos = {'personas': tmp_path / 'personas.csv', 'usuarios': tmp_path / 'usuarios.csv',
+                'scores': tmp_path / 'scores.parquet'}
+    filas_por_parte = {'scores': 30_000}
+
+    escritas = guardar(tablas, archivos, filas_por_parte=filas_por_parte)
+    assert escritas == {'personas': 1, 'usuarios': 1, 'scores': 4}
+    assert guardar(tablas, archivos, filas_por_parte=filas_por_parte) == dict.fromkeys(escritas, 0)
+
+    scores = tablas['scores']
+    scores.loc[scores.index[-1], 'rating'] = 5 if scores['rating'].iloc[-1] != 5 else 4
+    tablas['personas'].loc[tablas['personas'].index[3], 'Zip Code'] = '00000'
+    escritas = guardar(tablas, archivos, filas_por_parte=filas_por_parte)
+    assert escritas == {'personas': 1, 'usuarios': 0, 'scores': 1}
+    assert leer_tabla(archivos['scores'], 'scores')['rating'].iloc[-1] == scores['rating'].iloc[-1]
+
+    # un proceso nuevo, sin registros en memoria, compara contra el manifiesto
+    copias = {tabla: leer_tabla(archivos[tabla], tabla) for tabla in tablas}
+    assert guardar(copias, archivos, filas_por_parte=filas_por_parte) == dict.fromkeys(escritas, 0)
@@ -0,0 +1,46 @@
+from individuos import Persona, Usuario
+from indices import indice_de
+
+
+def _indice_consistente(df):
+    indice = indice_de(df)
+    assert df.index.is_unique
+    assert indice.por_id == dict(zip(df['id'].tolist(), df.index.tolist()))
+
+
+def test_alta_despues_de_baja_no_pisa_filas(tablas):
+    personas, usuarios, trabajadores = tablas['personas'], tablas['usuarios'], tablas['trabajadores']
+    largo = len(personas)
+    ultimo_id = int(personas['id'].max())
+
+    baja = Persona('Borrada', '00000', 1980, 'F')
+    baja.numero_identificacion = int(personas['id'].iloc[0])
+    baja.baja_persona(personas, usuarios, trabajadores)
+    assert len(personas) == largo - 1
+
+    nueva = Persona('Zacarias Quenobi', '99999', 1901, 'M')
+    assert nueva.alta_persona(personas, politica='rechazar') is not False
+
+    assert len(personas) == largo
+    assert ultimo_id in set(personas['id'])
+    assert nueva.numero_identificacion == ultimo_id + 1
+    assert personas.loc[personas['id'] == ultimo_id + 1, 'Full Name'].tolist() == ['Zacarias Quenobi']
+    assert str(personas['Gender'].dtype) == 'category'
+    _indice_consistente(personas)
+
+
+def test_alta_usuario_despues_de_baja(tablas):
+    personas, usuarios, trabajadores = tablas['personas'], tablas['usuarios'], tablas['trabajadores']
+    ids_usuarios = set(usuarios['id'])
+    baja = Persona('Borrada', '00000', 1980, 'F')
+    baja.numero_identificacion = int(usuarios['id'].iloc[0])
+    baja.baja_persona(personas, usuarios, trabajadores)
+
+    persona = Persona('Zacarias Quenobi', '99999', 1901, 'M')
+    persona.alta_persona(personas, politica='rechazar')
+    usuario = Usuario('Jedi', persona)
+    usuario.alta_usuario(personas, usuarios, politica='rechazar')
+
+    assert set(usuarios['id']) == ids_usuarios - {baja.numero_identificacion} | {usuario.numero_identificacion}
+    assert str(usuarios['Occupation'].dtype) == 'category'
+    _indice_consistente(usuarios)
@@ -0,0 +1,50 @@
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from almacenamiento import leer_tabla
+from esquema import ESQUEMAS
+from ingesta import cargar_scores, filtrar_scores
+from initializationFunctions import TABLAS, load_all
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def _scores_con_inconsistencias(directorio: Path) -> Path:
+    # dos calificaciones de un usuario y de una película que no existen
+    for tabla in TABLAS:
+        shutil.copy(RAIZ / f'{tabla}.csv', directorio / f'{tabla}.csv')
+    with open(directorio / 'scores.csv', 'a') as archivo:
+        archivo.write('100000,99999,1,3,1998-01-01 00:00:00\n100001,1,99999,4,1998-01-01 00:00:00\n')
+    return directorio / 'scores.csv'
+
+
+def test_filtrar_scores_escribe_con_el_esquema(tablas, tmp_path):
+    origen = _scores_con_inconsistencias(tmp_path)
+    destino = tmp_path / 'limpios.parquet'
+
+    conteos = filtrar_scores(origen, destino, tablas['usuarios']['id'], tablas['peliculas']['id'],
+                             tamanio_bloque=30_000)
+
+    limpios = pd.read_parquet(destino)
+    assert conteos['descartadas'] == 2
+    assert conteos['escritas'] == len(limpios) == len(tablas['scores'])
+    # sin la columna del índice del CSV y con los enteros compactos (parquet guarda las fechas en ms)
+    assert list(limpios.columns) == list(ESQUEMAS['scores'])
+    assert [str(tipo) for tipo in limpios.dtypes.iloc[:3]] == ['int32', 'int32', 'int8']
+    assert pd.api.types.is_datetime64_any_dtype(limpios['Date'])
+
+
+def test_cargar_scores_informa_las_descartadas(tablas, tmp_path, capsys):
+    origen = _scores_con_inconsistencias(tmp_path)
+
+    scores, conteos = cargar_scores(origen, tablas['usuarios']['id'], tablas['peliculas']['id'], 30_000)
+    assert conteos == {'leidas': len(tablas['scores']) + 2, 'cargadas': len(scores),
+                       'descartadas': 2}
+    assert scores.equals(tablas['scores'])
+
+    capsys.readouterr()
+    load_all(*(tmp_path / f'{tabla}.csv' for tabla in TABLAS), scores_chunksize=30_000)
+    assert 'incosistencias' in capsys.readouterr().out
+    assert leer_tabla(origen, 'scores').shape[0] == len(scores) + 2
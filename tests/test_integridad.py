@@ -0,0 +1,36 @@
+from indices import indice_de
+from integridad import GrafoIntegridad
+
+
+def test_baja_en_cascada_borra_hijas_y_nietas(tablas):
+    personas, usuarios, scores = tablas['personas'], tablas['usuarios'], tablas['scores']
+    id_usuario = int(scores['user_id'].value_counts().index[0])
+    calificaciones = int((scores['user_id'] == id_usuario).sum())
+    largos = {tabla: len(df) for tabla, df in tablas.items()}
+    indice = indice_de(usuarios)
+
+    reporte = GrafoIntegridad().baja_en_cascada(tablas, 'personas', [id_usuario])
+
+    eliminadas = reporte.groupby('hija')['eliminadas'].sum().to_dict()
+    assert eliminadas == {'personas': 1, 'usuarios': 1, 'trabajadores': 0, 'scores': calificaciones}
+    assert {tabla: largos[tabla] - len(df) for tabla, df in tablas.items()} == {
+        'personas': 1, 'usuarios': 1, 'trabajadores': 0, 'peliculas': 0, 'scores': calificaciones}
+    assert id_usuario not in set(personas['id']) | set(usuarios['id']) | set(scores['user_id'])
+    # los índices ya armados siguen a la tabla sin reconstruirse
+    assert indice_de(usuarios) is indice
+    assert indice.por_id == dict(zip(usuarios['id'].tolist(), usuarios.index.tolist()))
+
+
+def test_verificar_borra_solo_las_filas_huerfanas(tablas):
+    grafo = GrafoIntegridad()
+    assert grafo.verificar(tablas)['eliminadas'].sum() == 0
+
+    peliculas, scores = tablas['peliculas'], tablas['scores']
+    id_pelicula = int(scores['movie_id'].iloc[0])
+    huerfanas = int((scores['movie_id'] == id_pelicula).sum())
+    peliculas.drop(peliculas.index[peliculas['id'] == id_pelicula], inplace=True)
+
+    reporte = grafo.verificar(tablas).set_index('columna_hija')
+    assert reporte.at['movie_id', 'eliminadas'] == huerfanas
+    assert reporte['eliminadas'].sum() == huerfanas
+    assert id_pelicula not in set(scores['movie_id'])
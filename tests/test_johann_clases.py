@@ -0,0 +1,59 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from almacenamiento import leer_tabla
+from duplicados import indice_duplicados
+from indices import indice_de
+from johann_clases import Personas
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def personas(tablas):
+    Personas.database = tablas['personas']
+    yield Personas
+    Personas.database = None
+
+
+def test_new_despues_de_delete_mantiene_indices(personas):
+    etiqueta = personas.database.index[10]
+    ultima = personas.database.index.max()
+    largo = len(personas.database)
+    personas.delete(etiqueta)
+    duplicados = indice_duplicados(personas.database)
+
+    personas.new({'id': 5000, 'full_name': 'Zacarias Quenobi', 'year_of_birth': 1901,
+                  'gender': 'M', 'zip_code': '99999'})
+
+    df = personas.database
+    assert len(df) == largo
+    assert df.index[-1] == ultima + 1
+    assert personas.get(ultima + 1).full_name == 'Zacarias Quenobi'
+    assert str(df['Gender'].dtype) == 'category'
+    assert indice_de(df).por_id == dict(zip(df['id'].tolist(), df.index.tolist()))
+    # la tabla nueva se queda con los índices, sin reconstruirlos
+    assert indice_duplicados(df) is duplicados
+    assert set(duplicados.filas) == set(df.index)
+    assert duplicados.similares({'Full Name': 'Zacarias Quenobi', 'year of birth': 1901,
+                                 'Zip Code': '99999'})[0][0] == ultima + 1
+
+
+def test_write_guarda_cambios_hechos_con_pandas(tmp_path, capsys):
+    ruta = tmp_path / 'personas.csv'
+    shutil.copy(RAIZ / 'personas.csv', ruta)
+    Personas.database, Personas.dir_database = None, ruta
+    try:
+        Personas.read()
+        Personas.write()
+        assert 'no cambió' in capsys.readouterr().out
+
+        Personas.database.loc[Personas.database.index[0], 'Full Name'] = 'CHANGED'
+        Personas.write()
+        assert 'guardada exitosamente' in capsys.readouterr().out
+        assert leer_tabla(ruta, 'personas').at[0, 'Full Name'] == 'CHANGED'
+    finally:
+        Personas.database = None
+        del Personas.dir_database
@@ -0,0 +1,42 @@
+from almacenamiento import asignar_fila, etiqueta_nueva
+from esquema import convertir_fila
+from indices import indice_de
+from lotes import insertar_lote
+
+
+def test_insertar_lote_continua_etiquetas_e_ids(tablas):
+    personas = tablas['personas']
+    personas = personas.drop(personas.index[[0, 5]])
+    ultima = personas.index.max()
+    ultimo_id = int(personas['id'].max())
+    filas = [{'Full Name': 'Ana Uno', 'year of birth': 1990, 'Gender': 'F', 'Zip Code': '00001'},
+             {'id': ultimo_id, 'Full Name': 'Ana Dos', 'year of birth': 1990, 'Gender': 'F', 'Zip Code': '00001'},
+             {'Full Name': 'Beto Dos', 'year of birth': 1991, 'Gender': 'X', 'Zip Code': '00002'}]
+
+    nuevo, reporte = insertar_lote(personas, filas)
+
+    assert reporte['aceptado'].tolist() == [True, False, True]
+    assert reporte['id'].tolist() == [ultimo_id + 1, ultimo_id, ultimo_id + 2]
+    assert nuevo.index[-2:].tolist() == [ultima + 1, ultima + 2]
+    assert nuevo.index.is_unique
+    assert nuevo.dtypes.equals(personas.dtypes)
+    assert 'X' in nuevo['Gender'].cat.categories
+    indice = indice_de(nuevo)
+    assert indice.por_id == dict(zip(nuevo['id'].tolist(), nuevo.index.tolist()))
+    assert indice.proximo_id() == ultimo_id + 3
+
+
+def test_asignar_fila_agrega_sin_cambiar_tipos(tablas):
+    trabajadores = tablas['trabajadores']
+    tipos = trabajadores.dtypes
+    trabajadores.drop(trabajadores.index[0], inplace=True)
+    etiqueta = etiqueta_nueva(trabajadores)
+    fila = convertir_fila(trabajadores, {'id': 10_000, 'Position': 'Nuevo puesto', 'Category': None,
+                                         'Working Hours': 'Full Time', 'Start Date': '2020-01-02'})
+
+    asignar_fila(trabajadores, etiqueta, fila)
+
+    assert trabajadores.index[-1] == etiqueta
+    assert [str(tipo) for tipo in trabajadores.dtypes] == [str(tipo) for tipo in tipos]
+    assert trabajadores.at[etiqueta, 'Position'] == 'Nuevo puesto'
+    assert trabajadores.isna().at[etiqueta, 'Category']
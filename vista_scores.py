@@ -0,0 +1,352 @@
+"""Vista materializada de los scores con los datos de su usuario, persona y película.
+
+Las consultas demográficas (promedio por película según sexo, rango etario u
+ocupación del usuario, por género o año de la película, ...) necesitan unir
+scores con usuarios, usuarios con personas y scores con películas. VistaScores
+hace esa unión una sola vez y la guarda con claves enteras: los atributos de
+cada usuario y de cada película se codifican como enteros en tablas chicas
+(una fila por usuario o película) y cada score guarda los códigos de las
+suyas, así que agrupar es contar sobre arrays de enteros.
+
+La vista se entera de los cambios en sus tablas por indices.avisar (lo llaman
+new, update, delete y new_many de johann_clases, las altas y bajas de
+individuos, las bajas en cascada y la bitácora) y en la próxima consulta
+recalcula solo las filas afectadas: las de los scores de los usuarios o
+películas que cambiaron y las de los scores agregados o quitados.
+"""
+import threading
+import weakref
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from esquema import GENEROS
+from estadisticas import LIMITES_ETARIOS, RANGOS_ETARIOS
+from concurrencia import bloquear
+from indices import indice_de, suscribir
+
+# columnas por las que se puede agrupar
+AGRUPABLES = ['user_id', 'movie_id', 'sexo', 'rango_etario', 'ocupacion', 'anio', 'genero']
+# tabla de origen -> tabla chica de la vista que se recalcula cuando cambia
+_DIMENSIONES = {'usuarios': 'usuarios', 'personas': 'usuarios', 'peliculas': 'peliculas', 'scores': 'scores'}
+_BITS_GENEROS = np.left_shift(1, np.arange(len(GENEROS)), dtype=np.int32)
+
+
+def _tabla(fuente) -> pd.DataFrame:
+    # las fuentes pueden ser DataFrames o clases de johann_clases (se usa su base de datos actual)
+    return fuente if isinstance(fuente, pd.DataFrame) else fuente.database
+
+
+class VistaScores:
+    """Unión scores ⋈ usuarios ⋈ personas ⋈ películas, cacheada y actualizada en forma incremental.
+
+    Args:
+        scores, usuarios, personas, peliculas: DataFrames con las columnas de los archivos, o
+            clases de johann_clases (Usuarios, Personas, Peliculas) cuya base de datos se usa.
+
+    Los resultados de promedios() quedan guardados hasta el próximo cambio en alguna de
+    las tablas; no deben modificarse.
+    """
+
+    def __init__(self, scores, usuarios, personas, peliculas):
+        self.fuentes = {'scores': scores, 'usuarios': usuarios, 'personas': personas, 'peliculas': peliculas}
+        # código de cada sexo y ocupación; los valores nuevos reciben el código siguiente
+        self._codigos = {'sexo': {}, 'ocupacion': {}}
+        self._lock = threading.RLock()
+        self._resultados = {}
+        self.reconstruir()
+        _vistas.add(self)
+
+    # armado
+
+    def reconstruir(self) -> None:
+        """Arma la vista completa desde las tablas."""
+        with self._leyendo():
+            self._pendientes = {}
+            self._usuarios = self._dimension_usuarios()
+            self._peliculas = self._dimension_peliculas()
+            self._etiquetas_scores, self._datos = self._filas(_tabla(self.fuentes['scores']))
+            self._origenes = {tabla: _tabla(fuente) for tabla, fuente in self.fuentes.items()}
+            self._resultados = {}
+
+    def _codificar(self, atributo: str, valores) -> np.ndarray:
+        codigos = self._codigos[atributo]
+        valores = pd.Series(valores, dtype=object)
+        for valor in valores.dropna().unique():
+            codigos.setdefault(valor, len(codigos))
+        return valores.map(codigos).fillna(-1).to_numpy(dtype=np.int16)
+
+    def _filtrar(self, tabla: str, ids) -> pd.DataFrame:
+        df = _tabla(self.fuentes[tabla])
+        if ids is None:
+            return df
+        indice = indice_de(df)
+        etiquetas = [etiqueta for etiqueta in map(indice.etiqueta, ids) if etiqueta is not None]
+        return df.loc[etiquetas]
+
+    def _dimension_usuarios(self, ids=None) -> pd.DataFrame:
+        """Códigos de sexo y ocupación y año de nacimiento de cada usuario (de ids, o de todos)."""
+        usuarios = self._filtrar('usuarios', ids)[['id', 'Occupation']]
+        personas = self._filtrar('personas', ids)[['id', 'Gender', 'year of birth']]
+        unidos = usuarios.merge(personas, on='id').drop_duplicates('id')
+        return pd.DataFrame({
+            'sexo': self._codificar('sexo', unidos['Gender']),
+            'ocupacion': self._codificar('ocupacion', unidos['Occupation']),
+            'nacimiento': pd.to_numeric(unidos['year of birth'], errors='coerce').fillna(-1)
+                            .to_numpy(dtype=np.int32),
+        }, index=pd.Index(unidos['id'].to_numpy(dtype=np.int64)))
+
+    def _dimension_peliculas(self, ids=None) -> pd.DataFrame:
+        """Año de estreno y géneros (como máscara de bits, en el orden de GENEROS) de cada película."""
+        peliculas = self._filtrar('peliculas', ids).drop_duplicates('id')
+        generos = np.zeros(len(peliculas), dtype=np.int32)
+        for bit, genero in zip(_BITS_GENEROS, GENEROS):
+            if genero in peliculas.columns:
+                generos |= np.where(peliculas[genero].fillna(False).to_numpy(dtype=bool), bit, 0).astype(np.int32)
+        anios = pd.to_datetime(peliculas['Release Date'], errors='coerce', format='mixed').dt.year
+        return pd.DataFrame({'anio': anios.fillna(-1).to_numpy(dtype=np.int16), 'generos': generos},
+                            index=pd.Index(peliculas['id'].to_numpy(dtype=np.int64)))
+
+    def _columnas_usuario(self, user_ids: np.ndarray, anios_score: np.ndarray) -> dict:
+        posiciones = self._usuarios.index.get_indexer(user_ids)
+        conocido = posiciones >= 0
+        columnas = {}
+        for columna in ('sexo', 'ocupacion'):
+            columnas[columna] = np.where(conocido, self._usuarios[columna].to_numpy()[posiciones], -1).astype(np.int16)
+        nacimiento = self._usuarios['nacimiento'].to_numpy()[posiciones]
+        edades = anios_score.astype(np.int32) - nacimiento
+        rangos = np.searchsorted(LIMITES_ETARIOS, edades, side='right') - 1
+        validos = conocido & (anios_score >= 0) & (nacimiento >= 0) & (rangos >= 0)
+        columnas['rango_etario'] = np.where(validos, rangos, -1).astype(np.int8)
+        return columnas
+
+    def _columnas_pelicula(self, movie_ids: np.ndarray) -> dict:
+        posiciones = self._peliculas.index.get_indexer(movie_ids)
+        conocida = posiciones >= 0
+        return {'anio': np.where(conocida, self._peliculas['anio'].to_numpy()[posiciones], -1).astype(np.int16),
+                'generos': np.where(conocida, self._peliculas['generos'].to_numpy()[posiciones], 0).astype(np.int32)}
+
+    def _filas(self, df_scores: pd.DataFrame) -> tuple:
+        """Etiquetas de los scores de df_scores y columnas de la vista para ellos."""
+        user_ids = df_scores['user_id'].to_numpy(dtype=np.int64)
+        movie_ids = df_scores['movie_id'].to_numpy(dtype=np.int64)
+        anios_score = pd.to_datetime(df_scores['Date'], errors='coerce').dt.year.fillna(-1).to_numpy(dtype=np.int16)
+        return df_scores.index, {
+            'user_id': user_ids.astype(np.int32), 'movie_id': movie_ids.astype(np.int32),
+            'rating': df_scores['rating'].to_numpy(dtype=np.int8), 'anio_score': anios_score,
+            **self._columnas_usuario(user_ids, anios_score), **self._columnas_pelicula(movie_ids),
+        }
+
+    # actualización incremental
+
+    def _marcar(self, df, ids, destino) -> None:
+        with self._lock:
+            for tabla, origen in self._origenes.items():
+                if origen is not df and _tabla(self.fuentes[tabla]) is not df:
+                    continue
+                if origen is not df:
+                    # la tabla se había reemplazado sin aviso: no alcanza con los ids
+                    ids = None
+                dimension = _DIMENSIONES[tabla]
+                pendientes = self._pendientes.get(dimension, set())
+                if ids is None or dimension == 'scores' or pendientes is None:
+                    self._pendientes[dimension] = None
+                else:
+                    self._pendientes[dimension] = pendientes | set(ids)
+                # si el cambio creó una tabla nueva, la vista pasa a leer esa
+                nueva = df if destino is None else destino
+                if isinstance(self.fuentes[tabla], pd.DataFrame):
+                    self.fuentes[tabla] = nueva
+                self._origenes[tabla] = nueva
+
+    def _actualizar(self) -> None:
+        # una tabla de las clases de johann_clases que se reemplazó sin aviso (por ejemplo al
+        # volver a leerla) se recalcula completa
+        for tabla, fuente in self.fuentes.items():
+            if _tabla(fuente) is not self._origenes[tabla]:
+                self._pendientes[_DIMENSIONES[tabla]] = None
+                self._origenes[tabla] = _tabla(fuente)
+        if not self._pendientes:
+            return
+        pendientes, self._pendientes = self._pendientes, {}
+        self._resultados = {}
+        if 'usuarios' in pendientes:
+            self._actualizar_dimension('usuarios', pendientes['usuarios'])
+        if 'peliculas' in pendientes:
+            self._actualizar_dimension('peliculas', pendientes['peliculas'])
+        if 'scores' in pendientes:
+            self._actualizar_scores()
+
+    def _actualizar_dimension(self, dimension: str, ids) -> None:
+        """Recalcula las filas de la tabla chica para ids (o todas) y después las filas de
+        la vista de los scores de los usuarios o películas que cambiaron."""
+        anterior = self._usuarios if dimension == 'usuarios' else self._peliculas
+        armar = self._dimension_usuarios if dimension == 'usuarios' else self._dimension_peliculas
+        if ids is None:
+            nueva = armar()
+            todos = anterior.index.union(nueva.index)
+            distintos = (anterior.reindex(todos, fill_value=-2).to_numpy()
+                         != nueva.reindex(todos, fill_value=-2).to_numpy()).any(axis=1)
+            cambiados = todos[distintos].to_numpy()
+        else:
+            cambiados = np.array([id for id in ids if id is not None], dtype=np.int64)
+            nueva = pd.concat([anterior.drop(cambiados, errors='ignore'), armar(cambiados)])
+        if dimension == 'usuarios':
+            self._usuarios = nueva
+        else:
+            self._peliculas = nueva
+        if len(cambiados) == 0:
+            return
+
+        columna = 'user_id' if dimension == 'usuarios' else 'movie_id'
+        afectadas = np.flatnonzero(np.isin(self._datos[columna], cambiados))
+        if len(afectadas) == 0:
+            return
+        claves = self._datos[columna][afectadas].astype(np.int64)
+        if dimension == 'usuarios':
+            columnas = self._columnas_usuario(claves, self._datos['anio_score'][afectadas])
+        else:
+            columnas = self._columnas_pelicula(claves)
+        for nombre, valores in columnas.items():
+            self._datos[nombre][afectadas] = valores
+
+    def _actualizar_scores(self) -> None:
+        """Quita las filas de los scores que ya no están y agrega las de los nuevos."""
+        df_scores = _tabla(self.fuentes['scores'])
+        quedan = self._etiquetas_scores.isin(df_scores.index)
+        nuevos = ~df_scores.index.isin(self._etiquetas_scores)
+        if not quedan.all():
+            self._etiquetas_scores = self._etiquetas_scores[quedan]
+            self._datos = {nombre: valores[quedan] for nombre, valores in self._datos.items()}
+        if nuevos.any():
+            etiquetas, filas = self._filas(df_scores[nuevos])
+            self._etiquetas_scores = self._etiquetas_scores.append(etiquetas)
+            self._datos = {nombre: np.concatenate([valores, filas[nombre]])
+                           for nombre, valores in self._datos.items()}
+
+    # consultas
+
+    @contextmanager
+    def _leyendo(self):
+        # primero los locks de las tablas y después el de la vista, el mismo orden en que los toma
+        # una escritura que avisa un cambio; así una consulta y una escritura no se bloquean mutuamente
+        locks = [fuente._lock for fuente in self.fuentes.values() if not isinstance(fuente, pd.DataFrame)]
+        with bloquear(lecturas=locks), self._lock:
+            yield
+
+    def tabla(self) -> pd.DataFrame:
+        """Copia de la vista con los códigos traducidos: sexo, rango etario y ocupación como
+        categorías, año de estreno y una columna booleana por género."""
+        with self._leyendo():
+            self._actualizar()
+            datos = self._datos
+            tabla = {columna: datos[columna].copy() for columna in ('user_id', 'movie_id', 'rating')}
+            for columna in ('sexo', 'rango_etario', 'ocupacion'):
+                tabla[columna] = pd.Categorical.from_codes(datos[columna], categories=self._etiquetas(columna))
+            tabla['anio'] = pd.Series(datos['anio']).where(datos['anio'] >= 0).astype('Int16').array
+            for bit, genero in zip(_BITS_GENEROS, GENEROS):
+                tabla[genero] = (datos['generos'] & bit) != 0
+            return pd.DataFrame(tabla, index=self._etiquetas_scores)
+
+    def _etiquetas(self, columna: str) -> list:
+        if columna in self._codigos:
+            return list(self._codigos[columna])
+        return {'rango_etario': RANGOS_ETARIOS, 'genero': GENEROS}.get(columna)
+
+    def promedios(self, por, genero: str = None, movie_id=None, minimo: int = 1) -> pd.DataFrame:
+        """Cantidad de scores y rating promedio agrupando por las columnas indicadas.
+
+        Args:
+            por (str | list): una o varias de AGRUPABLES, por ejemplo ['movie_id', 'sexo'].
+                Con 'genero' cada score cuenta una vez por cada género de su película.
+            genero (str): solo los scores de películas de ese género.
+            movie_id (int | list): solo los scores de esas películas.
+            minimo (int): cantidad mínima de scores de cada grupo.
+
+        Returns: DataFrame con columnas 'cantidad' y 'promedio', indexado por las columnas de por.
+            Los scores sin el dato de alguna columna (por ejemplo, de un usuario sin persona) no
+            se cuentan.
+        """
+        por = [por] if isinstance(por, str) else list(por)
+        desconocidas = [columna for columna in por if columna not in AGRUPABLES]
+        if desconocidas:
+            raise ValueError(f"Solo se puede agrupar por {AGRUPABLES}")
+        peliculas = None if movie_id is None else tuple(np.atleast_1d(movie_id).tolist())
+        clave = (tuple(por), genero, peliculas, minimo)
+        with self._leyendo():
+            self._actualizar()
+            resultado = self._resultados.get(clave)
+            if resultado is None:
+                resultado = self._resultados[clave] = self._promedios(por, genero, peliculas, minimo)
+            return resultado
+
+    def _promedios(self, por: list, genero, peliculas, minimo: int) -> pd.DataFrame:
+        datos = self._datos
+        filas = slice(None)
+        if genero is not None or peliculas is not None:
+            filas = np.ones(len(self._etiquetas_scores), dtype=bool)
+        if genero is not None:
+            if genero not in GENEROS:
+                raise ValueError(f"El género debe ser uno de {GENEROS}")
+            filas &= (datos['generos'] & _BITS_GENEROS[GENEROS.index(genero)]) != 0
+        if peliculas is not None:
+            filas &= np.isin(datos['movie_id'], peliculas)
+
+        columnas = {columna: datos[columna][filas] for columna in por if columna != 'genero'}
+        ratings = datos['rating'][filas]
+        if 'genero' in por:
+            # una fila por score y género de su película
+            generos = datos['generos'][filas]
+            repetidas = [np.flatnonzero(generos & bit) for bit in _BITS_GENEROS]
+            columnas = {columna: np.concatenate([valores[r] for r in repetidas])
+                        for columna, valores in columnas.items()}
+            columnas['genero'] = np.repeat(np.arange(len(GENEROS), dtype=np.int8), [len(r) for r in repetidas])
+            ratings = np.concatenate([ratings[r] for r in repetidas])
+
+        validas = np.ones(len(ratings), dtype=bool)
+        for columna in por:
+            if columna in ('sexo', 'rango_etario', 'ocupacion', 'anio'):
+                validas &= columnas[columna] >= 0
+        claves = [columnas[columna][validas].astype(np.int64) for columna in por]
+        ratings = ratings[validas].astype(np.float64)
+        tamanios = tuple(int(clave.max()) + 1 if len(clave) else 1 for clave in claves)
+        if all(clave.min() >= 0 for clave in claves if len(clave)) and np.prod(tamanios, dtype=float) <= 2 ** 26:
+            # claves compactas: un solo entero por grupo y conteos con bincount, sin ordenar
+            combinada = np.ravel_multi_index(claves, tamanios)
+            cantidades = np.bincount(combinada, minlength=np.prod(tamanios))
+            sumas = np.bincount(combinada, ratings, minlength=np.prod(tamanios))
+            presentes = np.flatnonzero(cantidades >= max(minimo, 1))
+            niveles = np.unravel_index(presentes, tamanios)
+            resultado = pd.DataFrame({'cantidad': cantidades[presentes],
+                                      'promedio': sumas[presentes] / cantidades[presentes]},
+                                     index=pd.MultiIndex.from_arrays(niveles, names=por))
+        else:
+            grupos = pd.DataFrame(dict(zip(por, claves)))
+            grupos['rating'] = ratings
+            resultado = grupos.groupby(por, sort=True)['rating'].agg(['size', 'mean'])
+            resultado.columns = ['cantidad', 'promedio']
+            resultado = resultado[resultado['cantidad'] >= minimo]
+
+        # los códigos vuelven a sus valores
+        niveles = []
+        for nivel, columna in enumerate(por):
+            valores = resultado.index.get_level_values(nivel)
+            etiquetas = self._etiquetas(columna)
+            if etiquetas is not None:
+                valores = pd.Index(np.asarray(etiquetas, dtype=object)[valores], name=columna)
+            niveles.append(valores)
+        resultado.index = niveles[0] if len(por) == 1 else pd.MultiIndex.from_arrays(niveles, names=por)
+        return resultado
+
+
+# vistas armadas; se enteran de los cambios en sus tablas por indices.avisar
+_vistas = weakref.WeakSet()
+
+
+def _avisar(df, ids, destino) -> None:
+    for vista in list(_vistas):
+        vista._marcar(df, ids, destino)
+
+
+suscribir(_avisar)
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+
+def _nativo(valor):
+    # los escalares de numpy se devuelven como tipos de Python para que pasen las validaciones
+    return valor.item() if isinstance(valor, np.generic) else valor
+
+
+class ColumnasTabla:
+    """Arrays de las columnas de una tabla, obtenidos una sola vez y solo cuando se piden.
+
+    Para columnas numéricas to_numpy no copia los datos, así que leer una fila
+    no construye ningún objeto intermedio.
+    """
+    __slots__ = ('df', '_arrays', '_index')
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._arrays = {}
+        self._index = df.index
+
+    def __getitem__(self, columna: str) -> np.ndarray:
+        array = self._arrays.get(columna)
+        if array is None:
+            array = self._arrays[columna] = self.df[columna].to_numpy()
+        return array
+
+    def actualizar(self, etiquetas) -> bool:
+        """Copia a los arrays ya obtenidos los valores actuales de las filas indicadas, sin
+        volver a obtener las columnas enteras. Devuelve False si la tabla agregó o eliminó
+        filas (su índice cambió), en cuyo caso los arrays ya no sirven."""
+        if self.df.index is not self._index:
+            return False
+        posiciones = self._index.get_indexer(etiquetas)
+        posiciones = posiciones[posiciones >= 0]
+        for columna, array in list(self._arrays.items()):
+            valores = self.df[columna].iloc[posiciones].to_numpy() if columna in self.df.columns else None
+            if valores is None or valores.dtype != array.dtype:
+                # la columna cambió de tipo o ya no existe: se vuelve a obtener al pedirla
+                del self._arrays[columna]
+                continue
+            if not array.flags.writeable:
+                # las columnas numéricas se comparten con la tabla como vistas de solo lectura
+                array = self._arrays[columna] = array.copy()
+            array[posiciones] = valores
+        return True
+
+    def posiciones(self, etiquetas) -> np.ndarray:
+        """Posiciones de las etiquetas en la tabla (-1 si no existen)."""
+        return self.df.index.get_indexer(etiquetas)
+
+
+class ColumnasFila:
+    """Los valores de una sola fila con la interfaz de ColumnasTabla (la fila queda en la
+    posición 0), para leer una fila sin obtener las columnas enteras."""
+    __slots__ = ('df', '_posicion')
+
+    def __init__(self, df: pd.DataFrame, posicion: int):
+        self.df = df
+        self._posicion = posicion
+
+    def __getitem__(self, columna: str) -> tuple:
+        return (self.df[columna].iloc[self._posicion],)
+
+
+class VistaFila:
+    """Vista de solo lectura de una fila: lee cada valor directamente de los arrays
+    de columnas compartidos, sin copiar la fila.
+
+    Se accede por nombre de columna (vista['Full Name']) o por el nombre del
+    atributo de la clase (vista.full_name), según los campos indicados.
+    """
+    __slots__ = ('_columnas', '_campos', '_posicion')
+
+    def __init__(self, columnas: ColumnasTabla, campos: dict, posicion: int):
+        self._columnas = columnas
+        self._campos = campos
+        self._posicion = posicion
+
+    def __getitem__(self, columna: str):
+        return _nativo(self._columnas[columna][self._posicion])
+
+    def get(self, columna: str, defecto=None):
+        if columna not in self._columnas.df.columns:
+            return defecto
+        return self[columna]
+
+    def __getattr__(self, campo: str):
+        try:
+            columna = self._campos[campo]
+        except KeyError:
+            raise AttributeError(campo) from None
+        return self[columna]
+
+    def to_dict(self) -> dict:
+        return {campo: self[columna] for campo, columna in self._campos.items()}
+
+    def __repr__(self):
+        valores = ', '.join(f'{campo}={valor!r}' for campo, valor in self.to_dict().items())
+        return f'VistaFila({valores})'